@@ -0,0 +1,114 @@
+"""
+Call recording encoder
+Compresses WAV recordings (Opus/OGG or FLAC via libsndfile) before GridFS upload
+"""
+
+import os
+import tempfile
+import wave
+from typing import Dict, Optional
+
+try:
+    import soundfile
+except ImportError:  # Optional: recordings are stored as WAV without it
+    soundfile = None
+
+# codec -> (libsndfile format, subtype, content type, file extension)
+RECORDING_CODECS = {
+    "opus": ("OGG", "OPUS", "audio/ogg", ".ogg"),
+    "vorbis": ("OGG", "VORBIS", "audio/ogg", ".ogg"),
+    "flac": ("FLAC", "PCM_16", "audio/flac", ".flac"),
+    "wav": ("WAV", "PCM_16", "audio/wav", ".wav")
+}
+
+# Opus only supports these input sample rates
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+DEFAULT_RECORDING_CODEC = os.getenv("RECORDING_CODEC", "opus").lower()
+
+# Frames read and encoded per block, so long calls are never loaded whole (~2 s at 16 kHz)
+ENCODE_BLOCK_FRAMES = 32768
+
+
+def codec_supported(codec: str) -> bool:
+    """True if the codec can be written with the installed libsndfile"""
+    if codec == "wav":
+        return True
+    if soundfile is None or codec not in RECORDING_CODECS:
+        return False
+    file_format, subtype, _, _ = RECORDING_CODECS[codec]
+    return subtype in soundfile.available_subtypes(file_format)
+
+
+def _wav_info(wav_path: str) -> Dict:
+    """Read sample rate, channels and duration from a WAV header"""
+    with wave.open(wav_path, "rb") as wf:
+        sample_rate = wf.getframerate()
+        return {
+            "sample_rate": sample_rate,
+            "channels": wf.getnchannels(),
+            "duration_seconds": round(wf.getnframes() / sample_rate, 2) if sample_rate else 0
+        }
+
+
+def encode_recording(wav_path: str, codec: Optional[str] = None) -> Dict:
+    """
+    Encode a WAV recording for storage
+
+    Falls back to the original WAV if the codec is unavailable, does not
+    support the sample rate, or encoding fails.
+
+    Args:
+        wav_path: Path to a PCM WAV file
+        codec: One of RECORDING_CODECS (defaults to RECORDING_CODEC env, "opus")
+
+    Returns:
+        Dict with path, codec, content_type, extension, duration_seconds,
+        sample_rate, channels, original_bytes, encoded_bytes and temporary
+        (True if path is a new file the caller should delete)
+    """
+    codec = (codec or DEFAULT_RECORDING_CODEC).lower()
+    info = _wav_info(wav_path)
+    info["original_bytes"] = os.path.getsize(wav_path)
+
+    if codec == "opus" and info["sample_rate"] not in OPUS_SAMPLE_RATES:
+        print(f"[Opus does not support {info['sample_rate']} Hz, falling back to FLAC]")
+        codec = "flac"
+
+    if codec != "wav" and not codec_supported(codec):
+        print(f"[Recording codec '{codec}' unavailable, storing WAV]")
+        codec = "wav"
+
+    file_format, subtype, content_type, extension = RECORDING_CODECS[codec]
+    result = {
+        **info,
+        "path": wav_path,
+        "codec": codec,
+        "content_type": content_type,
+        "extension": extension,
+        "encoded_bytes": info["original_bytes"],
+        "temporary": False
+    }
+    if codec == "wav":
+        return result
+
+    fd, encoded_path = tempfile.mkstemp(suffix=extension, prefix="recording_")
+    os.close(fd)
+    try:
+        with soundfile.SoundFile(wav_path) as source, \
+                soundfile.SoundFile(encoded_path, "w", samplerate=source.samplerate, channels=source.channels,
+                                    format=file_format, subtype=subtype) as encoded:
+            for block in source.blocks(blocksize=ENCODE_BLOCK_FRAMES, dtype="int16"):
+                encoded.write(block)
+    except Exception as e:
+        print(f"[Recording encode warning ({codec}): {e}]")
+        os.remove(encoded_path)
+        return {**result, "codec": "wav", "content_type": "audio/wav", "extension": ".wav"}
+
+    result.update({
+        "path": encoded_path,
+        "encoded_bytes": os.path.getsize(encoded_path),
+        "temporary": True
+    })
+    print(f"[Recording encoded as {codec}: {result['original_bytes']} -> {result['encoded_bytes']} bytes]")
+    return result
@@ -0,0 +1,217 @@
+"""
+Audio playback backends for the voice bot
+TTS audio is played straight from memory; sinks are pluggable so tests
+and headless benchmarks can swap in a null or recording sink
+"""
+
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import List, Tuple
+
+try:
+    import pyaudio
+except ImportError:  # Optional: only needed for PyAudioSink
+    pyaudio = None
+
+try:
+    import vlc
+except ImportError:  # Optional: only needed for VLCSink
+    vlc = None
+
+# Playback backend used by create_sink(): pyaudio, vlc, null or recording
+AUDIO_SINK = os.getenv("AUDIO_SINK", "pyaudio").lower()
+
+# PCM written to the output device per block; stop() takes effect between blocks
+PLAYBACK_BLOCK_MS = 20
+
+
+def split_wav(audio: bytes) -> Tuple[bytes, int, int, int]:
+    """
+    Split WAV bytes into PCM and format
+
+    Tolerates streaming-style headers whose data size is unknown (0xFFFFFFFF).
+
+    Returns:
+        (pcm, sample_rate, channels, sample_width)
+
+    Raises:
+        ValueError: If the bytes are not PCM WAV
+    """
+    if len(audio) < 12 or audio[:4] != b"RIFF" or audio[8:12] != b"WAVE":
+        raise ValueError("Audio is not a WAV file")
+
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(audio):
+        chunk_id = audio[offset:offset + 4]
+        chunk_size = struct.unpack("<I", audio[offset + 4:offset + 8])[0]
+        body = offset + 8
+
+        if chunk_id == b"fmt ":
+            audio_format, channels, sample_rate = struct.unpack("<HHI", audio[body:body + 8])
+            bits = struct.unpack("<H", audio[body + 14:body + 16])[0]
+            if audio_format not in (1, 0xFFFE):
+                raise ValueError(f"Unsupported WAV encoding: {audio_format}")
+            fmt = (sample_rate, channels, bits // 8)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk before fmt chunk")
+            end = min(body + chunk_size, len(audio))
+            return (audio[body:end],) + fmt
+
+        offset = body + chunk_size + (chunk_size & 1)
+
+    raise ValueError("WAV file has no data chunk")
+
+
+class AudioSink:
+    """
+    Plays audio clips; play() blocks until the clip finishes or stop() is
+    called and returns the fraction of the clip that was played (0.0-1.0)
+    """
+
+    def play(self, audio: bytes) -> float:
+        raise NotImplementedError
+
+    def stop(self):
+        """Interrupt the clip currently playing (no-op if idle)"""
+
+    def close(self):
+        """Release the output device"""
+
+
+class PyAudioSink(AudioSink):
+    """Plays PCM WAV bytes through one persistent PyAudio output stream"""
+
+    def __init__(self):
+        if pyaudio is None:
+            raise RuntimeError("PyAudioSink requires the 'pyaudio' package")
+        self._audio = pyaudio.PyAudio()
+        self._stream = None
+        self._format = None
+        self._stop = threading.Event()
+
+    def _ensure_stream(self, sample_rate: int, channels: int, sample_width: int):
+        """Reuse the open stream unless the clip format changed"""
+        if self._stream is not None and self._format == (sample_rate, channels, sample_width):
+            return
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+        self._stream = self._audio.open(
+            format=self._audio.get_format_from_width(sample_width),
+            channels=channels,
+            rate=sample_rate,
+            output=True
+        )
+        self._format = (sample_rate, channels, sample_width)
+
+    def play(self, audio: bytes) -> float:
+        pcm, sample_rate, channels, sample_width = split_wav(audio)
+        self._ensure_stream(sample_rate, channels, sample_width)
+        self._stop.clear()
+
+        block = sample_rate * channels * sample_width * PLAYBACK_BLOCK_MS // 1000
+        written = 0
+        while written < len(pcm):
+            if self._stop.is_set():
+                return written / len(pcm)
+            self._stream.write(pcm[written:written + block])
+            written += block
+        return 1.0
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+        self._audio.terminate()
+
+
+class VLCSink(AudioSink):
+    """Legacy path: writes each clip to a temp file and plays it with VLC (any format)"""
+
+    def __init__(self, temp_dir: str = None):
+        if vlc is None:
+            raise RuntimeError("VLCSink requires the 'python-vlc' package")
+        self.temp_dir = temp_dir
+        self._player = None
+
+    def play(self, audio: bytes) -> float:
+        fd, path = tempfile.mkstemp(suffix=".wav", dir=self.temp_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio)
+            self._player = vlc.MediaPlayer(path)
+            self._player.play()
+            position = 0.0
+            while self._player.get_state() not in (vlc.State.Ended, vlc.State.Error, vlc.State.Stopped):
+                position = max(position, self._player.get_position())
+                time.sleep(0.02)
+            ended = self._player.get_state() == vlc.State.Ended
+            self._player.release()
+            self._player = None
+            return 1.0 if ended else position
+        finally:
+            os.remove(path)
+
+    def stop(self):
+        if self._player is not None:
+            self._player.stop()
+
+
+class NullSink(AudioSink):
+    """Discards audio; optionally sleeps for the clip duration to mimic real playback"""
+
+    def __init__(self, realtime: bool = False):
+        self.realtime = realtime
+        self._stop = threading.Event()
+
+    def play(self, audio: bytes) -> float:
+        if not self.realtime:
+            return 1.0
+        self._stop.clear()
+        try:
+            pcm, sample_rate, channels, sample_width = split_wav(audio)
+            duration = len(pcm) / float(sample_rate * channels * sample_width)
+        except ValueError:
+            duration = 0
+        start = time.monotonic()
+        if duration and self._stop.wait(duration):
+            return min(1.0, (time.monotonic() - start) / duration)
+        return 1.0
+
+    def stop(self):
+        self._stop.set()
+
+
+class RecordingSink(NullSink):
+    """Keeps every played clip in memory for inspection in tests and benchmarks"""
+
+    def __init__(self, realtime: bool = False):
+        super().__init__(realtime)
+        self.clips: List[bytes] = []
+
+    def play(self, audio: bytes) -> float:
+        self.clips.append(audio)
+        return super().play(audio)
+
+
+def create_sink(name: str = None, **kwargs) -> AudioSink:
+    """Build a sink by name (defaults to AUDIO_SINK env: pyaudio, vlc, null or recording)"""
+    name = (name or AUDIO_SINK).lower()
+    sinks = {
+        "pyaudio": PyAudioSink,
+        "vlc": VLCSink,
+        "null": NullSink,
+        "recording": RecordingSink
+    }
+    if name not in sinks:
+        raise ValueError(f"Unknown audio sink: {name}")
+    return sinks[name](**kwargs)
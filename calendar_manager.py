@@ -7,9 +7,9 @@ import os
 import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
-import requests
 from msal import PublicClientApplication, SerializableTokenCache
 from dotenv import load_dotenv
+from http_client import get_http_client
 
 load_dotenv()
 
@@ -46,6 +46,9 @@ class OutlookCalendarManager:
         # Microsoft Graph API endpoint
         self.graph_url = "https://graph.microsoft.com/v1.0"
         
+        # Pooled keep-alive session shared with the rest of the process
+        self.http = get_http_client()
+        
         # Sales executive email addresses (configure these)
         self.sales_executives = self._load_executives()
         
@@ -185,7 +188,7 @@ class OutlookCalendarManager:
         }
         
         try:
-            response = requests.get(url, headers=headers, params=params)
+            response = self.http.get(url, headers=headers, params=params, endpoint="graph.calendarView")
             if response.status_code == 200:
                 events = response.json().get("value", [])
                 # Check if any events have this executive as attendee
@@ -298,7 +301,7 @@ class OutlookCalendarManager:
         url = f"{self.graph_url}/me/calendar/events"
         
         try:
-            response = requests.post(url, headers=headers, json=event_body)
+            response = self.http.post(url, headers=headers, json=event_body, endpoint="graph.createEvent")
             if response.status_code == 201:
                 event = response.json()
                 event_id = event.get("id")
@@ -367,7 +370,7 @@ class OutlookCalendarManager:
             }
             
             url = f"{self.graph_url}/me/sendMail"
-            response = requests.post(url, headers=headers, json=email_body)
+            response = self.http.post(url, headers=headers, json=email_body, endpoint="graph.sendMail")
             
             if response.status_code == 202:
                 print(f"[✅ Email reminder sent to {executive_email}]")
@@ -0,0 +1,373 @@
+"""
+Streaming call recorder
+Caller frames and bot clips are converted to one PCM format (16-bit at
+the recording rate), placed on a shared monotonic clock (caller left,
+bot right) and written to disk as the call goes, through a small
+fixed-size window. The WAV header is finalized on close, so memory use
+does not grow with call length. An offset index maps each utterance to
+its position in the recording.
+"""
+
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from typing import BinaryIO, Dict, List, Optional, Union
+
+from audio_playback import split_wav
+
+RECORDING_SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+
+# 2: caller on the left channel, bot on the right; 1: both mixed
+RECORDING_CHANNELS = int(os.getenv("RECORDING_CHANNELS", "2"))
+
+CALLER = "caller"
+BOT = "bot"
+
+# A continuous source this far behind the clock was paused; resume at the clock
+GAP_TOLERANCE_MS = 200
+
+WAV_HEADER_BYTES = 44
+
+# Audio held in memory before it is written out (about 2s at 16 kHz)
+WRITE_BUFFER_BYTES = 64 * 1024
+
+# RIFF/data size used while the length is unknown (non-seekable targets keep it)
+STREAMING_SIZE = 0xFFFFFFFF
+
+
+def wav_header(sample_rate: int, channels: int = 1, data_bytes: int = STREAMING_SIZE) -> bytes:
+    """44-byte PCM WAV header for 16-bit samples"""
+    block_align = channels * SAMPLE_WIDTH
+    riff_size = STREAMING_SIZE if data_bytes == STREAMING_SIZE else min(STREAMING_SIZE, 36 + data_bytes)
+    return (b"RIFF" + struct.pack("<I", riff_size) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate,
+                                    sample_rate * block_align, block_align, SAMPLE_WIDTH * 8)
+            + b"data" + struct.pack("<I", min(STREAMING_SIZE, data_bytes)))
+
+
+def to_mono(pcm: bytes, channels: int) -> array:
+    """16-bit PCM as mono samples (channels averaged)"""
+    samples = array("h", pcm[:len(pcm) - len(pcm) % (SAMPLE_WIDTH * channels)])
+    if channels == 1:
+        return samples
+    return array("h", (sum(samples[i:i + channels]) // channels for i in range(0, len(samples), channels)))
+
+
+def _mix(buffer: array, buffer_start: int, channels: int, slot: int, position: int,
+         samples: array, overlap_end: int):
+    """
+    Write samples into one channel of an interleaved buffer
+
+    The part before overlap_end may already hold audio and is mixed
+    (clipped to 16 bits); the rest is silence and is simply replaced.
+    """
+    base = (position - buffer_start) * channels + slot
+    mixed = max(0, min(len(samples), overlap_end - position))
+    for i in range(mixed):
+        index = base + i * channels
+        buffer[index] = max(-32768, min(32767, buffer[index] + samples[i]))
+    if mixed < len(samples):
+        buffer[base + mixed * channels:base + len(samples) * channels:channels] = samples[mixed:]
+
+
+class Resampler:
+    """
+    Streaming linear-interpolation resampler for mono 16-bit samples
+
+    Keeps the last input sample and the fractional read position between
+    calls, so a stream cut into chunks resamples without clicks at the joins.
+    """
+
+    def __init__(self, from_rate: int, to_rate: int):
+        self.from_rate = from_rate
+        self.to_rate = to_rate
+        self._step = from_rate / float(to_rate)
+        self._position = 0.0  # Read position in the current buffer (input samples)
+        self._last: Optional[int] = None
+
+    def process(self, samples: array) -> array:
+        if self.from_rate == self.to_rate or not samples:
+            return samples
+        buffer = samples if self._last is None else array("h", [self._last]) + samples
+        out = array("h")
+        position, step, end = self._position, self._step, len(buffer) - 1
+        while position < end:
+            index = int(position)
+            fraction = position - index
+            first = buffer[index]
+            out.append(int(first + (buffer[index + 1] - first) * fraction))
+            position += step
+        # Carry the last sample so the next chunk interpolates across the join
+        self._position = position - end
+        self._last = buffer[-1]
+        return out
+
+
+class CallRecorder:
+    """
+    Writes a time-aligned call recording incrementally as 16-bit WAV
+
+    Audio is placed on a shared monotonic clock (time.monotonic), so gaps
+    and overlaps are kept: caller audio goes to the left channel and bot
+    audio to the right (stereo), or both are mixed into one channel (mono).
+    Recent audio is held in a small window; audio placed before the window
+    (e.g. a bot clip recorded once it finished playing) is merged into the
+    file on disk. Thread-safe: the mic loop and the TTS playback thread
+    can both write.
+
+    Usage:
+        recorder = CallRecorder("call.wav")
+        recorder.write(mic_frame)                                     # Caller, 16 kHz mono PCM
+        recorder.write_clip(tts_wav_bytes, at=play_start)             # Bot clip as played
+        recorder.add_utterance("assistant", text, message_index=1)    # Offset index entry
+        path = recorder.close()                                       # Header holds the real length
+    """
+
+    def __init__(self, target: Union[str, BinaryIO, None] = None,
+                 sample_rate: int = RECORDING_SAMPLE_RATE, channels: int = RECORDING_CHANNELS,
+                 buffer_bytes: int = WRITE_BUFFER_BYTES, start: Optional[float] = None):
+        """
+        Args:
+            target: Output path, or a writable binary file object (e.g. a GridFS
+                upload stream); a temp file is created if omitted. A non-seekable
+                target keeps the streaming header size (0xFFFFFFFF) and drops audio
+                that arrives after its position was written out
+            sample_rate: Recording sample rate; input at other rates is resampled
+            channels: 2 (caller left, bot right) or 1 (mixed)
+            buffer_bytes: Recent audio held in memory before it is written out
+            start: time.monotonic() value at offset 0 (defaults to now)
+        """
+        if channels not in (1, 2):
+            raise ValueError("Recordings are mono or stereo")
+        if target is None:
+            fd, target = tempfile.mkstemp(suffix=".wav", prefix="call_recording_")
+            os.close(fd)
+        if isinstance(target, str):
+            self.path = target
+            self._file = open(target, "w+b")
+            self._owns_file = True
+        else:
+            self.path = None
+            self._file = target
+            self._owns_file = False
+        try:
+            self._seekable = self._file.seekable()
+        except AttributeError:
+            self._seekable = False
+
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.start = time.monotonic() if start is None else start
+        self.buffer_frames = max(1, buffer_bytes // (SAMPLE_WIDTH * channels))
+        self.index: List[Dict] = []  # Utterance offsets, see add_utterance()
+        self.dropped_frames = 0
+        self.closed = False
+
+        self._flushed = 0                # Frames written out to the file
+        self._window = array("h")        # Interleaved frames after the flushed ones
+        self._ends = [0] * channels      # End of the audio written to each channel (frames)
+        self._resamplers: Dict[tuple, Resampler] = {}
+        self._pending_speech: Dict[str, tuple] = {}  # channel -> (start, end) not yet indexed
+        self._lock = threading.Lock()
+        self._file.write(wav_header(sample_rate, channels))
+
+    @property
+    def frames(self) -> int:
+        return self._flushed + len(self._window) // self.channels
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.frames / float(self.sample_rate)
+
+    def offset(self, at: float) -> float:
+        """Seconds into the recording for a time.monotonic() value"""
+        return max(0.0, at - self.start)
+
+    def _slot(self, channel: str) -> int:
+        if channel not in (CALLER, BOT):
+            raise ValueError(f"Unknown channel: {channel}")
+        return 0 if self.channels == 1 or channel == CALLER else 1
+
+    def _convert(self, pcm: bytes, sample_rate: int, channels: int, resampler: Optional[Resampler]) -> array:
+        samples = to_mono(pcm, channels)
+        if sample_rate != self.sample_rate:
+            samples = (resampler or Resampler(sample_rate, self.sample_rate)).process(samples)
+        return samples
+
+    def write(self, pcm: bytes, sample_rate: Optional[int] = None, channels: int = 1,
+              channel: str = CALLER, at: Optional[float] = None):
+        """
+        Append 16-bit PCM from a continuous source (e.g. the microphone)
+
+        Chunks follow on from the previous one on the same channel; if the clock
+        has moved on by more than GAP_TOLERANCE_MS (the source was paused), the
+        chunk is placed at the clock instead and the gap stays silent.
+
+        Args:
+            at: time.monotonic() when the chunk started (defaults to now minus its length)
+        """
+        if not pcm:
+            return
+        sample_rate = sample_rate or self.sample_rate
+        with self._lock:
+            key = (channel, sample_rate)
+            resampler = self._resamplers.get(key)
+            if resampler is None and sample_rate != self.sample_rate:
+                resampler = self._resamplers[key] = Resampler(sample_rate, self.sample_rate)
+            samples = self._convert(pcm, sample_rate, channels, resampler)
+
+            slot = self._slot(channel)
+            if at is None:
+                at = time.monotonic() - len(samples) / float(self.sample_rate)
+            clock_frame = int(self.offset(at) * self.sample_rate)
+            position = self._ends[slot]
+            if clock_frame - position > GAP_TOLERANCE_MS * self.sample_rate // 1000:
+                position = clock_frame
+            self._place(slot, position, samples)
+
+    def write_clip(self, audio: bytes, channel: str = BOT, at: Optional[float] = None,
+                   fraction: float = 1.0):
+        """
+        Place a complete WAV clip (header stripped, converted to the recording format)
+
+        Args:
+            channel: CALLER or BOT
+            at: time.monotonic() when playback started (defaults to right after
+                the channel's previous audio)
+            fraction: Part of the clip that was actually played (barge-in)
+        """
+        pcm, sample_rate, channels, sample_width = split_wav(audio)
+        if sample_width != SAMPLE_WIDTH:
+            raise ValueError(f"Only 16-bit PCM can be recorded, got {sample_width * 8}-bit")
+        samples = self._convert(pcm, sample_rate, channels, None)
+        if fraction < 1.0:
+            samples = samples[:int(len(samples) * max(0.0, fraction))]
+        with self._lock:
+            slot = self._slot(channel)
+            position = self._ends[slot] if at is None else int(self.offset(at) * self.sample_rate)
+            self._place(slot, position, samples)
+
+    def _place(self, slot: int, position: int, samples: array):
+        """Write samples into one channel at a frame position (caller holds the lock)"""
+        if self.closed or not samples:
+            return
+        end = position + len(samples)
+        overlap_end = self._ends[slot]  # Audio already on this channel before here is mixed, not replaced
+        self._ends[slot] = max(self._ends[slot], end)
+
+        if position < self._flushed:
+            on_disk = min(end, self._flushed) - position
+            if self._seekable:
+                self._merge_on_disk(slot, position, samples[:on_disk], overlap_end)
+            else:
+                self.dropped_frames += on_disk
+            samples = samples[on_disk:]
+            position = self._flushed
+            if not samples:
+                return
+
+        # Grow the window with silence up to the end of the new audio
+        needed = (end - self._flushed) * self.channels
+        if needed > len(self._window):
+            self._window.extend(array("h", bytes(SAMPLE_WIDTH * (needed - len(self._window)))))
+        _mix(self._window, self._flushed, self.channels, slot, position, samples, overlap_end)
+
+        # Keep the most recent audio in memory, write out the rest
+        excess = len(self._window) // self.channels - self.buffer_frames
+        if excess > 0:
+            self._write_out(excess)
+
+    def _merge_on_disk(self, slot: int, position: int, samples: array, overlap_end: int):
+        """Read-modify-write a region of the file that was already written out"""
+        frame_bytes = SAMPLE_WIDTH * self.channels
+        self._file.seek(WAV_HEADER_BYTES + position * frame_bytes)
+        region = array("h", self._file.read(len(samples) * frame_bytes))
+        _mix(region, position, self.channels, slot, position, samples, overlap_end)
+        self._file.seek(WAV_HEADER_BYTES + position * frame_bytes)
+        self._file.write(region.tobytes())
+        self._file.seek(0, os.SEEK_END)
+
+    def _write_out(self, frames: int):
+        count = frames * self.channels
+        self._file.write(self._window[:count].tobytes())
+        del self._window[:count]
+        self._flushed += frames
+
+    def mark_speech(self, channel: str, start: float, end: float):
+        """
+        Note when someone spoke (time.monotonic() values)
+
+        Spans on the same channel merge until add_utterance() takes them,
+        so a bot turn made of several clips becomes one entry.
+        """
+        end = max(start, end)
+        with self._lock:
+            pending = self._pending_speech.get(channel)
+            if pending:
+                start, end = min(pending[0], start), max(pending[1], end)
+            self._pending_speech[channel] = (start, end)
+
+    def add_utterance(self, role: str, text: str, message_index: Optional[int] = None) -> Optional[Dict]:
+        """
+        Add the speech marked since the last call to the offset index
+
+        Args:
+            role: "user" (caller channel) or "assistant" (bot channel)
+            text: What was said (as stored in the conversation history)
+            message_index: Position of the message in the conversation history
+
+        Returns:
+            The index entry, or None if no speech was marked for that side
+        """
+        channel = CALLER if role == "user" else BOT
+        with self._lock:
+            span = self._pending_speech.pop(channel, None)
+        if span is None:
+            return None
+        entry = {
+            "role": role,
+            "channel": channel if self.channels == 2 else "mixed",
+            "start_seconds": round(self.offset(span[0]), 2),
+            "end_seconds": round(self.offset(span[1]), 2),
+            "text": text,
+            "message_index": message_index
+        }
+        self.index.append(entry)
+        return entry
+
+    def close(self) -> Optional[str]:
+        """
+        Write out buffered audio and finalize the header (safe to call twice)
+
+        Returns:
+            Path of the recording, or None if it was written to a file object
+        """
+        with self._lock:
+            if self.closed:
+                return self.path
+            self._write_out(len(self._window) // self.channels)
+            self.closed = True
+            if self._seekable:
+                self._file.seek(0)
+                self._file.write(wav_header(self.sample_rate, self.channels,
+                                            data_bytes=self._flushed * SAMPLE_WIDTH * self.channels))
+                self._file.seek(0, os.SEEK_END)
+            if self._owns_file:
+                self._file.close()
+        return self.path
+
+    def discard(self):
+        """Close and delete the recording file (e.g. the call was not stored)"""
+        self.close()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,763 @@
+"""
+Asyncio call engine for running many concurrent calls in one process
+Each CallSession owns its history, endpointer, recording and qualification
+data; audio comes from a pluggable transport (local mic, WAV file or a
+simulated telephony socket) and STT, LLM and TTS calls are all async
+
+Usage:
+    python call_session.py files <lead_name> <company_name> <wav> [<wav> ...]   # one call per WAV
+    python call_session.py serve [port]                                        # accept socket calls
+    python call_session.py dial <host:port> <lead_name> <company_name> <wav>   # place a socket call
+    python call_session.py mic <lead_name> <company_name>                      # one call on the local mic
+"""
+
+import asyncio
+import io
+import json
+import os
+import struct
+import sys
+import time
+import uuid
+import wave
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+from groq import AsyncGroq
+
+from audio_playback import split_wav
+from call_recorder import BOT, CALLER, CallRecorder
+from instrumentation import (
+    CALL_TRACE_EXPORT, CallTrace, MARK_SPEECH_END, STAGE_LISTEN_WAIT, STAGE_LISTEN_SPEECH, STAGE_VAD_ENDPOINT,
+    STAGE_STT, STAGE_LLM_FIRST_TOKEN, STAGE_LLM, STAGE_TTS, STAGE_PLAYBACK, STAGE_RESPONSE_GAP
+)
+from speech_services import (
+    GROQ_MODEL, LLM_TEMPERATURE, DEEPGRAM_LISTEN_URL, DEEPGRAM_SPEAK_URL, TTS_PARAMS,
+    TTS_VOICE_KEY, clean_text_for_tts, extract_json, is_json_output, load_system_prompt,
+    tts_headers, tts_input
+)
+from tts_cache import TTSCache
+from tts_pipeline import SentenceChunker
+from vad_endpointer import Endpointer, FRAME_MS, SPEECH_START, SPEECH_END, VAD_MAX_UTTERANCE_MS
+
+# Calls handled at once by one engine (further calls wait for a slot)
+MAX_CONCURRENT_CALLS = int(os.getenv("MAX_CONCURRENT_CALLS", "50"))
+
+# Sentences synthesized ahead of playback per call
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "3"))
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+FRAME_BYTES = SAMPLE_RATE * FRAME_MS // 1000 * SAMPLE_WIDTH
+
+LISTEN_TIMEOUT = 15
+
+# Caller frames written to the recorder per thread hop (300 ms)
+RECORD_BATCH_FRAMES = 10
+EXIT_PHRASES = ('goodbye', 'bye', 'exit', 'hang up', 'end call')
+
+# Simulated telephony socket: 1-byte kind + 4-byte big-endian length + payload
+MSG_START = b"S"     # caller -> bot: JSON {"lead_name", "company_name"}
+MSG_AUDIO = b"A"     # caller -> bot: 16 kHz mono 16-bit PCM
+MSG_PLAY = b"P"      # bot -> caller: WAV clip to play
+MSG_HANGUP = b"H"    # either side: end of call
+
+DEFAULT_SOCKET_PORT = 8766
+
+
+def pcm_to_wav(pcm: bytes, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Wrap 16-bit mono PCM in a WAV header"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(SAMPLE_WIDTH)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def clip_seconds(audio: bytes) -> float:
+    """Duration of a WAV clip (0 if it is not PCM WAV)"""
+    try:
+        pcm, sample_rate, channels, sample_width = split_wav(audio)
+    except ValueError:
+        return 0.0
+    return len(pcm) / float(sample_rate * channels * sample_width)
+
+
+class AsyncSpeechServices:
+    """
+    Non-blocking Deepgram and Groq clients shared by every session of an engine
+
+    One pooled httpx client serves all Deepgram requests; the TTS phrase
+    cache is shared too (it is content-addressed, so sessions cannot leak
+    state through it).
+    """
+
+    def __init__(self, max_connections: int = 100, use_cache: bool = True,
+                 deepgram_url: Optional[str] = None, groq_base_url: Optional[str] = None):
+        """
+        Args:
+            max_connections: Deepgram connection pool size
+            use_cache: Serve repeated sentences from the TTS phrase cache
+            deepgram_url: Deepgram base URL (defaults to DEEPGRAM_API_URL)
+            groq_base_url: Groq base URL (defaults to GROQ_BASE_URL or the public API)
+        """
+        self.deepgram_key = os.getenv("DEEPGRAM_API_KEY")
+        self.speak_url = f"{deepgram_url.rstrip('/')}/v1/speak" if deepgram_url else DEEPGRAM_SPEAK_URL
+        self.listen_url = f"{deepgram_url.rstrip('/')}/v1/listen" if deepgram_url else DEEPGRAM_LISTEN_URL
+        self.http = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=httpx.Timeout(10.0, connect=3.05)
+        )
+        self.llm = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"), base_url=groq_base_url,
+                             max_retries=2, timeout=20.0)
+        self.cache = TTSCache(None, TTS_VOICE_KEY) if use_cache else None
+
+    async def synthesize(self, text: str) -> bytes:
+        """TTS for one sentence, served from the phrase cache when possible"""
+        if self.cache:
+            audio = await asyncio.to_thread(self.cache.get, text)
+            if audio is not None:
+                return audio
+
+        response = await self.http.post(
+            self.speak_url,
+            params=TTS_PARAMS,
+            headers=tts_headers(),
+            json={"text": tts_input(text)}
+        )
+        response.raise_for_status()
+        audio = response.content
+
+        if self.cache:
+            await asyncio.to_thread(self.cache.put, text, audio)
+        return audio
+
+    async def transcribe(self, pcm: bytes) -> str:
+        """Transcribe one utterance of 16 kHz mono PCM with the Deepgram REST API"""
+        response = await self.http.post(
+            self.listen_url,
+            params={"model": "nova-2", "smart_format": "true", "punctuate": "true"},
+            headers={"Authorization": f"Token {self.deepgram_key}", "Content-Type": "audio/wav"},
+            content=pcm_to_wav(pcm)
+        )
+        response.raise_for_status()
+        result = response.json()
+        return result['results']['channels'][0]['alternatives'][0]['transcript'].strip()
+
+    async def stream_reply(self, history: List[Dict]) -> AsyncIterator[str]:
+        """Stream the LLM reply token by token"""
+        stream = await self.llm.chat.completions.create(
+            model=GROQ_MODEL,
+            messages=history,
+            temperature=LLM_TEMPERATURE,
+            stream=True,
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def close(self):
+        await self.http.aclose()
+        await self.llm.close()
+
+
+class AudioTransport:
+    """
+    Audio in and out for one call
+
+    read_frame() returns FRAME_MS of 16 kHz mono 16-bit PCM, or None when
+    the caller hung up. play() returns the fraction of the clip played.
+    """
+
+    async def read_frame(self) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def play(self, audio: bytes) -> float:
+        raise NotImplementedError
+
+    def flush_input(self):
+        """Drop audio captured while the bot was talking (live transports)"""
+
+    async def close(self):
+        """Release the device or connection"""
+
+
+class WavFileTransport(AudioTransport):
+    """
+    Feeds a WAV file as the caller's audio; bot audio is kept in played
+
+    The file only advances while the session is listening, so each pause
+    in the file is heard as the caller waiting for the bot.
+    """
+
+    def __init__(self, path: str, realtime: bool = True, trailing_silence: float = 2.0):
+        """
+        Args:
+            path: 16 kHz mono 16-bit WAV
+            realtime: Pace frames and playback at wall-clock speed
+            trailing_silence: Seconds of silence fed after the file ends
+        """
+        with wave.open(path, "rb") as wf:
+            if (wf.getframerate(), wf.getnchannels(), wf.getsampwidth()) != (SAMPLE_RATE, 1, SAMPLE_WIDTH):
+                raise ValueError(f"{path}: expected {SAMPLE_RATE} Hz mono 16-bit WAV")
+            pcm = wf.readframes(wf.getnframes())
+        pcm += b"\0" * (int(trailing_silence * SAMPLE_RATE) * SAMPLE_WIDTH)
+
+        self.frames = [pcm[i:i + FRAME_BYTES] for i in range(0, len(pcm) - FRAME_BYTES + 1, FRAME_BYTES)]
+        self.realtime = realtime
+        self.played: List[bytes] = []
+        self._position = 0
+        self._next_frame_at = None
+
+    async def read_frame(self) -> Optional[bytes]:
+        if self._position >= len(self.frames):
+            return None
+        if self.realtime:
+            now = time.monotonic()
+            if self._next_frame_at is None or self._next_frame_at < now:
+                self._next_frame_at = now  # Resume after the bot's turn without a burst
+            await asyncio.sleep(self._next_frame_at - now)
+            self._next_frame_at += FRAME_MS / 1000.0
+        frame = self.frames[self._position]
+        self._position += 1
+        return frame
+
+    async def play(self, audio: bytes) -> float:
+        self.played.append(audio)
+        if self.realtime:
+            await asyncio.sleep(clip_seconds(audio))
+        return 1.0
+
+
+class MicTransport(AudioTransport):
+    """Local microphone and speaker (PyAudio callback input, persistent output stream)"""
+
+    def __init__(self):
+        import pyaudio
+        from audio_playback import PyAudioSink
+
+        self._loop = asyncio.get_running_loop()
+        self._frames = asyncio.Queue()
+        self._audio = pyaudio.PyAudio()
+        self._stream = self._audio.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=SAMPLE_RATE,
+            input=True,
+            frames_per_buffer=FRAME_BYTES // SAMPLE_WIDTH,
+            stream_callback=self._on_audio
+        )
+        self._sink = PyAudioSink()
+
+    def _on_audio(self, data, frame_count, time_info, status):
+        import pyaudio
+        self._loop.call_soon_threadsafe(self._frames.put_nowait, data)
+        return (None, pyaudio.paContinue)
+
+    async def read_frame(self) -> Optional[bytes]:
+        return await self._frames.get()
+
+    async def play(self, audio: bytes) -> float:
+        return await asyncio.to_thread(self._sink.play, audio)
+
+    def flush_input(self):
+        while not self._frames.empty():
+            self._frames.get_nowait()
+
+    async def close(self):
+        self._stream.stop_stream()
+        self._stream.close()
+        self._audio.terminate()
+        self._sink.close()
+
+
+async def read_message(reader: asyncio.StreamReader):
+    """Read one (kind, payload) message from a simulated telephony socket"""
+    header = await reader.readexactly(5)
+    kind, length = header[:1], struct.unpack(">I", header[1:])[0]
+    return kind, await reader.readexactly(length)
+
+
+def write_message(writer: asyncio.StreamWriter, kind: bytes, payload: bytes = b""):
+    writer.write(kind + struct.pack(">I", len(payload)) + payload)
+
+
+class SocketTransport(AudioTransport):
+    """
+    Simulated telephony media stream over TCP (see MSG_* kinds)
+
+    Caller audio may arrive in any packet size and is re-cut into
+    FRAME_MS frames. Bot clips are sent whole and paced at their
+    duration, as a phone line would play them.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self._buffer = b""
+        self._hung_up = False
+
+    async def read_frame(self) -> Optional[bytes]:
+        while len(self._buffer) < FRAME_BYTES:
+            if self._hung_up:
+                return None
+            try:
+                kind, payload = await read_message(self.reader)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                self._hung_up = True
+                return None
+            if kind == MSG_HANGUP:
+                self._hung_up = True
+                return None
+            if kind == MSG_AUDIO:
+                self._buffer += payload
+        frame, self._buffer = self._buffer[:FRAME_BYTES], self._buffer[FRAME_BYTES:]
+        return frame
+
+    async def play(self, audio: bytes) -> float:
+        if self._hung_up:
+            return 0.0
+        write_message(self.writer, MSG_PLAY, audio)
+        await self.writer.drain()
+        await asyncio.sleep(clip_seconds(audio))
+        return 1.0
+
+    def flush_input(self):
+        self._buffer = b""
+
+    async def close(self):
+        try:
+            if not self._hung_up:
+                write_message(self.writer, MSG_HANGUP)
+                await self.writer.drain()
+            self.writer.close()
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+class CallSession:
+    """One qualification call: greeting, listen/respond turns, JSON capture and storage"""
+
+    def __init__(self, transport: AudioTransport, speech: AsyncSpeechServices,
+                 lead_name: str = "", company_name: str = "", db_manager=None,
+                 session_id: Optional[str] = None, listen_timeout: float = LISTEN_TIMEOUT,
+                 verbose: bool = True):
+        """
+        Args:
+            transport: Audio source and sink for this call
+            speech: Shared async STT/LLM/TTS clients
+            lead_name: Lead name for the prompt and greeting
+            company_name: Company name for the prompt
+            db_manager: MongoDBManager or WriteBehindQueue for storing the lead (None to skip storage)
+            session_id: Identifier for logs (random if omitted)
+            listen_timeout: Seconds to wait for the caller to start speaking
+            verbose: Log every turn (errors and the call summary are always logged)
+        """
+        self.transport = transport
+        self.speech = speech
+        self.lead_name = lead_name
+        self.company_name = company_name
+        self.db_manager = db_manager
+        self.session_id = session_id or uuid.uuid4().hex[:8]
+        self.listen_timeout = listen_timeout
+        self.verbose = verbose
+
+        self.history = [{"role": "system", "content": load_system_prompt(lead_name, company_name)}]
+        # Streamed to a temp file as the call goes (caller left, bot right); uploaded with the lead, then deleted
+        self.recorder = CallRecorder(sample_rate=SAMPLE_RATE)
+        self.lead_data: Optional[Dict] = None
+        self.ended_reason = None
+        self.turns = 0
+        self.trace = CallTrace(self.session_id, lead_name=lead_name, transport=type(transport).__name__)
+
+    def log(self, message: str, always: bool = False):
+        if self.verbose or always:
+            print(f"[Call {self.session_id}] {message}")
+
+    async def run(self) -> Optional[Dict]:
+        """Run the call to completion and return the qualification data (if captured)"""
+        try:
+            if self.lead_name:
+                opening_text = f"Hello, I am Priya. Am I speaking with {self.lead_name}?"
+            else:
+                opening_text = "Hello, I am Priya. May I know who I am speaking with?"
+            self.log(f"Bot: {opening_text}")
+            await self._speak(self._single(opening_text))
+            self._add_message("assistant", opening_text)
+
+            while True:
+                user_message = await self._listen()
+                if not user_message:
+                    self.ended_reason = self.ended_reason or "no_response"
+                    break
+                self.log(f"Caller: {user_message}")
+                if any(word in user_message.lower() for word in EXIT_PHRASES):
+                    self.ended_reason = "caller_ended"
+                    break
+
+                self._add_message("user", user_message)
+                self.turns += 1
+
+                response = await self._speak(self._timed_reply())
+                self.log(f"Bot: {response.strip()}")
+
+                if is_json_output(response.strip()):
+                    await self._store(response.strip())
+                    self.ended_reason = "qualified"
+                    break
+                self._add_message("assistant", response)
+        except Exception as e:
+            self.ended_reason = f"error: {e}"
+            self.log(f"Error: {e}", always=True)
+        finally:
+            await self.transport.close()
+            await asyncio.to_thread(self.recorder.discard)
+
+        self.trace.finish(call_outcome=self.ended_reason)
+        if self.ended_reason != "qualified" and self.db_manager is not None:
+            await asyncio.to_thread(self.db_manager.store_conversation, self.lead_name, self.history,
+                                    self.ended_reason, self.trace.to_dict())
+        if CALL_TRACE_EXPORT:
+            await asyncio.to_thread(self.trace.export)
+
+        self.log(f"Ended ({self.ended_reason}) after {self.turns} turns", always=True)
+        return self.lead_data
+
+    def _add_message(self, role: str, content: str):
+        """Append to the history and index where the message is in the recording"""
+        self.recorder.add_utterance(role, content, message_index=len(self.history))
+        self.history.append({"role": role, "content": content})
+
+    @staticmethod
+    async def _single(text: str) -> AsyncIterator[str]:
+        yield text
+
+    async def _timed_reply(self) -> AsyncIterator[str]:
+        """The LLM reply stream with first-token and total time recorded"""
+        llm_span = self.trace.start_span(STAGE_LLM, model=GROQ_MODEL)
+        chars = 0
+        try:
+            async for token in self.speech.stream_reply(self.history):
+                if not chars:
+                    self.trace.record(STAGE_LLM_FIRST_TOKEN, llm_span.start_ns)
+                chars += len(token)
+                yield token
+        finally:
+            llm_span.end(chars=chars)
+
+    async def _listen(self) -> str:
+        """Capture one caller utterance (frame-level endpointing) and transcribe it"""
+        self.transport.flush_input()
+        endpointer = Endpointer(sample_rate=SAMPLE_RATE)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.listen_timeout
+        wait_start = CallTrace.now()
+        speech_start = None
+        speech_deadline = None
+
+        # Recorder writes hit the disk; keep them off the event loop shared by every
+        # call, batched so each call makes one thread hop per RECORD_BATCH_FRAMES
+        unrecorded = []
+        unrecorded_at = None
+
+        async def record():
+            if unrecorded:
+                await asyncio.to_thread(self.recorder.write, b"".join(unrecorded), at=unrecorded_at)
+                unrecorded.clear()
+
+        try:
+            while True:
+                # The turn is bounded too, so a stalled stream cannot hold it open
+                remaining = (speech_deadline if endpointer.in_speech else deadline) - loop.time()
+                try:
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError
+                    frame = await asyncio.wait_for(self.transport.read_frame(), remaining)
+                except asyncio.TimeoutError:
+                    if not endpointer.in_speech:
+                        return ""
+                    break  # Past the longest turn: transcribe what was heard
+                if frame is None:
+                    self.ended_reason = "hangup"
+                    if not endpointer.in_speech:
+                        return ""
+                    break
+
+                if not unrecorded:
+                    unrecorded_at = time.monotonic() - FRAME_MS / 1000.0
+                unrecorded.append(frame)
+                if len(unrecorded) >= RECORD_BATCH_FRAMES:
+                    await record()
+                event = endpointer.process(frame)
+                if event == SPEECH_START:
+                    # The start fires after start_frames of voiced audio
+                    speech_start = CallTrace.now() - endpointer.start_frames * FRAME_MS * 1000000
+                    speech_deadline = loop.time() + VAD_MAX_UTTERANCE_MS / 1000.0
+                    self.trace.begin_turn()
+                    self.trace.record(STAGE_LISTEN_WAIT, min(wait_start, speech_start), speech_start)
+                elif event == SPEECH_END:
+                    # The caller stopped talking one hangover ago; the reply gap counts from there
+                    endpoint_at = CallTrace.now()
+                    speech_end = endpoint_at - endpointer.hangover_frames * FRAME_MS * 1000000
+                    self.trace.record(STAGE_LISTEN_SPEECH, speech_start, speech_end)
+                    self.trace.record(STAGE_VAD_ENDPOINT, speech_end, endpoint_at,
+                                      hangover_ms=endpointer.hangover_frames * FRAME_MS)
+                    self.trace.mark(MARK_SPEECH_END, speech_end)
+                    self.recorder.mark_speech(CALLER, speech_start / 1e9, speech_end / 1e9)
+                    break
+        finally:
+            await record()
+
+        with self.trace.span(STAGE_STT, mode="rest") as stt_span:
+            transcript = await self.speech.transcribe(b"".join(endpointer.utterance))
+            stt_span.set(chars=len(transcript))
+        return transcript
+
+    async def _speak(self, tokens: AsyncIterator[str]) -> str:
+        """
+        Speak a token stream sentence by sentence and return the full text
+
+        Synthesis runs up to TTS_WORKERS sentences ahead; playback stays in order.
+        """
+        playback = asyncio.Queue()
+        limit = asyncio.Semaphore(TTS_WORKERS)
+
+        async def synthesize(sentence: str) -> bytes:
+            async with limit:
+                with self.trace.span(STAGE_TTS, chars=len(sentence)):
+                    return await self.speech.synthesize(sentence)
+
+        async def play_in_order():
+            while True:
+                task = await playback.get()
+                if task is None:
+                    return
+                try:
+                    audio = await task
+                    # The first clip after the caller's utterance closes the response gap
+                    self.trace.record_since(MARK_SPEECH_END, STAGE_RESPONSE_GAP)
+                    started = time.monotonic()
+                    with self.trace.span(STAGE_PLAYBACK) as playback_span:
+                        fraction = await self.transport.play(audio)
+                        playback_span.set(fraction=round(fraction, 3))
+                    try:
+                        await asyncio.to_thread(self.recorder.write_clip, audio, BOT, at=started, fraction=fraction)
+                        self.recorder.mark_speech(BOT, started, time.monotonic())
+                    except ValueError:
+                        pass
+                except Exception as e:
+                    self.log(f"Audio error: {e}", always=True)
+
+        def queue_sentences(sentences):
+            for sentence in sentences:
+                clean_sentence = clean_text_for_tts(sentence)
+                if clean_sentence:
+                    playback.put_nowait(asyncio.create_task(synthesize(clean_sentence)))
+
+        player = asyncio.create_task(play_in_order())
+        chunker = SentenceChunker()
+        full_text = ""
+        try:
+            async for token in tokens:
+                full_text += token
+                queue_sentences(chunker.feed(token))
+            queue_sentences(chunker.flush())
+        finally:
+            playback.put_nowait(None)
+            await player
+        return full_text
+
+    async def _store(self, response: str):
+        """Store the lead with this call's history and recording (off the event loop)"""
+        json_data = extract_json(response)
+        if json_data is None:
+            return
+        json_data.setdefault("lead_name", self.lead_name or "unknown_lead")
+        self.lead_data = json_data
+        self.trace.finish(call_outcome="qualified")
+        if self.db_manager is None:
+            self.log(f"Qualification captured (not stored): {json.dumps(json_data)}")
+            return
+        await asyncio.to_thread(self._store_blocking, json_data)
+
+    def _store_blocking(self, json_data: Dict):
+        try:
+            # The recording is already on disk; closing only finalizes the header
+            recording_path = self.recorder.close() if self.recorder.duration_seconds > 0 else None
+            self.db_manager.store_lead(json_data, self.history, recording_path, trace=self.trace.to_dict(),
+                                       recording_index=self.recorder.index if recording_path else None)
+            self.log(f"Data stored in MongoDB for {json_data['lead_name']}")
+        except Exception as e:
+            self.log(f"Storage error: {e}", always=True)
+
+
+class CallEngine:
+    """Runs CallSessions concurrently on one event loop"""
+
+    def __init__(self, speech: Optional[AsyncSpeechServices] = None, db_manager=None,
+                 max_concurrent_calls: int = MAX_CONCURRENT_CALLS):
+        self.speech = speech or AsyncSpeechServices()
+        self.db_manager = db_manager
+        self._slots = asyncio.Semaphore(max_concurrent_calls)
+        self.active_calls = 0
+
+    async def run_call(self, transport: AudioTransport, lead_name: str = "",
+                       company_name: str = "", **session_kwargs) -> CallSession:
+        """Run one call (waits for a free slot) and return the finished session"""
+        async with self._slots:
+            session = CallSession(transport, self.speech, lead_name, company_name,
+                                  db_manager=self.db_manager, **session_kwargs)
+            self.active_calls += 1
+            try:
+                await session.run()
+            finally:
+                self.active_calls -= 1
+            return session
+
+    async def handle_socket(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve one simulated telephony connection (first message must be MSG_START)"""
+        try:
+            kind, payload = await read_message(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        if kind != MSG_START:
+            writer.close()
+            return
+        try:
+            details = json.loads(payload or b"{}")
+        except ValueError:
+            details = None
+        if not isinstance(details, dict):
+            print("[Call engine: dropped a connection with a malformed start message]")
+            writer.close()
+            return
+        await self.run_call(SocketTransport(reader, writer),
+                            details.get("lead_name", ""), details.get("company_name", ""))
+
+    async def serve(self, host: str = "0.0.0.0", port: int = DEFAULT_SOCKET_PORT):
+        """Accept simulated telephony calls until cancelled"""
+        server = await asyncio.start_server(self.handle_socket, host, port)
+        print(f"[Call engine listening on {host}:{port}]")
+        async with server:
+            await server.serve_forever()
+
+    async def close(self):
+        await self.speech.close()
+        if self.db_manager is not None:
+            await asyncio.to_thread(self.db_manager.close)
+
+
+async def dial(host: str, port: int, lead_name: str, company_name: str, wav_path: str,
+               realtime: bool = True) -> Dict:
+    """
+    Simulated caller: stream a WAV file to an engine socket and collect the bot's clips
+
+    The file is sent in FRAME_MS packets; the bot's clips are only counted,
+    not played.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    write_message(writer, MSG_START, json.dumps({"lead_name": lead_name, "company_name": company_name}).encode())
+
+    with wave.open(wav_path, "rb") as wf:
+        pcm = wf.readframes(wf.getnframes())
+
+    received = {"clips": 0, "audio_seconds": 0.0}
+
+    async def receive():
+        while True:
+            try:
+                kind, payload = await read_message(reader)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return
+            if kind == MSG_PLAY:
+                received["clips"] += 1
+                received["audio_seconds"] += clip_seconds(payload)
+            elif kind == MSG_HANGUP:
+                return
+
+    receiver = asyncio.create_task(receive())
+    for start in range(0, len(pcm), FRAME_BYTES):
+        if receiver.done():
+            break
+        write_message(writer, MSG_AUDIO, pcm[start:start + FRAME_BYTES])
+        await writer.drain()
+        if realtime:
+            await asyncio.sleep(FRAME_MS / 1000.0)
+
+    if not receiver.done():
+        write_message(writer, MSG_HANGUP)
+        await writer.drain()
+    await receiver
+    writer.close()
+    return received
+
+
+def _open_db_manager():
+    """
+    Storage for finished calls if the database is configured, else None (leads are logged, not stored)
+
+    With WRITE_BEHIND (default) writes are journaled and applied in the
+    background, so calls still end quickly while MongoDB is unreachable.
+    """
+    from write_behind import WRITE_BEHIND, WriteBehindQueue
+    try:
+        from database import MongoDBManager
+        if WRITE_BEHIND and os.getenv("MONGODB_URI"):
+            return WriteBehindQueue(MongoDBManager)
+        return MongoDBManager()
+    except Exception as e:
+        print(f"[MongoDB unavailable, leads will not be stored: {e}]")
+        return None
+
+
+async def _run_files(lead_name: str, company_name: str, paths: List[str]):
+    engine = CallEngine(db_manager=_open_db_manager())
+    start = time.monotonic()
+    sessions = await asyncio.gather(*[
+        engine.run_call(WavFileTransport(path), lead_name, company_name, session_id=f"file{i}")
+        for i, path in enumerate(paths)
+    ])
+    await engine.close()
+    qualified = sum(1 for session in sessions if session.lead_data)
+    print(f"[{len(sessions)} calls finished in {time.monotonic() - start:.1f}s, {qualified} qualified]")
+
+
+async def _run_serve(port: int):
+    engine = CallEngine(db_manager=_open_db_manager())
+    try:
+        await engine.serve(port=port)
+    finally:
+        await engine.close()
+
+
+async def _run_mic(lead_name: str, company_name: str):
+    engine = CallEngine(db_manager=_open_db_manager())
+    await engine.run_call(MicTransport(), lead_name, company_name)
+    await engine.close()
+
+
+async def _run_dial(address: str, lead_name: str, company_name: str, wav_path: str):
+    host, port = address.rsplit(":", 1)
+    received = await dial(host, int(port), lead_name, company_name, wav_path)
+    print(f"[Call finished: {received['clips']} bot clips, {received['audio_seconds']:.1f}s of bot audio]")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    args = sys.argv[2:]
+
+    if command == "files" and len(args) >= 3:
+        asyncio.run(_run_files(args[0], args[1], args[2:]))
+    elif command == "serve":
+        asyncio.run(_run_serve(int(args[0]) if args else DEFAULT_SOCKET_PORT))
+    elif command == "dial" and len(args) == 4:
+        asyncio.run(_run_dial(*args))
+    elif command == "mic" and len(args) == 2:
+        asyncio.run(_run_mic(*args))
+    else:
+        print("Usage:" + __doc__.split("Usage:")[1].rstrip())
+        sys.exit(1)
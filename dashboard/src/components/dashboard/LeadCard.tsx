@@ -1,12 +1,12 @@
 import { format } from "date-fns";
 import { ChevronRight } from "lucide-react";
 import { Card, CardContent } from "@/components/ui/card";
-import { Lead, CallOutcome } from "@/types/lead";
+import { LeadSummary, CallOutcome } from "@/types/lead";
 import StatusBadge from "./StatusBadge";
 import { cn } from "@/lib/utils";
 
 interface LeadCardProps {
-  lead: Lead;
+  lead: LeadSummary;
   onClick: () => void;
 }
 
@@ -1,103 +1,122 @@
-import { useState, useMemo, useEffect } from "react";
+import { useState, useEffect, useCallback } from "react";
 import { Phone, Target, CalendarDays } from "lucide-react";
-import { isToday, subDays, isAfter } from "date-fns";
 import MetricCard from "@/components/dashboard/MetricCard";
 import LeadCard from "@/components/dashboard/LeadCard";
 import LeadDetailPanel from "@/components/dashboard/LeadDetailPanel";
 import FilterBar from "@/components/dashboard/FilterBar";
 import DateRangeSelector, { DateRange } from "@/components/dashboard/DateRangeSelector";
 import EmptyState from "@/components/dashboard/EmptyState";
-import { Lead, CallOutcome } from "@/types/lead";
+import { Button } from "@/components/ui/button";
+import { Lead, LeadSummary, CallOutcome } from "@/types/lead";
+import { apiService, ApiMetrics, LeadsQueryParams } from "@/services/api";
 
-const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:5000/api';
+const PAGE_SIZE = 50;
+const SEARCH_DEBOUNCE_MS = 250;
 
 const Index = () => {
   const [dateRange, setDateRange] = useState<DateRange>("all");
   const [searchQuery, setSearchQuery] = useState("");
+  const [debouncedSearch, setDebouncedSearch] = useState("");
   const [statusFilter, setStatusFilter] = useState<CallOutcome | "all">("all");
   const [sortOrder, setSortOrder] = useState<"newest" | "oldest" | "name">("newest");
   const [selectedLead, setSelectedLead] = useState<Lead | null>(null);
-  const [leads, setLeads] = useState<Lead[]>([]);
+  const [leads, setLeads] = useState<LeadSummary[]>([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [metrics, setMetrics] = useState<Pick<ApiMetrics, "totalCalls" | "successRate" | "todaysCalls">>({
+    totalCalls: 0,
+    successRate: 0,
+    todaysCalls: 0,
+  });
+
+  const buildLeadsQuery = useCallback(
+    (cursor?: string): LeadsQueryParams => ({
+      date_range: dateRange,
+      sort: sortOrder,
+      status: statusFilter !== "all" ? (statusFilter as LeadsQueryParams["status"]) : undefined,
+      search: debouncedSearch || undefined,
+      limit: PAGE_SIZE,
+      cursor,
+      view: "summary",
+    }),
+    [dateRange, statusFilter, debouncedSearch, sortOrder]
+  );
+
+  // Only query the server once typing pauses
+  useEffect(() => {
+    const timer = setTimeout(() => setDebouncedSearch(searchQuery.trim()), SEARCH_DEBOUNCE_MS);
+    return () => clearTimeout(timer);
+  }, [searchQuery]);
 
-  // Fetch leads from API
+  // Fetch first page of leads from API
   useEffect(() => {
+    let cancelled = false;
+
     const loadLeads = async () => {
       try {
         setLoading(true);
-        const params = new URLSearchParams({
-          date_range: dateRange,
-          sort: sortOrder,
-        });
-        if (statusFilter !== "all") params.append('status', statusFilter);
-        if (searchQuery) params.append('search', searchQuery);
-        
-        const response = await fetch(`${API_URL}/leads?${params}`);
-        const data = await response.json();
-        setLeads(data);
+        const page = await apiService.fetchLeads(buildLeadsQuery());
+        if (cancelled) return;
+        setLeads(page.leads);
+        setNextCursor(page.next_cursor);
       } catch (error) {
         console.error("Failed to fetch leads:", error);
+        if (cancelled) return;
         setLeads([]);
+        setNextCursor(null);
       } finally {
-        setLoading(false);
+        if (!cancelled) setLoading(false);
       }
     };
 
     loadLeads();
-  }, [dateRange, statusFilter, searchQuery, sortOrder]);
-
-  // Filter by date range (already done server-side, but kept for consistency)
-  const dateFilteredLeads = useMemo(() => {
-    return leads;
-  }, [leads]);
-
-  // Calculate metrics
-  const metrics = useMemo(() => {
-    const totalCalls = dateFilteredLeads.length;
-    const qualifiedCalls = dateFilteredLeads.filter(
-      (lead) => lead.call_metadata.call_outcome === "qualified"
-    ).length;
-    const successRate = totalCalls > 0 ? Math.round((qualifiedCalls / totalCalls) * 100) : 0;
-    const todaysCalls = dateFilteredLeads.filter((lead) =>
-      isToday(new Date(lead.call_metadata.timestamp))
-    ).length;
-
-    return { totalCalls, successRate, todaysCalls };
-  }, [dateFilteredLeads]);
-
-  // Filter and sort leads
-  const filteredLeads = useMemo(() => {
-    let leads = [...dateFilteredLeads];
-
-    // Search filter
-    if (searchQuery) {
-      const query = searchQuery.toLowerCase();
-      leads = leads.filter(
-        (lead) =>
-          lead.lead_name.toLowerCase().includes(query) ||
-          lead.company_name.toLowerCase().includes(query)
-      );
+    return () => {
+      cancelled = true;
+    };
+  }, [buildLeadsQuery]);
+
+  // Append the next page using the cursor from the previous response.
+  // Leads render in server order: the server owns sort and filter, so
+  // re-sorting client-side would reorder rows as pages are appended.
+  const handleLoadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const page = await apiService.fetchLeads(buildLeadsQuery(nextCursor));
+      setLeads((prev) => [...prev, ...page.leads]);
+      setNextCursor(page.next_cursor);
+    } catch (error) {
+      console.error("Failed to fetch more leads:", error);
+    } finally {
+      setLoadingMore(false);
     }
+  };
 
-    // Status filter
-    if (statusFilter !== "all") {
-      leads = leads.filter(
-        (lead) => lead.call_metadata.call_outcome === statusFilter
-      );
+  // Load the full lead (transcript, requirements) only when a card is opened
+  const handleSelectLead = async (lead: LeadSummary) => {
+    try {
+      setSelectedLead(await apiService.fetchLeadById(lead.id));
+    } catch (error) {
+      console.error("Failed to fetch lead details:", error);
     }
+  };
 
-    // Sort
-    leads.sort((a, b) => {
-      if (sortOrder === "name") {
-        return a.lead_name.localeCompare(b.lead_name);
-      }
-      const dateA = new Date(a.call_metadata.timestamp).getTime();
-      const dateB = new Date(b.call_metadata.timestamp).getTime();
-      return sortOrder === "newest" ? dateB - dateA : dateA - dateB;
-    });
+  // Metrics are aggregated server-side for the selected date range
+  useEffect(() => {
+    let cancelled = false;
 
-    return leads;
-  }, [dateFilteredLeads, searchQuery, statusFilter, sortOrder]);
+    apiService
+      .fetchMetrics(dateRange)
+      .then((data) => {
+        if (!cancelled) setMetrics(data);
+      })
+      .catch((error) => console.error("Failed to fetch metrics:", error));
+
+    return () => {
+      cancelled = true;
+    };
+  }, [dateRange]);
 
   const hasActiveFilters = searchQuery !== "" || statusFilter !== "all" || sortOrder !== "newest";
 
@@ -163,7 +182,7 @@ const Index = () => {
         <section>
           {loading ? (
             <div className="text-center py-12 text-muted-foreground">Loading leads...</div>
-          ) : filteredLeads.length === 0 ? (
+          ) : leads.length === 0 ? (
             <EmptyState
               title={hasActiveFilters ? "No leads match your filters" : "No calls recorded yet"}
               description={
@@ -174,13 +193,23 @@ const Index = () => {
             />
           ) : (
             <div className="grid gap-3">
-              {filteredLeads.map((lead) => (
+              {leads.map((lead) => (
                 <LeadCard
                   key={lead.id}
                   lead={lead}
-                  onClick={() => setSelectedLead(lead)}
+                  onClick={() => handleSelectLead(lead)}
                 />
               ))}
+              {nextCursor && (
+                <Button
+                  variant="outline"
+                  onClick={handleLoadMore}
+                  disabled={loadingMore}
+                  className="mt-2 justify-self-center"
+                >
+                  {loadingMore ? "Loading..." : "Load more"}
+                </Button>
+              )}
             </div>
           )}
         </section>
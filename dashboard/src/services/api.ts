@@ -1,5 +1,8 @@
 // API service for connecting to Python backend
+import { Lead, LeadSummary } from '@/types/lead';
+
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:5000/api';
+const MAX_ETAG_ENTRIES = 100;
 
 export interface ApiLead {
   id: string;
@@ -39,6 +42,9 @@ export interface ApiMetrics {
   totalCalls: number;
   successRate: number;
   todaysCalls: number;
+  outcomeBreakdown: Record<string, number>;
+  avgDurationSeconds: number;
+  executiveAssignments: Record<string, number>;
 }
 
 export interface LeadsQueryParams {
@@ -46,48 +52,71 @@ export interface LeadsQueryParams {
   status?: 'qualified' | 'not_interested' | 'reschedule' | 'wrong_contact' | 'all';
   search?: string;
   sort?: 'newest' | 'oldest' | 'name';
+  limit?: number;
+  cursor?: string;
+  view?: 'summary' | 'full';
+}
+
+export interface LeadsPage {
+  leads: LeadSummary[];
+  next_cursor: string | null;
 }
 
 class ApiService {
   private baseUrl: string;
+  // Last response body and ETag per URL, revalidated with If-None-Match
+  private etagCache = new Map<string, { etag: string; data: unknown }>();
 
   constructor() {
     this.baseUrl = API_BASE_URL;
   }
 
-  async fetchLeads(params: LeadsQueryParams = {}): Promise<ApiLead[]> {
+  private async getJson<T>(url: string, errorPrefix: string): Promise<T> {
+    const cached = this.etagCache.get(url);
+    const response = await fetch(url, {
+      headers: cached ? { 'If-None-Match': cached.etag } : undefined,
+    });
+
+    if (response.status === 304 && cached) {
+      return cached.data as T;
+    }
+    if (!response.ok) {
+      throw new Error(`${errorPrefix}: ${response.statusText}`);
+    }
+
+    const data = await response.json();
+    const etag = response.headers.get('ETag');
+    if (etag) {
+      this.etagCache.delete(url);
+      this.etagCache.set(url, { etag, data });
+      if (this.etagCache.size > MAX_ETAG_ENTRIES) {
+        // Maps iterate in insertion order, so the first key is the oldest
+        this.etagCache.delete(this.etagCache.keys().next().value as string);
+      }
+    }
+    return data as T;
+  }
+
+  async fetchLeads(params: LeadsQueryParams = {}): Promise<LeadsPage> {
     const queryString = new URLSearchParams(
-      Object.entries(params).filter(([_, v]) => v != null) as [string, string][]
+      Object.entries(params)
+        .filter(([_, v]) => v != null)
+        .map(([k, v]) => [k, String(v)])
     ).toString();
 
     const url = `${this.baseUrl}/leads${queryString ? `?${queryString}` : ''}`;
-    
-    const response = await fetch(url);
-    if (!response.ok) {
-      throw new Error(`Failed to fetch leads: ${response.statusText}`);
-    }
-    
-    return response.json();
+
+    return this.getJson<LeadsPage>(url, 'Failed to fetch leads');
   }
 
-  async fetchLeadById(id: string): Promise<ApiLead> {
-    const response = await fetch(`${this.baseUrl}/leads/${id}`);
-    if (!response.ok) {
-      throw new Error(`Failed to fetch lead: ${response.statusText}`);
-    }
-    
-    return response.json();
+  async fetchLeadById(id: string): Promise<Lead> {
+    return this.getJson<Lead>(`${this.baseUrl}/leads/${id}`, 'Failed to fetch lead');
   }
 
   async fetchMetrics(dateRange: '7days' | '30days' | 'all' = 'all'): Promise<ApiMetrics> {
     const url = `${this.baseUrl}/metrics?date_range=${dateRange}`;
-    
-    const response = await fetch(url);
-    if (!response.ok) {
-      throw new Error(`Failed to fetch metrics: ${response.statusText}`);
-    }
-    
-    return response.json();
+
+    return this.getJson<ApiMetrics>(url, 'Failed to fetch metrics');
   }
 
   getAudioUrl(recordingId: string | null): string | null {
@@ -33,3 +33,12 @@ export interface Lead {
 }
 
 export type CallOutcome = Lead["call_metadata"]["call_outcome"];
+
+// Lightweight lead returned by /api/leads?view=summary
+export interface LeadSummary {
+  id: string;
+  lead_name: string;
+  company_name: string;
+  call_metadata: Pick<Lead["call_metadata"], "timestamp" | "call_outcome">;
+  status: string;
+}
@@ -3,16 +3,215 @@ MongoDB Database Manager for SquadStack Sales Bot
 Handles lead data storage, conversation logging, and call scheduling
 """
 
+import itertools
+import json
 import os
+import re
+import sys
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, OperationFailure
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import MongoClient, ASCENDING, DESCENDING, InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, ConnectionFailure, DuplicateKeyError, OperationFailure
 import gridfs
 from dotenv import load_dotenv
+from audio_codec import encode_recording
 
 load_dotenv()
 
+# Longest prefix stored per word in search_tokens
+SEARCH_PREFIX_MAX = 15
+
+# Marker for phonetic (fuzzy) keys in search_tokens
+PHONETIC_MARKER = "~"
+
+# Shortest typed word matched phonetically; shorter words are usually prefixes
+# still being typed ("ram" -> R500 would match Ronnie and Ramon)
+PHONETIC_MIN_LENGTH = 4
+
+# _id of the all-time document in the metrics rollup collection
+ROLLUP_ALL_TIME_ID = "all"
+
+# _id of the marker written by rebuild_metrics_rollups; until it exists the
+# rollups only hold calls stored since deploy and are not used for reads
+ROLLUP_META_ID = "meta"
+
+# Trailing digits of a phone number used as its identity (drops country/trunk prefixes)
+PHONE_IDENTITY_DIGITS = 10
+# Shorter digit strings are placeholders ("N/A", extensions), not phone numbers
+PHONE_IDENTITY_MIN_DIGITS = 7
+
+_EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+# Leads per bulk_write round trip and concurrent GridFS uploads in bulk_store_leads
+BULK_BATCH_SIZE = 500
+BULK_UPLOAD_WORKERS = 4
+
+# Server error code for a unique index violation
+DUPLICATE_KEY_ERROR = 11000
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6"
+}
+
+def _search_words(text: str) -> List[str]:
+    """Lowercase, strip accents and split into alphanumeric words"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+def _soundex(word: str) -> str:
+    """American Soundex code, used as the fuzzy key for a name (Raahul -> R400)"""
+    letters = [c for c in word if c.isalpha()]
+    if not letters:
+        return ""
+    
+    code = letters[0].upper()
+    last = _SOUNDEX_CODES.get(letters[0], "")
+    for c in letters[1:]:
+        digit = _SOUNDEX_CODES.get(c, "")
+        if digit and digit != last:
+            code += digit
+        if c not in "hw":
+            last = digit
+    return (code + "000")[:4]
+
+def build_search_tokens(*values: str) -> List[str]:
+    """
+    Build the search_tokens array stored on each lead
+    
+    Every word contributes its prefixes (up to SEARCH_PREFIX_MAX chars),
+    the full word and a phonetic key, so prefix and fuzzy lookups are
+    exact matches on a multikey index
+    """
+    tokens = set()
+    for value in values:
+        for word in _search_words(value):
+            tokens.update(word[:i] for i in range(1, min(len(word), SEARCH_PREFIX_MAX) + 1))
+            tokens.add(word)
+            if len(word) >= 2 and word[0].isalpha():
+                tokens.add(PHONETIC_MARKER + _soundex(word))
+    return sorted(tokens)
+
+def build_search_query(search: str, phonetic: bool = True) -> Optional[Dict]:
+    """
+    Build a leads filter for free-text search input
+    
+    Each word must match a stored prefix or, for words of PHONETIC_MIN_LENGTH+
+    letters, the phonetic key. User input is reduced to alphanumeric words, so
+    it never reaches the database as a regex or operator.
+    
+    Args:
+        search: Text typed into the search box
+        phonetic: Also accept phonetic matches (False for exact prefixes only)
+    
+    Returns:
+        Mongo filter dict, or None if the input has no searchable words
+    """
+    clauses = []
+    for word in _search_words(search):
+        candidates = [word[:SEARCH_PREFIX_MAX]]
+        if phonetic and len(word) >= PHONETIC_MIN_LENGTH and word[0].isalpha():
+            candidates.append(PHONETIC_MARKER + _soundex(word))
+        clauses.append({"search_tokens": {"$in": candidates}})
+    
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+def build_search_tiers(search: str) -> List[Dict]:
+    """
+    Leads filters for free-text search, best matches first
+    
+    The first tier matches every word as a prefix; the second (if any word
+    is long enough to match phonetically) holds the remaining phonetic-only
+    matches, so exact prefix hits always list before fuzzy ones.
+    
+    Returns:
+        Non-overlapping Mongo filters, or [] if the input has no searchable words
+    """
+    exact = build_search_query(search, phonetic=False)
+    if exact is None:
+        return []
+    fuzzy = build_search_query(search)
+    if fuzzy == exact:
+        return [exact]
+    return [exact, {"$and": [fuzzy, {"$nor": [exact]}]}]
+
+def normalize_phone(value) -> str:
+    """Phone number reduced to its last PHONE_IDENTITY_DIGITS digits, or "" if it is not one"""
+    digits = re.sub(r"\D", "", str(value or ""))
+    if len(digits) < PHONE_IDENTITY_MIN_DIGITS:
+        return ""
+    return digits[-PHONE_IDENTITY_DIGITS:]
+
+def normalize_email(value) -> str:
+    """Lower-cased email address, or "" if the value is not one"""
+    email = str(value or "").strip().lower()
+    return email if _EMAIL_PATTERN.match(email) else ""
+
+def rollup_key(value: str) -> str:
+    """Make a value safe to use as a field name inside a rollup document"""
+    return str(value or "unknown").replace(".", "_").replace("$", "_")
+
+def build_identity_keys(lead_data: Dict) -> List[str]:
+    """
+    Identity keys for a lead, strongest first: phone, WhatsApp number, then email
+    
+    A lead stores every key it has been seen with (identity_keys), so a later
+    call that gives only the phone or only the email still finds it.
+    """
+    keys = []
+    for field in ("phone_number", "whatsapp_number"):
+        phone = normalize_phone(lead_data.get(field))
+        if phone and f"phone:{phone}" not in keys:
+            keys.append(f"phone:{phone}")
+    email = normalize_email(lead_data.get("email"))
+    if email:
+        keys.append(f"email:{email}")
+    return keys
+
+def read_lead_records(path: str) -> Iterator[Dict]:
+    """
+    Stream lead records from a JSONL file ("-" for stdin) for bulk_store_leads
+    
+    Blank lines are skipped; lines that are not JSON objects are reported and skipped.
+    """
+    source = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        for line_number, line in enumerate(source, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                print(f"[Import: skipping line {line_number}: {e}]")
+                continue
+            if not isinstance(record, dict):
+                print(f"[Import: skipping line {line_number}: not a JSON object]")
+                continue
+            yield record
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+def _import_leads(db_manager: "MongoDBManager", args: List[str]) -> Dict:
+    """python database.py import <file.jsonl|-> [batch_size] [upload_workers]"""
+    if not args:
+        print("Usage: python database.py import <file.jsonl|-> [batch_size] [upload_workers]")
+        sys.exit(1)
+    batch_size = int(args[1]) if len(args) > 1 else BULK_BATCH_SIZE
+    upload_workers = int(args[2]) if len(args) > 2 else BULK_UPLOAD_WORKERS
+    return db_manager.bulk_store_leads(read_lead_records(args[0]), batch_size, upload_workers)
+
 class MongoDBManager:
     """Manages MongoDB Atlas connection and operations"""
     
@@ -40,6 +239,12 @@ class MongoDBManager:
             self.leads_collection = self.db["leads"]
             self.conversations_collection = self.db["conversations"]
             self.scheduled_calls_collection = self.db["scheduled_calls"]
+            # Daily call metrics maintained with $inc on every stored lead
+            self.metrics_collection = self.db["metrics_daily"]
+            # Counters shared across processes (leads data version for API caching)
+            self.meta_collection = self.db["meta"]
+            # Append-only record of every call with a lead (history, trace, recording index)
+            self.lead_calls_collection = self.db["lead_calls"]
             
             # GridFS for storing audio recordings
             self.fs = gridfs.GridFS(self.db)
@@ -50,6 +255,9 @@ class MongoDBManager:
             # Initialize calendar manager (lazy import to avoid circular dependency)
             self.calendar_manager = None
             
+            # Callbacks run after every lead write (e.g. API cache invalidation)
+            self._write_listeners = []
+            
         except (ConnectionFailure, OperationFailure) as e:
             print(f"[MongoDB Connection Failed: {e}]")
             raise
@@ -66,99 +274,202 @@ class MongoDBManager:
                 # Continue without calendar integration
         return self.calendar_manager
     
+    def add_write_listener(self, callback):
+        """Register a no-argument callback to run after leads are written"""
+        self._write_listeners.append(callback)
+    
+    def get_data_version(self) -> int:
+        """Current leads data version, bumped by every lead write from any process"""
+        doc = self.meta_collection.find_one({"_id": "leads_version"}, {"version": 1})
+        return doc.get("version", 0) if doc else 0
+    
+    def _notify_write(self):
+        """Bump the leads data version and run write listeners; never breaks a store"""
+        try:
+            self.meta_collection.update_one(
+                {"_id": "leads_version"},
+                {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"[Data version warning: {e}]")
+        
+        for callback in self._write_listeners:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[Write listener warning: {e}]")
+    
     def _create_indexes(self):
         """Create indexes for efficient querying"""
         try:
-            # Index on lead name for quick lookups
-            self.leads_collection.create_index("lead_name")
+            # Lead lookups by name and the dashboard's name-sorted pages
+            self.leads_collection.create_index(
+                [("lead_name", ASCENDING), ("_id", ASCENDING)],
+                name="lead_name_id"
+            )
+            # Newest/oldest pages and date range filters (walked in either direction)
+            self.leads_collection.create_index(
+                [("call_metadata.timestamp", DESCENDING), ("_id", DESCENDING)],
+                name="timestamp_id"
+            )
+            # Status filter with date sort, and per-outcome metric counts
+            self.leads_collection.create_index(
+                [("call_metadata.call_outcome", ASCENDING),
+                 ("call_metadata.timestamp", DESCENDING),
+                 ("_id", DESCENDING)],
+                name="outcome_timestamp_id"
+            )
+            # Status filter with name sort
+            self.leads_collection.create_index(
+                [("call_metadata.call_outcome", ASCENDING),
+                 ("lead_name", ASCENDING),
+                 ("_id", ASCENDING)],
+                name="outcome_lead_name_id"
+            )
+            # Prefix/fuzzy search over lead and company names
+            self.leads_collection.create_index("search_tokens", name="search_tokens")
             # Index on timestamp for chronological queries
             self.conversations_collection.create_index("timestamp")
             # Index on scheduled call time
             self.scheduled_calls_collection.create_index("scheduled_time")
+            # Day lookup for metrics date ranges
+            self.metrics_collection.create_index("date")
+            # A lead's calls, newest first
+            self.lead_calls_collection.create_index(
+                [("lead_id", ASCENDING), ("timestamp", DESCENDING)],
+                name="lead_id_timestamp"
+            )
+            # Metrics date ranges before the rollups are built
+            self.lead_calls_collection.create_index("timestamp", name="timestamp")
+            # Rollup rebuilds catch up on calls and assignments stored while they scan
+            self.lead_calls_collection.create_index("created_at", name="created_at")
+            self.scheduled_calls_collection.create_index("created_at")
+            # Replayed writes (write-behind retries, re-imports) store a call once
+            self.lead_calls_collection.create_index(
+                "call_id", name="call_id_unique", unique=True,
+                partialFilterExpression={"call_id": {"$type": "string"}}
+            )
         except Exception as e:
             print(f"[Index creation warning: {e}]")
+        
+        try:
+            # One lead per normalized phone/email (multikey: no two leads share a key);
+            # leads without contact details have no identity_keys and are not indexed
+            self.leads_collection.create_index(
+                "identity_keys", name="identity_keys_unique", unique=True,
+                partialFilterExpression={"identity_keys": {"$exists": True}}
+            )
+        except Exception as e:
+            print(f"[Identity index warning: {e}]")
+    
+    def check_query_plans(self, query_shapes: Dict[str, Tuple[Dict, List]], collection=None) -> List[str]:
+        """
+        Explain each query shape and warn on collection scans
+        
+        Args:
+            query_shapes: {name: (filter, sort)} for the queries the server runs
+            collection: Collection the queries run against (defaults to leads)
+        
+        Returns:
+            Names of the query shapes whose winning plan uses COLLSCAN
+        """
+        collection = self.leads_collection if collection is None else collection
+        collscans = []
+        checked = 0
+        for name, (query, sort) in query_shapes.items():
+            try:
+                cursor = collection.find(query)
+                if sort:
+                    cursor = cursor.sort(sort)
+                plan = cursor.limit(1).explain().get("queryPlanner", {}).get("winningPlan", {})
+                checked += 1
+                
+                if self._plan_has_stage(plan, "COLLSCAN"):
+                    collscans.append(name)
+                    print(f"[⚠️ Query shape '{name}' uses COLLSCAN - check {collection.name} indexes]")
+            except Exception as e:
+                print(f"[Query plan check warning ({name}): {e}]")
+        
+        if checked and not collscans:
+            print(f"[Query plans OK: {checked} shapes use indexes]")
+        return collscans
+    
+    def _plan_has_stage(self, plan: Dict, stage: str) -> bool:
+        """Recursively search an explain() plan tree for a stage name"""
+        if not isinstance(plan, dict):
+            return False
+        if plan.get("stage") == stage:
+            return True
+        
+        children = [plan.get("inputStage"), plan.get("queryPlan")] + plan.get("inputStages", [])
+        return any(self._plan_has_stage(child, stage) for child in children if child)
     
     def store_lead(self, lead_data: Dict, conversation_history: List[Dict], 
-                   audio_file_path: Optional[str] = None) -> str:
+                   audio_file_path: Optional[str] = None, trace: Optional[Dict] = None,
+                   recording_index: Optional[List[Dict]] = None, audio_file_id: Optional[str] = None,
+                   call_timestamp: Optional[datetime] = None, schedule_calendar: bool = True,
+                   call_id: Optional[str] = None) -> str:
         """
         Store or update lead information with full conversation history and call recording
         
+        The lead is matched on its normalized phone/email (identity_keys), falling
+        back to the name for leads without contact details. The call itself is
+        appended to lead_calls; the lead document keeps only the latest call's summary.
+        
         Args:
             lead_data: Qualification data extracted from conversation (JSON)
             conversation_history: Full chat history (list of role/content dicts)
             audio_file_path: Path to WAV recording of the call (optional)
+            trace: Per-turn latency trace of the call (CallTrace.to_dict(), optional)
+            recording_index: Offset of each utterance in the recording (CallRecorder.index, optional)
+            audio_file_id: GridFS ID of a recording already uploaded (audio_file_path is then ignored)
+            call_timestamp: When the call happened (defaults to now; set for queued writes)
+            schedule_calendar: Run calendar auto-scheduling after the upsert (the
+                write-behind queue runs it as a separate step)
+            call_id: Stable ID for this call, so a replayed write does not record it twice
         
         Returns:
-            MongoDB document ID
+            MongoDB document ID of the lead
         """
         try:
             lead_name = lead_data.get("lead_name", "unknown_lead")
             
             # Store audio recording in GridFS if provided
-            audio_file_id = None
-            if audio_file_path and os.path.exists(audio_file_path):
-                try:
-                    with open(audio_file_path, "rb") as audio_file:
-                        audio_file_id = self.fs.put(
-                            audio_file,
-                            filename=f"{lead_name}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.wav",
-                            content_type="audio/wav",
-                            metadata={
-                                "lead_name": lead_name,
-                                "timestamp": datetime.utcnow()
-                            }
-                        )
-                    print(f"[Call recording stored: {audio_file_id}]")
-                except Exception as e:
-                    print(f"[Audio upload warning: {e}]")
+            if not audio_file_id:
+                audio_file_id = self._store_recording(lead_name, audio_file_path)
             
-            # Prepare document
-            document = {
-                "lead_name": lead_name,
-                "company_name": lead_data.get("company_name", ""),
-                "contact_info": {
-                    "phone": lead_data.get("phone_number", ""),
-                    "email": lead_data.get("email", ""),
-                    "whatsapp": lead_data.get("whatsapp_number", "")
-                },
-                "requirement": {
-                    "type": lead_data.get("requirement_type", ""),
-                    "capacity": lead_data.get("capacity", ""),
-                    "platform_length": lead_data.get("platform_length", ""),
-                    "installation_type": lead_data.get("installation_type", ""),
-                    "location": lead_data.get("location", ""),
-                    "timeline": lead_data.get("timeline", "")
-                },
-                "qualification_data": lead_data,  # Full JSON
-                "conversation_transcript": self._format_transcript(conversation_history),
-                "conversation_history": conversation_history,  # Raw history
-                "call_metadata": {
-                    "timestamp": datetime.utcnow(),
-                    "call_outcome": lead_data.get("call_outcome", "qualified"),
-                    "duration_seconds": lead_data.get("call_duration", 0),
-                    "audio_recording_id": str(audio_file_id) if audio_file_id else None
-                },
-                "scheduled_call": {
-                    "preferred_day": lead_data.get("preferred_day", ""),
-                    "preferred_time": lead_data.get("preferred_time_window", ""),
-                    "alternate_time": lead_data.get("alternate_time_window", "")
-                },
-                "status": "new",
-                "last_updated": datetime.utcnow()
-            }
+            document = self._build_lead_document(lead_data, conversation_history, audio_file_id,
+                                                 recording_index, call_timestamp)
             
-            # Upsert: update if exists, insert if new
-            result = self.leads_collection.update_one(
-                {"lead_name": lead_name},
-                {"$set": document},
-                upsert=True
-            )
+            # Upsert on identity: update if exists, insert if new
+            keys = build_identity_keys(lead_data)
+            try:
+                lead = self.leads_collection.find_one_and_update(
+                    self._lead_filter(lead_data), self._lead_update(document, keys),
+                    projection={"_id": 1}, upsert=True, return_document=ReturnDocument.AFTER
+                )
+            except DuplicateKeyError:
+                # A concurrent insert won, or the phone and email belong to different
+                # leads: update the lead with the strongest key and merge no other keys
+                lead = self.leads_collection.find_one_and_update(
+                    self._lead_filter(lead_data, keys[:1]), self._lead_update(document, keys[:1]),
+                    projection={"_id": 1}, upsert=True, return_document=ReturnDocument.AFTER
+                )
+            document["_id"] = lead["_id"]
+            doc_id = str(lead["_id"])
             
-            doc_id = str(result.upserted_id) if result.upserted_id else "updated"
+            new_call = self._store_lead_call(document, conversation_history, trace, call_id)
             print(f"[Lead stored in MongoDB: {lead_name}]")
             
+            # Count the call in the daily metrics rollup (once, if this is a replay)
+            if new_call:
+                self._record_call_rollup(document["call_metadata"])
+            self._notify_write()
+            
             # Auto-schedule calendar event if lead wants a call
-            self._auto_schedule_calendar(lead_name, lead_data, document)
+            if schedule_calendar:
+                self._auto_schedule_calendar(lead_name, lead_data, document)
             
             return doc_id
             
@@ -166,6 +477,684 @@ class MongoDBManager:
             print(f"[MongoDB store error: {e}]")
             raise
     
+    def _lead_filter(self, lead_data: Dict, keys: Optional[List[str]] = None) -> Dict:
+        """Query matching the stored lead for lead_data (identity_keys lookup, or name if it has none)"""
+        keys = build_identity_keys(lead_data) if keys is None else keys
+        if not keys:
+            return {"lead_name": lead_data.get("lead_name", "unknown_lead"), "identity_keys": {"$exists": False}}
+        # $elemMatch keeps an upsert from copying the keys into the new document as a scalar
+        return {"identity_keys": {"$elemMatch": {"$in": keys}}}
+    
+    def _lead_update(self, document: Dict, keys: List[str]) -> Dict:
+        """Upsert update for a lead document, merging its identity keys into the stored ones"""
+        update = {"$set": document, "$setOnInsert": {"first_seen": document["call_metadata"]["timestamp"]}}
+        if keys:
+            update["$addToSet"] = {"identity_keys": {"$each": keys}}
+        return update
+    
+    def find_lead_by_identity(self, phone: str = "", email: str = "",
+                              projection: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Find an existing lead by phone/WhatsApp number or email (dedupe before ingest)
+        
+        Returns:
+            Lead document, or None if no lead has these contact details
+        """
+        keys = build_identity_keys({"phone_number": phone, "email": email})
+        if not keys:
+            return None
+        return self.leads_collection.find_one({"identity_keys": {"$in": keys}}, projection)
+    
+    def get_lead_calls(self, lead_id, limit: int = 50) -> List[Dict]:
+        """A lead's stored calls, newest first"""
+        try:
+            lead_id = ObjectId(lead_id) if isinstance(lead_id, str) else lead_id
+            return list(self.lead_calls_collection.find({"lead_id": lead_id})
+                        .sort("timestamp", -1).limit(limit))
+        except Exception as e:
+            print(f"[Lead calls retrieval error: {e}]")
+            return []
+    
+    def _build_lead_document(self, lead_data: Dict, conversation_history: List[Dict],
+                             audio_file_id=None, recording_index: Optional[List[Dict]] = None,
+                             call_timestamp: Optional[datetime] = None) -> Dict:
+        """Lead document as stored by store_lead and bulk_store_leads (latest call only)"""
+        lead_name = lead_data.get("lead_name", "unknown_lead")
+        return {
+            "lead_name": lead_name,
+            "company_name": lead_data.get("company_name", ""),
+            "search_tokens": build_search_tokens(lead_name, lead_data.get("company_name", "")),
+            "contact_info": {
+                "phone": lead_data.get("phone_number", ""),
+                "email": lead_data.get("email", ""),
+                "whatsapp": lead_data.get("whatsapp_number", "")
+            },
+            "requirement": {
+                "type": lead_data.get("requirement_type", ""),
+                "capacity": lead_data.get("capacity", ""),
+                "platform_length": lead_data.get("platform_length", ""),
+                "installation_type": lead_data.get("installation_type", ""),
+                "location": lead_data.get("location", ""),
+                "timeline": lead_data.get("timeline", "")
+            },
+            "qualification_data": lead_data,  # Full JSON
+            "conversation_transcript": self._format_transcript(conversation_history),
+            "call_metadata": {
+                "timestamp": call_timestamp or datetime.utcnow(),
+                "call_outcome": lead_data.get("call_outcome", "qualified"),
+                "duration_seconds": lead_data.get("call_duration", 0),
+                "audio_recording_id": str(audio_file_id) if audio_file_id else None,
+                "recording_index": (recording_index or []) if audio_file_id else []
+            },
+            "scheduled_call": {
+                "preferred_day": lead_data.get("preferred_day", ""),
+                "preferred_time": lead_data.get("preferred_time_window", ""),
+                "alternate_time": lead_data.get("alternate_time_window", "")
+            },
+            "status": "new",
+            "last_updated": datetime.utcnow()
+        }
+    
+    def _build_call_document(self, document: Dict, conversation_history: List[Dict],
+                             trace: Optional[Dict] = None, call_id: Optional[str] = None) -> Dict:
+        """lead_calls entry for the call a lead document was just stored from"""
+        call_metadata = document["call_metadata"]
+        return {
+            "lead_id": document["_id"],
+            "call_id": call_id,
+            "lead_name": document["lead_name"],
+            "timestamp": call_metadata["timestamp"],
+            "call_outcome": call_metadata["call_outcome"],
+            "duration_seconds": call_metadata["duration_seconds"],
+            "audio_recording_id": call_metadata["audio_recording_id"],
+            "recording_index": call_metadata["recording_index"],
+            "qualification_data": document["qualification_data"],
+            "conversation_history": conversation_history,  # Raw history
+            "call_trace": trace,  # Stage timings per turn (see instrumentation.py)
+            "created_at": datetime.utcnow()  # When it was stored (rollup rebuilds catch up from this)
+        }
+    
+    def _lead_call_operation(self, call: Dict):
+        """Insert for a lead_calls entry; upsert on call_id when set so replays store it once"""
+        if call["call_id"]:
+            return UpdateOne({"call_id": call["call_id"]}, {"$setOnInsert": call}, upsert=True)
+        return InsertOne(call)
+    
+    def _store_lead_call(self, document: Dict, conversation_history: List[Dict],
+                         trace: Optional[Dict] = None, call_id: Optional[str] = None) -> bool:
+        """Append the call to lead_calls; False if a replay found it already stored"""
+        call = self._build_call_document(document, conversation_history, trace, call_id)
+        if call_id:
+            result = self.lead_calls_collection.update_one({"call_id": call_id}, {"$setOnInsert": call}, upsert=True)
+            return result.upserted_id is not None
+        self.lead_calls_collection.insert_one(call)
+        return True
+    
+    def bulk_store_leads(self, records: Iterable[Dict], batch_size: int = BULK_BATCH_SIZE,
+                         upload_workers: int = BULK_UPLOAD_WORKERS,
+                         schedule_calendar: bool = False) -> Dict:
+        """
+        Store many leads at once (CRM exports, replayed call logs)
+        
+        Records are consumed lazily and written in unordered bulk_write batches of
+        upserts on identity (as in store_lead); recordings in a batch are uploaded to
+        GridFS in parallel. Every record is appended to lead_calls; records in a batch
+        that share any phone or email are one lead, stored with all of their keys,
+        and the last of them becomes the lead's latest call. A record with an
+        unreadable call_timestamp is counted as failed without being uploaded.
+        
+        Args:
+            records: Lead dicts, or dicts with a "lead_data" key plus any of
+                conversation_history, audio_file_path, audio_file_id, trace,
+                recording_index, call_id and call_timestamp (datetime or ISO string)
+            batch_size: Leads per bulk_write round trip
+            upload_workers: Concurrent GridFS uploads
+            schedule_calendar: Run calendar auto-scheduling per lead (off for
+                historical imports, which would book meetings for past calls)
+        
+        Returns:
+            Counts (leads, upserted, modified, failed, calls, recordings) plus seconds and leads_per_minute
+        """
+        stats = {"leads": 0, "upserted": 0, "modified": 0, "failed": 0, "calls": 0, "recordings": 0}
+        started = time.monotonic()
+        records = iter(records)
+        
+        with ThreadPoolExecutor(max_workers=max(1, upload_workers)) as uploads:
+            while True:
+                batch = [record if "lead_data" in record else {"lead_data": record}
+                         for record in itertools.islice(records, batch_size)]
+                if not batch:
+                    break
+                self._bulk_store_batch(batch, uploads, schedule_calendar, stats)
+                stats["leads"] += len(batch)
+        
+        elapsed = time.monotonic() - started
+        stats["seconds"] = round(elapsed, 2)
+        stats["leads_per_minute"] = round(stats["leads"] / elapsed * 60) if elapsed > 0 else 0
+        print(f"[Bulk store: {stats['leads']} leads in {stats['seconds']}s "
+              f"({stats['leads_per_minute']}/min), {stats['upserted']} new, {stats['modified']} updated, "
+              f"{stats['failed']} failed, {stats['calls']} calls, {stats['recordings']} recordings]")
+        return stats
+    
+    def _bulk_store_batch(self, batch: List[Dict], uploads: ThreadPoolExecutor,
+                          schedule_calendar: bool, stats: Dict):
+        """Upload a batch's recordings in parallel, upsert its leads in one bulk_write, then append its calls"""
+        # Bad timestamps fail their own record before anything is uploaded
+        valid = []
+        for record in batch:
+            call_timestamp = record.get("call_timestamp")
+            try:
+                if isinstance(call_timestamp, str):
+                    call_timestamp = datetime.fromisoformat(call_timestamp)
+                elif call_timestamp is not None and not isinstance(call_timestamp, datetime):
+                    raise ValueError(f"not a datetime: {call_timestamp!r}")
+            except ValueError as e:
+                stats["failed"] += 1
+                print(f"[Bulk store: skipped {record['lead_data'].get('lead_name', 'unknown_lead')}, "
+                      f"bad call_timestamp: {e}]")
+                continue
+            valid.append(dict(record, call_timestamp=call_timestamp))
+        batch = valid
+        if not batch:
+            return
+        
+        def upload(record):
+            if record.get("audio_file_id"):
+                return record["audio_file_id"]
+            lead_name = record["lead_data"].get("lead_name", "unknown_lead")
+            return self._store_recording(lead_name, record.get("audio_file_path"))
+        
+        audio_file_ids = list(uploads.map(upload, batch))
+        
+        documents = []
+        record_keys = []
+        for record, audio_file_id in zip(batch, audio_file_ids):
+            documents.append(self._build_lead_document(
+                record["lead_data"], record.get("conversation_history") or [], audio_file_id,
+                record.get("recording_index"), record["call_timestamp"]
+            ))
+            if audio_file_id and not record.get("audio_file_id"):
+                stats["recordings"] += 1
+            record_keys.append(build_identity_keys(record["lead_data"])
+                               or [("name", documents[-1]["lead_name"])])
+        
+        # Records sharing any identity key are one lead: one upsert per group, from
+        # its last record, merging every key the group was seen with
+        groups = self._group_by_identity(record_keys)
+        group_keys = []
+        for members in groups:
+            keys = list(record_keys[members[-1]])
+            for i in members:
+                keys += [key for key in record_keys[i] if key not in keys]
+            group_keys.append(keys)
+        
+        def upsert(g, merge_keys):
+            i = groups[g][-1]
+            merge_keys = [] if isinstance(merge_keys[0], tuple) else merge_keys  # Name-only lead
+            return UpdateOne(self._lead_filter(batch[i]["lead_data"], merge_keys),
+                             self._lead_update(documents[i], merge_keys), upsert=True)
+        
+        failed_groups = self._bulk_upsert_leads([upsert(g, group_keys[g]) for g in range(len(groups))], stats)
+        # Keys held by two existing leads: like store_lead, update the lead with
+        # the strongest key and merge no other keys
+        conflicts = [g for g, code in failed_groups.items() if code == DUPLICATE_KEY_ERROR]
+        if conflicts:
+            retried = self._bulk_upsert_leads([upsert(g, group_keys[g][:1]) for g in conflicts], stats)
+            for position, g in enumerate(conflicts):
+                if position in retried:
+                    failed_groups[g] = retried[position]
+                else:
+                    del failed_groups[g]
+        
+        # _ids of the batch's leads, matched or inserted, in one query
+        keys = [key for g in range(len(groups)) if g not in failed_groups for key in group_keys[g]]
+        clauses = []
+        identity_keys = [key for key in keys if isinstance(key, str)]
+        names = [key[1] for key in keys if not isinstance(key, str)]
+        if identity_keys:
+            clauses.append({"identity_keys": {"$in": identity_keys}})
+        if names:
+            clauses.append({"lead_name": {"$in": names}, "identity_keys": {"$exists": False}})
+        lead_ids = {}
+        if clauses:
+            for lead in self.leads_collection.find({"$or": clauses}, {"identity_keys": 1, "lead_name": 1}):
+                for key in lead.get("identity_keys") or [("name", lead["lead_name"])]:
+                    lead_ids[key] = lead["_id"]
+        
+        group_of = {i: g for g, members in enumerate(groups) for i in members}
+        stored = []
+        call_operations = []
+        for i, (record, doc) in enumerate(zip(batch, documents)):
+            g = group_of[i]
+            lead_id = None
+            if g not in failed_groups:
+                lead_id = next((lead_ids[key] for key in group_keys[g] if key in lead_ids), None)
+            if lead_id is None:
+                stats["failed"] += 1
+                continue
+            doc["_id"] = lead_id
+            stored.append(doc)
+            call_operations.append(self._lead_call_operation(self._build_call_document(
+                doc, record.get("conversation_history") or [], record.get("trace"), record.get("call_id")
+            )))
+        new_calls = []
+        if call_operations:
+            try:
+                result = self.lead_calls_collection.bulk_write(call_operations, ordered=False)
+                upserted, failed = set(result.upserted_ids or {}), set()
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                upserted = {entry["index"] for entry in e.details.get("upserted", [])}
+                failed = {error["index"] for error in errors}
+                print(f"[Bulk store: {len(errors)} calls failed in batch: "
+                      f"{errors[0].get('errmsg') if errors else e}]")
+            # A call_id upsert that matched a stored call is a replay: it is not
+            # a new call, so it is neither counted nor added to the rollups again
+            new_calls = [doc for i, (doc, operation) in enumerate(zip(stored, call_operations))
+                         if i in upserted or (isinstance(operation, InsertOne) and i not in failed)]
+            stats["calls"] += len(new_calls)
+        
+        # One rollup update per day touched instead of one per lead
+        increments_by_day = {}
+        for doc in new_calls:
+            call_metadata = doc["call_metadata"]
+            day = call_metadata["timestamp"].replace(hour=0, minute=0, second=0, microsecond=0)
+            increments = increments_by_day.setdefault(day, {"calls": 0, "duration_total": 0})
+            duration = call_metadata.get("duration_seconds") or 0
+            increments["calls"] += 1
+            increments["duration_total"] += duration if isinstance(duration, (int, float)) else 0
+            outcome = f"outcomes.{rollup_key(call_metadata.get('call_outcome'))}"
+            increments[outcome] = increments.get(outcome, 0) + 1
+        for day, increments in increments_by_day.items():
+            try:
+                self._apply_rollup_increments(day, increments)
+            except Exception as e:
+                print(f"[Metrics rollup warning: {e}]")
+        
+        if stored:
+            self._notify_write()
+        
+        if schedule_calendar:
+            for members in groups:
+                i = members[-1]
+                if "_id" in documents[i]:
+                    self._auto_schedule_calendar(documents[i]["lead_name"], batch[i]["lead_data"], documents[i])
+    
+    @staticmethod
+    def _group_by_identity(record_keys: List[List]) -> List[List[int]]:
+        """Indexes of records that share any key, transitively (groups in first-seen order)"""
+        parent = list(range(len(record_keys)))
+        
+        def root(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        
+        first_with_key = {}
+        for i, keys in enumerate(record_keys):
+            for key in keys:
+                if key in first_with_key:
+                    a, b = root(first_with_key[key]), root(i)
+                    parent[max(a, b)] = min(a, b)
+                else:
+                    first_with_key[key] = i
+        
+        groups = {}
+        for i in range(len(record_keys)):
+            groups.setdefault(root(i), []).append(i)
+        return list(groups.values())
+    
+    def _bulk_upsert_leads(self, operations: List, stats: Dict) -> Dict[int, int]:
+        """Run lead upserts unordered; returns {operation index: error code} for the ones that failed"""
+        try:
+            result = self.leads_collection.bulk_write(operations, ordered=False)
+            stats["upserted"] += result.upserted_count
+            stats["modified"] += result.modified_count
+            return {}
+        except BulkWriteError as e:
+            details = e.details
+            stats["upserted"] += details.get("nUpserted", 0)
+            stats["modified"] += details.get("nModified", 0)
+            errors = details.get("writeErrors", [])
+            print(f"[Bulk store: {len(errors)} lead upserts failed in batch: "
+                  f"{errors[0].get('errmsg') if errors else e}]")
+            return {error["index"]: error.get("code") for error in errors}
+    
+    def upload_recording(self, lead_name: str, audio_file_path: str) -> Optional[str]:
+        """
+        Upload a call recording on its own (for callers that store the lead later)
+        
+        Returns:
+            GridFS file ID as a string, or None if the upload failed
+        """
+        audio_file_id = self._store_recording(lead_name, audio_file_path)
+        return str(audio_file_id) if audio_file_id else None
+    
+    def schedule_lead_calendar(self, lead_name: str, lead_data: Dict, call_timestamp: datetime):
+        """Calendar auto-scheduling for a lead stored with schedule_calendar=False"""
+        document = {"call_metadata": {"timestamp": call_timestamp}}
+        lead = self.leads_collection.find_one(self._lead_filter(lead_data), {"_id": 1})
+        if lead:
+            document["_id"] = lead["_id"]
+        self._auto_schedule_calendar(lead_name, lead_data, document)
+    
+    def _store_recording(self, lead_name: str, audio_file_path: Optional[str]):
+        """
+        Compress a WAV call recording and upload it to GridFS
+        
+        Args:
+            lead_name: Lead the recording belongs to
+            audio_file_path: Path to the WAV recording (may be None)
+        
+        Returns:
+            GridFS file ID, or None if there is no recording or the upload failed
+        """
+        if not audio_file_path or not os.path.exists(audio_file_path):
+            return None
+        
+        try:
+            encoded = encode_recording(audio_file_path)
+            try:
+                with open(encoded["path"], "rb") as audio_file:
+                    audio_file_id = self.fs.put(
+                        audio_file,
+                        filename=f"{lead_name}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}{encoded['extension']}",
+                        content_type=encoded["content_type"],
+                        metadata={
+                            "lead_name": lead_name,
+                            "timestamp": datetime.utcnow(),
+                            "codec": encoded["codec"],
+                            "content_type": encoded["content_type"],
+                            "duration_seconds": encoded["duration_seconds"],
+                            "sample_rate": encoded["sample_rate"],
+                            "channels": encoded["channels"],
+                            "original_bytes": encoded["original_bytes"]
+                        }
+                    )
+            finally:
+                if encoded["temporary"] and os.path.exists(encoded["path"]):
+                    os.remove(encoded["path"])
+            
+            print(f"[Call recording stored: {audio_file_id}]")
+            return audio_file_id
+        except Exception as e:
+            print(f"[Audio upload warning: {e}]")
+            return None
+    
+    def backfill_search_tokens(self, batch_size: int = 500) -> int:
+        """
+        Populate search_tokens on leads stored before search indexing existed
+        
+        Returns:
+            Number of leads updated
+        """
+        updated = 0
+        batch = []
+        cursor = self.leads_collection.find(
+            {"search_tokens": {"$exists": False}},
+            {"lead_name": 1, "company_name": 1}
+        )
+        for lead in cursor:
+            tokens = build_search_tokens(lead.get("lead_name", ""), lead.get("company_name", ""))
+            batch.append(UpdateOne({"_id": lead["_id"]}, {"$set": {"search_tokens": tokens}}))
+            if len(batch) >= batch_size:
+                updated += self.leads_collection.bulk_write(batch, ordered=False).modified_count
+                batch = []
+        if batch:
+            updated += self.leads_collection.bulk_write(batch, ordered=False).modified_count
+        
+        print(f"[Search tokens backfilled for {updated} leads]")
+        return updated
+    
+    def backfill_identity(self, batch_size: int = 500) -> int:
+        """
+        Give leads stored before identity keys their identity_keys, and move their
+        conversation_history/call_trace into lead_calls
+        
+        Leads whose phone/email already belongs to another lead are left as they
+        are and reported, so they can be merged by hand.
+        
+        Returns:
+            Number of leads updated
+        """
+        updated = 0
+        duplicates = 0
+        cursor = self.leads_collection.find(
+            {"identity_keys": {"$exists": False}},
+            {"lead_name": 1, "contact_info": 1, "qualification_data": 1, "call_metadata": 1,
+             "conversation_history": 1, "call_trace": 1}
+        ).batch_size(batch_size)
+        
+        def flush(batch):
+            nonlocal updated, duplicates
+            operations = []
+            for lead, keys in batch:
+                update = {}
+                if keys:
+                    update["$set"] = {"identity_keys": keys}
+                if "conversation_history" in lead or "call_trace" in lead:
+                    update["$unset"] = {"conversation_history": "", "call_trace": ""}
+                operations.append(UpdateOne({"_id": lead["_id"]}, update))
+            failed = set()
+            try:
+                updated += self.leads_collection.bulk_write(operations, ordered=False).modified_count
+            except BulkWriteError as e:
+                updated += e.details.get("nModified", 0)
+                failed = {error["index"] for error in e.details.get("writeErrors", [])}
+                duplicates += len(failed)
+            
+            calls = []
+            for i, (lead, _) in enumerate(batch):
+                if i in failed or "conversation_history" not in lead:
+                    continue
+                call_metadata = lead.get("call_metadata") or {}
+                document = {
+                    "_id": lead["_id"],
+                    "lead_name": lead.get("lead_name", ""),
+                    "qualification_data": lead.get("qualification_data") or {},
+                    "call_metadata": {
+                        "timestamp": call_metadata.get("timestamp"),
+                        "call_outcome": call_metadata.get("call_outcome"),
+                        "duration_seconds": call_metadata.get("duration_seconds", 0),
+                        "audio_recording_id": call_metadata.get("audio_recording_id"),
+                        "recording_index": call_metadata.get("recording_index", [])
+                    }
+                }
+                calls.append(self._lead_call_operation(self._build_call_document(
+                    document, lead.get("conversation_history") or [], lead.get("call_trace"),
+                    f"backfill-{lead['_id']}"
+                )))
+            if calls:
+                self.lead_calls_collection.bulk_write(calls, ordered=False)
+        
+        batch = []
+        for lead in cursor:
+            contact_info = lead.get("contact_info") or {}
+            keys = build_identity_keys({
+                "phone_number": contact_info.get("phone"),
+                "whatsapp_number": contact_info.get("whatsapp"),
+                "email": contact_info.get("email")
+            })
+            if not keys and "conversation_history" not in lead and "call_trace" not in lead:
+                continue
+            batch.append((lead, keys))
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+        
+        print(f"[Identity backfilled for {updated} leads]")
+        if duplicates:
+            print(f"[{duplicates} leads share a phone/email with another lead and were left "
+                  f"unchanged; merge them and run backfill-identity again]")
+        return updated
+    
+    def _rollup_filters(self, timestamp: datetime) -> List[Tuple[Dict, Dict]]:
+        """(filter, $setOnInsert) pairs for the day and all-time rollup documents"""
+        day = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+        return [
+            ({"_id": day.strftime("%Y-%m-%d")}, {"date": day}),
+            ({"_id": ROLLUP_ALL_TIME_ID}, {})
+        ]
+    
+    def _apply_rollup_increments(self, timestamp: datetime, increments: Dict):
+        """$inc the day and all-time rollup documents, creating them if needed"""
+        operations = []
+        for query, on_insert in self._rollup_filters(timestamp):
+            update = {"$inc": increments}
+            if on_insert:
+                update["$setOnInsert"] = on_insert
+            operations.append(UpdateOne(query, update, upsert=True))
+        self.metrics_collection.bulk_write(operations, ordered=False)
+    
+    def _record_call_rollup(self, call_metadata: Dict):
+        """Increment call, outcome and duration counters for one stored call"""
+        try:
+            duration = call_metadata.get("duration_seconds") or 0
+            increments = {
+                "calls": 1,
+                f"outcomes.{rollup_key(call_metadata.get('call_outcome'))}": 1,
+                "duration_total": duration if isinstance(duration, (int, float)) else 0
+            }
+            self._apply_rollup_increments(call_metadata["timestamp"], increments)
+        except Exception as e:
+            print(f"[Metrics rollup warning: {e}]")
+    
+    def _record_assignment_rollup(self, timestamp: datetime, executive_email: str):
+        """Increment the per-executive assignment counter for a scheduled call"""
+        try:
+            increments = {f"executives.{rollup_key(executive_email)}": 1}
+            self._apply_rollup_increments(timestamp, increments)
+        except Exception as e:
+            print(f"[Metrics rollup warning: {e}]")
+    
+    def get_rollup_metrics(self, since: Optional[datetime] = None) -> Optional[Dict]:
+        """
+        Sum the metrics rollup documents for a date range
+        
+        Args:
+            since: Range start (whole days from this date are included), None for all time
+        
+        Returns:
+            Dict with calls, outcomes, duration_total, executives and today_calls,
+            or None if rollups have not been built yet (no rebuild marker)
+        """
+        if not self.metrics_collection.find_one({"_id": ROLLUP_META_ID}, {"_id": 1}):
+            return None
+        
+        today = datetime.utcnow().strftime("%Y-%m-%d")
+        if since is None:
+            docs = list(self.metrics_collection.find({"_id": {"$in": [ROLLUP_ALL_TIME_ID, today]}}))
+            days = [d for d in docs if d["_id"] == today]
+            docs = [d for d in docs if d["_id"] == ROLLUP_ALL_TIME_ID]
+        else:
+            start = since.replace(hour=0, minute=0, second=0, microsecond=0)
+            docs = list(self.metrics_collection.find({"date": {"$gte": start}}))
+            days = [d for d in docs if d["_id"] == today]
+        
+        totals = {"calls": 0, "duration_total": 0, "outcomes": {}, "executives": {}}
+        for doc in docs:
+            totals["calls"] += doc.get("calls", 0)
+            totals["duration_total"] += doc.get("duration_total", 0)
+            for field in ("outcomes", "executives"):
+                for key, count in doc.get(field, {}).items():
+                    totals[field][key] = totals[field].get(key, 0) + count
+        
+        totals["today_calls"] = days[0].get("calls", 0) if days else 0
+        return totals
+    
+    def rebuild_metrics_rollups(self, batch_size: int = 1000) -> int:
+        """
+        Rebuild the metrics rollup collection from lead_calls and scheduled_calls
+        
+        Every stored call is counted, as store_lead does (the leads collection
+        keeps only each lead's latest call), and every executive assignment
+        on the day it was scheduled.
+        
+        The rollups are built in a scratch collection and swapped in with
+        renameCollection, so readers never see a half-built or empty set. The
+        swap also brings in the build marker that turns on rollup reads. Calls
+        and assignments stored while the scan runs are $inc'd into the live
+        rollups, which the swap drops, so they are re-scanned by created_at
+        and added to the scratch collection until a pass finds none.
+        
+        Returns:
+            Number of rollup documents written
+        """
+        rollups = {}
+        
+        def rollup_docs(timestamp: datetime):
+            for query, on_insert in self._rollup_filters(timestamp):
+                yield rollups.setdefault(query["_id"], {
+                    **query, **on_insert,
+                    "calls": 0, "duration_total": 0, "outcomes": {}, "executives": {}
+                })
+        
+        def scan(created_at: Dict):
+            calls = self.lead_calls_collection.find(
+                {"created_at": created_at}, {"timestamp": 1, "call_outcome": 1, "duration_seconds": 1}
+            ).batch_size(batch_size)
+            for call in calls:
+                timestamp = call.get("timestamp")
+                if not isinstance(timestamp, datetime):
+                    continue
+                duration = call.get("duration_seconds") or 0
+                outcome = rollup_key(call.get("call_outcome"))
+                for doc in rollup_docs(timestamp):
+                    doc["calls"] += 1
+                    doc["duration_total"] += duration if isinstance(duration, (int, float)) else 0
+                    doc["outcomes"][outcome] = doc["outcomes"].get(outcome, 0) + 1
+            
+            assignments = self.scheduled_calls_collection.find(
+                {"executive_email": {"$exists": True}, "created_at": created_at},
+                {"executive_email": 1, "created_at": 1}
+            ).batch_size(batch_size)
+            for assignment in assignments:
+                timestamp = assignment.get("created_at")
+                if not isinstance(timestamp, datetime):
+                    continue
+                key = rollup_key(assignment.get("executive_email"))
+                for doc in rollup_docs(timestamp):
+                    doc["executives"][key] = doc["executives"].get(key, 0) + 1
+        
+        # Calls stored before created_at was recorded have none and belong to this pass
+        started = datetime.utcnow()
+        scan({"$not": {"$gte": started}})
+        written = set(rollups)
+        
+        rebuild = self.db[self.metrics_collection.name + "_rebuild"]
+        rebuild.drop()
+        rebuild.insert_many(list(rollups.values()) + [{"_id": ROLLUP_META_ID, "built_at": datetime.utcnow()}])
+        rebuild.create_index("date")
+        
+        since = started
+        while True:
+            rollups = {}
+            until = datetime.utcnow()
+            scan({"$gte": since, "$lt": until})
+            if not rollups:
+                break
+            operations = []
+            for doc in rollups.values():
+                increments = {"calls": doc["calls"], "duration_total": doc["duration_total"]}
+                for field in ("outcomes", "executives"):
+                    increments.update({f"{field}.{key}": count for key, count in doc[field].items()})
+                update = {"$inc": increments}
+                if "date" in doc:
+                    update["$setOnInsert"] = {"date": doc["date"]}
+                operations.append(UpdateOne({"_id": doc["_id"]}, update, upsert=True))
+            rebuild.bulk_write(operations, ordered=False)
+            written.update(rollups)
+            since = until
+        
+        rebuild.rename(self.metrics_collection.name, dropTarget=True)
+        self._notify_write()
+        
+        print(f"[Metrics rollups rebuilt: {len(written)} documents]")
+        return len(written)
+    
     def _format_transcript(self, conversation_history: List[Dict]) -> str:
         """Convert conversation history to readable transcript"""
         transcript = []
@@ -183,7 +1172,8 @@ class MongoDBManager:
         return "\n\n".join(transcript)
     
     def store_conversation(self, lead_name: str, conversation_history: List[Dict], 
-                          call_outcome: str = "completed") -> str:
+                          call_outcome: str = "completed", trace: Optional[Dict] = None,
+                          call_timestamp: Optional[datetime] = None) -> str:
         """
         Store standalone conversation log
         
@@ -191,6 +1181,8 @@ class MongoDBManager:
             lead_name: Name of the lead
             conversation_history: Full chat history
             call_outcome: Result of call (completed, dropped, rescheduled, etc)
+            trace: Per-turn latency trace of the call (CallTrace.to_dict(), optional)
+            call_timestamp: When the call happened (defaults to now; set for queued writes)
         
         Returns:
             MongoDB document ID
@@ -198,11 +1190,12 @@ class MongoDBManager:
         try:
             document = {
                 "lead_name": lead_name,
-                "timestamp": datetime.utcnow(),
+                "timestamp": call_timestamp or datetime.utcnow(),
                 "conversation_history": conversation_history,
                 "transcript": self._format_transcript(conversation_history),
                 "call_outcome": call_outcome,
-                "message_count": len([m for m in conversation_history if m["role"] != "system"])
+                "message_count": len([m for m in conversation_history if m["role"] != "system"]),
+                "call_trace": trace
             }
             
             result = self.conversations_collection.insert_one(document)
@@ -304,7 +1297,7 @@ class MongoDBManager:
                 
                 # Update lead document with assignment
                 self.leads_collection.update_one(
-                    {"lead_name": lead_name},
+                    {"_id": document["_id"]} if "_id" in document else {"lead_name": lead_name},
                     {"$set": {
                         "assigned_executive": {
                             "name": result['executive_name'],
@@ -316,18 +1309,25 @@ class MongoDBManager:
                 )
                 
                 # Store in scheduled_calls collection
+                created_at = datetime.utcnow()
                 self.scheduled_calls_collection.insert_one({
                     "lead_name": lead_name,
+                    "lead_id": document.get("_id"),
                     "executive_name": result['executive_name'],
                     "executive_email": result['executive_email'],
                     "calendar_event_id": result['event_id'],
                     "scheduled_time": result['scheduled_time'],
                     "preferred_day": preferred_day,
                     "preferred_time": preferred_time,
-                    "created_at": datetime.utcnow(),
+                    "created_at": created_at,
                     "status": "scheduled"
                 })
                 
+                # Count the assignment on the day it was scheduled, as the rollup
+                # rebuild and the /api/metrics fallback do
+                self._record_assignment_rollup(created_at, result['executive_email'])
+                self._notify_write()
+                
                 print(f"[📧 Meeting invite sent to {result['executive_email']}]")
             else:
                 print("[⚠️ No executives available, call not auto-scheduled]")
@@ -363,3 +1363,21 @@ class MongoDBManager:
         if self.client:
             self.client.close()
             print("[MongoDB Connection Closed]")
+
+if __name__ == "__main__":
+    commands = {
+        "backfill-search": lambda db: db.backfill_search_tokens(),
+        "backfill-identity": lambda db: db.backfill_identity(),
+        "rebuild-rollups": lambda db: db.rebuild_metrics_rollups(),
+        "import": lambda db: _import_leads(db, sys.argv[2:])
+    }
+    
+    if len(sys.argv) < 2 or sys.argv[1] not in commands:
+        print(f"Usage: python database.py <{'|'.join(commands)}>")
+        sys.exit(1)
+    
+    db_manager = MongoDBManager()
+    try:
+        commands[sys.argv[1]](db_manager)
+    finally:
+        db_manager.close()
@@ -1,12 +1,8 @@
 import os
 import sys
 import time
-import vlc
-import re
 import tempfile
 import atexit
-import json
-import requests
 from groq import Groq
 from dotenv import load_dotenv
 import shutil
@@ -14,21 +10,45 @@ import pyaudio
 import threading
 import wave
 import io
-import webrtcvad
 from database import MongoDBManager
+from write_behind import WRITE_BEHIND, WriteBehindQueue
+from http_client import get_http_client, print_latency_stats
+from speech_services import (
+    GROQ_MODEL, LLM_TEMPERATURE, DEEPGRAM_LISTEN_URL, TTS_VOICE_KEY, deepgram_tts,
+    clean_text_for_tts, load_system_prompt, is_json_output, extract_json
+)
+from tts_cache import TTSCache
+from stt_streaming import StreamingTranscriber, UtteranceTranscription
+from tts_pipeline import SentenceChunker, TTSPipeline
+from audio_playback import create_sink
+from call_recorder import CallRecorder, CALLER, BOT
+from vad_endpointer import Endpointer, SPEECH_START, SPEECH_END, FRAME_MS
+from instrumentation import (
+    CallTrace, MARK_SPEECH_END, STAGE_LISTEN_WAIT, STAGE_LISTEN_SPEECH, STAGE_VAD_ENDPOINT,
+    STAGE_STT, STAGE_LLM_FIRST_TOKEN, STAGE_LLM, STAGE_TTS, STAGE_PLAYBACK, STAGE_RESPONSE_GAP
+)
 
 # Load environment variables
 load_dotenv()
 
-# Configuration
-GROQ_MODEL = "llama-3.3-70b-versatile"
-DEEPGRAM_VOICE = "aura-luna-en"
-
 # Audio configuration
 AUDIO_FORMAT = pyaudio.paInt16
 CHANNELS = 1
 RATE = 16000
-CHUNK = 8000  # 0.5 seconds of audio
+FRAME_SAMPLES = RATE * FRAME_MS // 1000  # 30ms frames for frame-level endpointing
+
+# Sentences synthesized concurrently while earlier ones play
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "3"))
+
+# Speech-to-text mode: "rest" (upload after the utterance) or "streaming" (WebSocket)
+STT_MODE = os.getenv("STT_MODE", "rest").lower()
+
+# Full-duplex voice mode: the mic stays open while the bot speaks and the
+# caller can interrupt it. Use a headset, there is no echo cancellation.
+BARGE_IN = os.getenv("BARGE_IN", "false").lower() in ("1", "true", "yes")
+
+# Speech needed to interrupt playback (longer than VAD_START_MS to ride over echo and noise)
+BARGE_IN_START_MS = int(os.getenv("BARGE_IN_START_MS", "300"))
 
 # Lead data storage: {lead_name: json_data}
 lead_data_storage = {}
@@ -43,37 +63,9 @@ def cleanup_temp_dir():
 
 atexit.register(cleanup_temp_dir)
 
-def load_system_prompt(lead_name: str = "", company_name: str = "") -> str:
-    """Load system prompt from prompt.md and inject lead_name and company_name"""
-    prompt_path = os.path.join(os.path.dirname(__file__), "prompt.md")
-    with open(prompt_path, "r", encoding="utf-8") as f:
-        prompt = f.read()
-    
-    # Replace placeholders if provided
-    if lead_name:
-        prompt = prompt.replace("{lead_name}", lead_name)
-    if company_name:
-        prompt = prompt.replace("{company_name}", company_name)
-    
-    return prompt
-
 def deepgram_tts_to_wav(text: str, output_file: str, return_audio_data: bool = False):
-    """Generate speech using Deepgram Aura"""
-    # Add pause before question marks for better intonation
-    if text.strip().endswith('?'):
-        text = text.strip()[:-1] + '...?'
-    
-    url = f"https://api.deepgram.com/v1/speak?model={DEEPGRAM_VOICE}"
-    headers = {
-        "Authorization": f"Token {os.getenv('DEEPGRAM_API_KEY')}",
-        "Content-Type": "application/json"
-    }
-    payload = {"text": text}
-    
-    response = requests.post(url, headers=headers, json=payload, timeout=10)
-    response.raise_for_status()
-    
-    audio_content = response.content
+    """Generate speech using Deepgram Aura and write it to output_file"""
+    audio_content = deepgram_tts(text)
     
     with open(output_file, "wb") as f:
         f.write(audio_content)
@@ -82,76 +74,72 @@ def deepgram_tts_to_wav(text: str, output_file: str, return_audio_data: bool = F
         return audio_content
     return output_file
 
-def play_audio(path: str):
-    """Play audio file and wait for completion"""
-    player = vlc.MediaPlayer(path)
-    player.play()
-
-    while player.get_state() not in (vlc.State.Ended, vlc.State.Error, vlc.State.Stopped):
-        time.sleep(0.05)
-    
-    player.stop()
-    player.release()
-    time.sleep(0.1)
-
-def clean_text_for_tts(text: str) -> str:
-    """Remove markdown, prefixes, and stage directions"""
-    text = re.sub(r'\([^)]*\)', '', text)  # Remove (stage directions)
-    text = re.sub(r'\[[^\]]*\]', '', text)  # Remove [notes]
-    text = re.sub(r'\*\*([^*]+)\*\*', r'\1', text)  # Remove **bold**
-    text = re.sub(r'\*([^*]+)\*', r'\1', text)  # Remove *italic*
-    text = re.sub(r'^(\*\*)?Priya(\*\*)?:\s*', '', text, flags=re.IGNORECASE)  # Remove "Priya:"
-    text = re.sub(r'^(Bot|Assistant|AI):\s*', '', text, flags=re.IGNORECASE)  # Remove other prefixes
-    text = re.sub(r'\.\s+', '.', text)  # Remove space after period for natural TTS flow
-    text = re.sub(r'\s+', ' ', text)  # Clean whitespace
-    return text.strip()
-
-def is_json_output(text: str) -> bool:
-    """Check if text contains JSON qualification data"""
-    # Check for JSON code blocks
-    if '```json' in text.lower() or ('```' in text and '{' in text):
-        return True
-    # Check if text contains JSON object (can be anywhere in text)
-    if '{' in text and '}' in text:
-        # Try to extract and parse JSON
-        try:
-            json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', text, re.DOTALL)
-            if json_match:
-                json.loads(json_match.group(0))
-                return True
-        except:
-            pass
-    return False
-
 def extract_and_store_json(text: str, lead_name: str, conversation_history: list, 
-                          db_manager: MongoDBManager, audio_file_path: str = None):
+                          db_manager, audio_file_path: str = None,
+                          trace: dict = None, recording_index: list = None):
     """Extract JSON data and store in MongoDB with full conversation history and call recording"""
     try:
-        json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', text, re.DOTALL)
-        if json_match:
-            json_data = json.loads(json_match.group(0))
+        json_data = extract_json(text)
+        if json_data is not None:
             
             # Add lead_name to JSON if not present
             if "lead_name" not in json_data:
                 json_data["lead_name"] = lead_name or "unknown_lead"
             
             # Store in MongoDB with conversation history and audio recording
-            db_manager.store_lead(json_data, conversation_history, audio_file_path)
+            db_manager.store_lead(json_data, conversation_history, audio_file_path, trace=trace,
+                                  recording_index=recording_index)
             
             # Also keep in memory for backward compatibility
             lead_data_storage[lead_name or "unknown_lead"] = json_data
-            print(f"\n[Data stored in MongoDB for {lead_name or 'unknown_lead'}]")
+            print(f"\n[Data saved for {lead_name or 'unknown_lead'}]")
             return True
     except Exception as e:
         print(f"\n[Storage error: {e}]")
     return False
 
-def listen_for_speech(timeout: int = 30, return_audio: bool = False) -> tuple:
-    """Listen to microphone and transcribe speech using Deepgram STT (REST API) with WebRTC VAD
+def transcribe_rest(frames: list, sample_width: int, deepgram_key: str) -> str:
+    """Transcribe buffered PCM frames with one Deepgram REST request"""
+    # Convert frames to WAV format in memory
+    wav_buffer = io.BytesIO()
+    wf = wave.open(wav_buffer, 'wb')
+    wf.setnchannels(CHANNELS)
+    wf.setsampwidth(sample_width)
+    wf.setframerate(RATE)
+    wf.writeframes(b''.join(frames))
+    wf.close()
+    
+    # Send to Deepgram REST API
+    url = f"{DEEPGRAM_LISTEN_URL}?model=nova-2&smart_format=true&punctuate=true"
+    headers = {
+        "Authorization": f"Token {deepgram_key}",
+        "Content-Type": "audio/wav"
+    }
+    
+    response = get_http_client().post(url, headers=headers, data=wav_buffer.getvalue(), endpoint="deepgram.listen")
+    response.raise_for_status()
+    
+    result = response.json()
+    return result['results']['channels'][0]['alternatives'][0]['transcript'].strip()
+
+def listen_for_speech(timeout: int = 30, return_audio: bool = False, streaming: bool = None,
+                      playback_active=None, on_speech_start=None, trace: CallTrace = None,
+                      recorder: CallRecorder = None, stop: threading.Event = None) -> tuple:
+    """Listen to microphone and transcribe speech using Deepgram STT with WebRTC VAD
     
     Args:
         timeout: Maximum time to wait for speech (seconds)
         return_audio: If True, return (transcript, audio_frames) tuple
+        streaming: Stream audio over WebSocket while the caller speaks
+            (defaults to STT_MODE); falls back to REST if the stream fails
+        playback_active: Callable, True while the bot is speaking (barge-in mode);
+            the timeout only counts once playback has finished
+        on_speech_start: Called as soon as the caller starts speaking
+        trace: CallTrace for the wait, speech, endpoint and STT spans (a new turn
+            starts when the caller starts speaking)
+        recorder: Call recorder; captured frames are written to it as they arrive
+            instead of being returned
+        stop: Set to stop listening (checked every frame); returns no transcript
     
     Returns:
         If return_audio=True: (transcript, audio_frames) tuple
@@ -161,9 +149,17 @@ def listen_for_speech(timeout: int = 30, return_audio: bool = False) -> tuple:
     if not deepgram_key:
         raise RuntimeError("Set DEEPGRAM_API_KEY")
     
+    if streaming is None:
+        streaming = STT_MODE == "streaming"
+    streaming = streaming and StreamingTranscriber.available()
+    transcription = None
+    trace = trace or CallTrace()
+    
     try:
-        # Initialize WebRTC VAD (aggressive mode 3 = most aggressive)
-        vad = webrtcvad.Vad(2)  # Mode 2 = balanced (0=least aggressive, 3=most)
+        # Frame-level endpointing (webrtcvad + adaptive noise floor, see vad_endpointer)
+        endpointer = Endpointer(sample_rate=RATE)
+        normal_start_frames = endpointer.start_frames
+        barge_in_start_frames = max(normal_start_frames, BARGE_IN_START_MS // FRAME_MS)
         
         # Initialize PyAudio
         audio = pyaudio.PyAudio()
@@ -172,98 +168,105 @@ def listen_for_speech(timeout: int = 30, return_audio: bool = False) -> tuple:
             channels=CHANNELS,
             rate=RATE,
             input=True,
-            frames_per_buffer=CHUNK
+            frames_per_buffer=FRAME_SAMPLES
         )
         
         print("[Listening... Speak now]")
         
-        # VAD parameters
-        frames = []
+        frames = []  # Everything captured (for the call recording) when there is no recorder
+        
+        def record(frame_data: bytes):
+            if recorder:
+                recorder.write(frame_data)
+            else:
+                frames.append(frame_data)
         start_time = time.time()
-        speech_frames = 0
-        silence_frames = 0
-        silence_threshold = 2  # 1 second of silence (0.5s per chunk * 2 = 1s)
+        wait_start = CallTrace.now()
+        speech_start = None
         speech_detected = False
-        min_speech_frames = 2  # Need 1 second of speech before considering it real
         
         while True:
+            if stop is not None and stop.is_set():
+                break
+            
             elapsed = time.time() - start_time
             if elapsed > timeout:
                 print(f"\r[Timeout after {elapsed:.1f}s]" + " " * 30)
                 break
             
-            # Read audio chunk
-            audio_data = stream.read(CHUNK, exception_on_overflow=False)
-            frames.append(audio_data)
+            # Read one 30ms frame
+            audio_data = stream.read(FRAME_SAMPLES, exception_on_overflow=False)
             
-            # Check if this frame contains speech
-            # WebRTC VAD requires 10, 20, or 30ms frames at 8000, 16000, 32000, or 48000 Hz
-            # Our CHUNK is 8000 samples at 16000 Hz = 500ms, so we need to split it
-            is_speech = False
-            frame_length = 480  # 30ms at 16000 Hz
+            # While the bot is talking: stricter start, and the mic (mostly
+            # the bot's own echo) stays out of the call recording
+            bot_speaking = playback_active is not None and playback_active() and not speech_detected
+            if bot_speaking:
+                start_time = time.time()
+                wait_start = CallTrace.now()
+                endpointer.start_frames = barge_in_start_frames
+            else:
+                endpointer.start_frames = normal_start_frames
+                record(audio_data)
             
-            for i in range(0, len(audio_data), frame_length * 2):  # *2 because 16-bit samples
-                frame = audio_data[i:i + frame_length * 2]
-                if len(frame) == frame_length * 2:
-                    try:
-                        if vad.is_speech(frame, RATE):
-                            is_speech = True
-                            break
-                    except:
-                        pass
+            event = endpointer.process(audio_data)
             
-            if is_speech:
-                speech_frames += 1
-                silence_frames = 0
-                
-                if not speech_detected and speech_frames >= min_speech_frames:
-                    speech_detected = True
+            if event == SPEECH_START:
+                speech_detected = True
+                # The start fires after start_frames of voiced audio
+                speech_start = CallTrace.now() - endpointer.start_frames * FRAME_MS * 1000000
+                trace.begin_turn()
+                trace.record(STAGE_LISTEN_WAIT, min(wait_start, speech_start), speech_start,
+                             barge_in=bot_speaking)
+                if bot_speaking:
+                    record(b''.join(endpointer.utterance))
+                    print(f"\r[Barge-in: caller interrupted playback]" + " " * 20, end="", flush=True)
+                else:
                     print(f"\r[Speaking detected... Recording]" + " " * 20, end="", flush=True)
-            else:
-                if speech_detected:
-                    silence_frames += 1
-                    
-                    # Show progress
-                    silence_duration = silence_frames * 0.5
-                    print(f"\r[Recording... {silence_duration:.1f}s silence]", end="", flush=True)
-                    
-                    # Stop if we have enough silence after detecting speech
-                    if silence_frames >= silence_threshold:
-                        print(f"\r[Speech ended after silence]" + " " * 30)
-                        break
+                if on_speech_start:
+                    on_speech_start()
+                
+                # Open the live stream and catch it up on the pre-roll; if the
+                # stream fails at any point the buffered utterance goes to REST
+                transcription = UtteranceTranscription(
+                    lambda utterance: transcribe_rest(utterance, audio.get_sample_size(AUDIO_FORMAT), deepgram_key),
+                    StreamingTranscriber(deepgram_key, sample_rate=RATE, channels=CHANNELS) if streaming else None
+                )
+                transcription.start(b''.join(endpointer.utterance))
+            elif endpointer.in_speech and transcription:
+                transcription.send(audio_data)
+            
+            if event == SPEECH_END:
+                print(f"\r[Speech ended after silence]" + " " * 30)
+                # The caller stopped talking one hangover ago; the reply gap counts from there
+                endpoint_at = CallTrace.now()
+                speech_end = endpoint_at - endpointer.hangover_frames * FRAME_MS * 1000000
+                trace.record(STAGE_LISTEN_SPEECH, speech_start, speech_end)
+                trace.record(STAGE_VAD_ENDPOINT, speech_end, endpoint_at,
+                             hangover_ms=endpointer.hangover_frames * FRAME_MS)
+                trace.mark(MARK_SPEECH_END, speech_end)
+                if recorder:
+                    recorder.mark_speech(CALLER, speech_start / 1e9, speech_end / 1e9)
+                break
         
         # Cleanup
         stream.stop_stream()
         stream.close()
         audio.terminate()
         
+        if stop is not None and stop.is_set():
+            if transcription:
+                transcription.close()
+            return "", []
+        
         if not speech_detected:
             print("\n[No speech detected]")
-            return ""
+            return "", []
         
         print(f"\r[Recording complete - transcribing...]" + " " * 50, end="", flush=True)
         
-        # Convert frames to WAV format in memory
-        wav_buffer = io.BytesIO()
-        wf = wave.open(wav_buffer, 'wb')
-        wf.setnchannels(CHANNELS)
-        wf.setsampwidth(audio.get_sample_size(AUDIO_FORMAT))
-        wf.setframerate(RATE)
-        wf.writeframes(b''.join(frames))
-        wf.close()
-        
-        # Send to Deepgram REST API
-        url = "https://api.deepgram.com/v1/listen?model=nova-2&smart_format=true&punctuate=true"
-        headers = {
-            "Authorization": f"Token {deepgram_key}",
-            "Content-Type": "audio/wav"
-        }
-        
-        response = requests.post(url, headers=headers, data=wav_buffer.getvalue(), timeout=10)
-        response.raise_for_status()
-        
-        result = response.json()
-        transcript = result['results']['channels'][0]['alternatives'][0]['transcript'].strip()
+        with trace.span(STAGE_STT) as stt_span:
+            transcript = transcription.finish(endpointer.utterance)
+            stt_span.set(mode=transcription.mode, chars=len(transcript))
         
         if transcript:
             print(f"\r[Transcribed: {transcript}]" + " " * 50)
@@ -275,6 +278,8 @@ def listen_for_speech(timeout: int = 30, return_audio: bool = False) -> tuple:
         return transcript, []
         
     except Exception as e:
+        if transcription:
+            transcription.close()
         print(f"\n[STT error: {e}]")
         import traceback
         traceback.print_exc()
@@ -294,21 +299,127 @@ def main(lead_name: str = "", company_name: str = "", voice_mode: bool = False):
     if not groq_key:
         raise RuntimeError("Set GROQ_API_KEY")
 
-    # Initialize MongoDB
-    db_manager = MongoDBManager()
+    # Call-end writes go through the write-behind journal and are applied in the
+    # background (WRITE_BEHIND=false connects to MongoDB and writes directly)
+    db_manager = WriteBehindQueue(MongoDBManager) if WRITE_BEHIND else MongoDBManager()
     call_start_time = time.time()
     
-    # Initialize call recording
-    recording_frames = []  # Store all audio frames for full call recording
-    recording_active = voice_mode  # Only record in voice mode
+    # Stage timings for every turn (stored with the call, CALL_TRACE_EXPORT to export)
+    trace = CallTrace(lead_name=lead_name, mode="voice" if voice_mode else "text")
+    call_outcome = "completed"
+    
+    # Call recording is streamed to disk as the call goes (voice mode only),
+    # caller left and bot right on the monotonic clock
+    recorder = None
+    if voice_mode:
+        recorder = CallRecorder(os.path.join(TEMP_DIR, f"call_recording_{lead_name}_{int(time.time())}.wav"),
+                                sample_rate=RATE)
 
-    client = Groq(api_key=groq_key)
+    # The Groq SDK keeps its own pooled httpx client; reuse one for the whole call
+    client = Groq(api_key=groq_key, max_retries=2, timeout=20.0)
+    
+    # Played from memory through a persistent output stream (AUDIO_SINK env)
+    audio_sink = create_sink()
+    
+    # Scripted lines replay from the phrase cache (warm with: python tts_cache.py warm)
+    tts_cache = TTSCache(deepgram_tts, TTS_VOICE_KEY)
+    
+    def timed_synthesize(text: str) -> bytes:
+        with trace.span(STAGE_TTS, chars=len(text)):
+            return tts_cache.synthesize(text)
+    
+    def timed_play(audio: bytes):
+        # The first clip after the caller's utterance closes the response gap
+        trace.record_since(MARK_SPEECH_END, STAGE_RESPONSE_GAP)
+        started = time.monotonic()
+        with trace.span(STAGE_PLAYBACK) as playback_span:
+            fraction = audio_sink.play(audio)
+            playback_span.set(fraction=1.0 if fraction is None else round(fraction, 3))
+        if recorder:
+            # Only the part the caller heard, at the moment it was played
+            try:
+                recorder.write_clip(audio, BOT, at=started, fraction=1.0 if fraction is None else fraction)
+                recorder.mark_speech(BOT, started, time.monotonic())
+            except ValueError:
+                pass
+        return fraction
+    
+    # Sentences are synthesized concurrently and played in order
+    tts_pipeline = TTSPipeline(
+        timed_synthesize,
+        timed_play,
+        max_workers=TTS_WORKERS,
+        stop=audio_sink.stop
+    )
+    
+    def speak(sentences):
+        for sentence in sentences:
+            clean_sentence = clean_text_for_tts(sentence)
+            if clean_sentence:
+                tts_pipeline.submit(clean_sentence)
+    
+    # Barge-in: the next turn's listener starts with the bot's turn, and
+    # caller speech while the bot is composing or speaking interrupts it
+    barge_in = voice_mode and BARGE_IN
+    bot_turn = threading.Event()
+    call_over = threading.Event()
+    listener = None
+    
+    def interrupt_bot():
+        if bot_turn.is_set():
+            tts_pipeline.interrupt()
+    
+    def start_bot_turn():
+        """Reset playback state and, in barge-in mode, open the mic for the reply"""
+        tts_pipeline.begin_turn()
+        bot_turn.set()
+        if not barge_in:
+            return None
+        result = {}
+        
+        def run():
+            result["turn"] = listen_for_speech(timeout=15, playback_active=bot_turn.is_set,
+                                               on_speech_start=interrupt_bot, trace=trace,
+                                               recorder=recorder, stop=call_over)
+        
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread, result
+    
+    def stop_listener():
+        """Stop a listener still waiting for the caller, before the recorder and pipeline it uses close"""
+        call_over.set()
+        if listener:
+            listener[0].join()
+    
+    def finish_bot_turn(full_text: str) -> str:
+        """Wait for playback and return what the caller actually heard"""
+        tts_pipeline.wait()
+        bot_turn.clear()
+        if not tts_pipeline.interrupted:
+            return full_text
+        heard = " ".join(tts_pipeline.spoken)
+        print(f"\n[Bot interrupted after: {heard or '(nothing)'}]")
+        return f"{heard} [interrupted by the caller]" if heard else "[interrupted by the caller before speaking]"
+    
+    def next_user_turn():
+        if listener:
+            thread, result = listener
+            thread.join()
+            return result.get("turn", ("", []))
+        return listen_for_speech(timeout=15, trace=trace, recorder=recorder)
     
     # Load system prompt with lead name and company
     system_prompt = load_system_prompt(lead_name, company_name)
 
     history = [{"role": "system", "content": system_prompt}]
     
+    def add_message(role: str, content: str):
+        """Append to the history and index where the message is in the recording"""
+        if recorder:
+            recorder.add_utterance(role, content, message_index=len(history))
+        history.append({"role": role, "content": content})
+    
     if lead_name:
         print(f"Ready. Conversation prepared for lead: {lead_name}")
         if company_name:
@@ -334,28 +445,29 @@ def main(lead_name: str = "", company_name: str = "", voice_mode: bool = False):
             
             print(opening_text)
             
-            # Generate audio for opening
-            temp_file = os.path.join(TEMP_DIR, "opening_greeting.wav")
+            # Generate and play audio for opening (sentence by sentence so
+            # the fixed "Hello, I am Priya." comes from the phrase cache)
+            opening_heard = opening_text
             try:
-                deepgram_tts_to_wav(opening_text, temp_file)
-                
-                # Play audio first (blocking)
-                play_audio(temp_file)
-                os.remove(temp_file)
+                listener = start_bot_turn()
+                opening_chunker = SentenceChunker()
+                speak(opening_chunker.feed(opening_text) + opening_chunker.flush())
+                opening_heard = finish_bot_turn(opening_text)
                 
                 if voice_mode:
                     # In voice mode: NOW start listening (after audio finished)
                     print()  # New line after audio
-                    user_message, audio_frames = listen_for_speech(timeout=15, return_audio=recording_active)
-                    recording_frames.extend(audio_frames)  # Add to full recording
+                    user_message, _ = next_user_turn()
                     
                     if not user_message:
                         print("\n[No response detected. Ending call.]")
+                        call_outcome = "no_response"
                         break
                     
                     # Check for exit phrases
                     if any(word in user_message.lower() for word in ['goodbye', 'bye', 'exit', 'hang up', 'end call']):
                         print("\n[Call ended by user]")
+                        call_outcome = "caller_ended"
                         break
                     
                     print(f"\nYou: {user_message}")
@@ -364,32 +476,34 @@ def main(lead_name: str = "", company_name: str = "", voice_mode: bool = False):
                     print()
                     first_turn = False
                     # Add to history
-                    history.append({"role": "assistant", "content": opening_text})
+                    add_message("assistant", opening_text)
                     continue
                     
             except Exception as e:
                 print(f"\n[Audio error: {e}]")
                 if voice_mode:
+                    call_outcome = "dropped"
                     break
             
-            # Add to history as if bot said it
-            history.append({"role": "assistant", "content": opening_text})
+            # Add to history as the caller heard it
+            add_message("assistant", opening_heard)
             print()
             first_turn = False
         else:
             # User's turn to respond
             if voice_mode:
                 # Use microphone input with STT
-                user_message, audio_frames = listen_for_speech(timeout=15, return_audio=recording_active)
-                recording_frames.extend(audio_frames)  # Add to full recording
+                user_message, _ = next_user_turn()
                 
                 if not user_message:
                     print("\n[No response detected. Ending call.]")
+                    call_outcome = "no_response"
                     break
                 
                 # Check for exit phrases
                 if any(word in user_message.lower() for word in ['goodbye', 'bye', 'exit', 'hang up', 'end call']):
                     print("\n[Call ended by user]")
+                    call_outcome = "caller_ended"
                     break
                 
                 print(f"\nYou: {user_message}")
@@ -402,91 +516,94 @@ def main(lead_name: str = "", company_name: str = "", voice_mode: bool = False):
                     continue
                 user_message = user
 
-        history.append({"role": "user", "content": user_message})
+        add_message("user", user_message)
 
         print("\nBot: ", end="", flush=True)
         
-        # Collect full response from LLM
+        # Stream the LLM response; each completed sentence goes straight to TTS
+        listener = start_bot_turn()
+        llm_span = trace.start_span(STAGE_LLM, model=GROQ_MODEL)
         stream = client.chat.completions.create(
             model=GROQ_MODEL,
             messages=history,
-            temperature=0.4,
+            temperature=LLM_TEMPERATURE,
             stream=True,
         )
         
+        chunker = SentenceChunker()
         full_response = ""
         for chunk in stream:
             if chunk.choices[0].delta.content:
                 content = chunk.choices[0].delta.content
+                if not full_response:
+                    trace.record(STAGE_LLM_FIRST_TOKEN, llm_span.start_ns)
                 print(content, end="", flush=True)
                 full_response += content
+                speak(chunker.feed(content))
+        speak(chunker.flush())
+        llm_span.end(chars=len(full_response))
         
         print("\n")
         
+        # Let the spoken part (if any) finish before the next step. After a
+        # barge-in the stream is still read to the end (the JSON block may
+        # follow) but nothing more is spoken.
+        heard_response = finish_bot_turn(full_response)
+        
         # Check if response contains JSON - don't speak it
         if is_json_output(full_response.strip()):
-            # Save full call recording if we have frames
+            stop_listener()
+            
+            # Finalize the call recording (already on disk, only the header is left)
             recording_path = None
-            if recording_frames and voice_mode:
-                recording_path = os.path.join(TEMP_DIR, f"call_recording_{lead_name}_{int(time.time())}.wav")
+            if recorder and recorder.duration_seconds > 0:
                 try:
-                    import pyaudio
-                    audio = pyaudio.PyAudio()
-                    wf = wave.open(recording_path, 'wb')
-                    wf.setnchannels(CHANNELS)
-                    wf.setsampwidth(audio.get_sample_size(AUDIO_FORMAT))
-                    wf.setframerate(RATE)
-                    wf.writeframes(b''.join(recording_frames))
-                    wf.close()
-                    audio.terminate()
-                    print(f"[Call recording saved: {len(recording_frames)} frames]")
+                    recording_path = recorder.close()
+                    print(f"[Call recording saved: {recorder.duration_seconds:.1f}s]")
                 except Exception as e:
                     print(f"[Recording save error: {e}]")
             
-            # Store in MongoDB with recording
-            extract_and_store_json(full_response.strip(), lead_name, history, db_manager, recording_path)
+            # Store in MongoDB with recording and the call's stage timings
+            call_outcome = "qualified"
+            trace.finish(call_outcome=call_outcome)
+            extract_and_store_json(full_response.strip(), lead_name, history, db_manager, recording_path,
+                                   trace=trace.to_dict(),
+                                   recording_index=recorder.index if recording_path else None)
             print("\n[Qualification complete - JSON data stored in MongoDB, not spoken]")
             
-            # Cleanup recording file after upload
+            # Cleanup recording file after upload (the write-behind queue keeps its own copy)
             if recording_path and os.path.exists(recording_path):
                 try:
                     os.remove(recording_path)
                 except:
                     pass
             
-            # Close DB connection before exiting
-            db_manager.close()
             print("\n[Call ended automatically after qualification]\n")
             break
-        else:
-            # Split into sentences and generate/play audio sequentially
-            sentences = re.split(r'([.!?]+)', full_response)
-            sentence_count = 0
-            
-            i = 0
-            while i < len(sentences):
-                if i + 1 < len(sentences) and sentences[i+1] in ['.', '!', '?', '..', '...']:
-                    sentence = (sentences[i] + sentences[i+1]).strip()
-                    i += 2
-                else:
-                    sentence = sentences[i].strip()
-                    i += 1
-                
-                if sentence and not is_json_output(sentence):
-                    clean_sentence = clean_text_for_tts(sentence)
-                    if clean_sentence:
-                        temp_file = os.path.join(TEMP_DIR, f"temp_audio_{sentence_count}.wav")
-                        try:
-                            # Get TTS audio and add to recording
-                            tts_audio_data = deepgram_tts_to_wav(clean_sentence, temp_file, return_audio_data=voice_mode)
-                            if voice_mode and tts_audio_data and recording_active:
-                                # Convert bytes to list of bytes for consistency with recording format
-                                recording_frames.append(tts_audio_data)
-                            play_audio(temp_file)
-                            os.remove(temp_file)
-                        except Exception as e:
-                            print(f"[Audio error: {e}]")
-                        sentence_count += 1
+        
+        # The LLM sees its own turns as the caller heard them
+        add_message("assistant", heard_response)
+    
+    stop_listener()
+    tts_pipeline.close()
+    audio_sink.close()
+    if recorder:
+        recorder.discard()  # Uploaded with the lead, or the call was not qualified
+    
+    # Calls that ended without qualification keep their log and timings too
+    trace.finish(call_outcome=call_outcome)
+    if call_outcome != "qualified" and len(history) > 1:
+        db_manager.store_conversation(lead_name, history, call_outcome, trace=trace.to_dict())
+    trace.export()
+    
+    print_latency_stats()
+    trace.print_summary()
+    print(f"[TTS cache: {tts_cache.stats()}]")
+    
+    # The caller's side is already torn down. Before the process exits, queued
+    # writes get up to WRITE_BEHIND_EXIT_WAIT to land (the lead, its recording and
+    # the meeting booking); anything left stays journaled for the next run or a drain
+    db_manager.close()
 
 if __name__ == "__main__":
     if len(sys.argv) < 3:
@@ -0,0 +1,160 @@
+"""
+Shared HTTP client for Deepgram and Microsoft Graph calls
+One pooled keep-alive session per process with per-host retry policies,
+default timeouts and per-endpoint latency stats
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Keep-alive connections kept per host (TTS workers share the Deepgram pool)
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "10"))
+
+# (connect, read) seconds, used when the caller passes no timeout
+DEFAULT_TIMEOUT = (3.05, 10)
+
+# Latency samples kept per endpoint for percentiles
+LATENCY_WINDOW = 500
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# URL prefix -> retry policy. Graph POSTs (create event, send mail) are not
+# idempotent and are never retried; Deepgram requests are safe to repeat.
+RETRY_POLICIES = {
+    "https://api.deepgram.com/": Retry(
+        total=2,
+        backoff_factor=0.2,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "POST"}),
+        raise_on_status=False
+    ),
+    "https://graph.microsoft.com/": Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+}
+
+# Everything else: retry connection failures only
+DEFAULT_RETRY = Retry(total=1, backoff_factor=0.2, status_forcelist=(), raise_on_status=False)
+
+
+class EndpointStats:
+    """Latency samples and counters for one endpoint"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.samples = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, elapsed_ms: float, error: bool):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.samples.append(elapsed_ms)
+        if error:
+            self.errors += 1
+
+    def summary(self) -> Dict:
+        ordered = sorted(self.samples)
+
+        def percentile(p):
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 1) if ordered else 0.0
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.count, 1) if self.count else 0.0,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "max_ms": round(ordered[-1], 1) if ordered else 0.0
+        }
+
+
+class HTTPClient:
+    """Thread-safe wrapper around one pooled requests.Session"""
+
+    def __init__(self, pool_maxsize: int = HTTP_POOL_MAXSIZE):
+        self.session = requests.Session()
+        for prefix, retry in RETRY_POLICIES.items():
+            self.session.mount(prefix, HTTPAdapter(pool_maxsize=pool_maxsize, max_retries=retry))
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=pool_maxsize, max_retries=DEFAULT_RETRY))
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=pool_maxsize, max_retries=DEFAULT_RETRY))
+
+        self._stats: Dict[str, EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    def request(self, method: str, url: str, endpoint: Optional[str] = None, **kwargs) -> requests.Response:
+        """
+        Send a request over the shared pool and record its latency
+
+        Args:
+            method: HTTP method
+            url: Full URL
+            endpoint: Stats label (defaults to "METHOD host/path"); pass one
+                for URLs that embed ids or emails
+            **kwargs: Passed to requests.Session.request (timeout defaults to DEFAULT_TIMEOUT)
+
+        Returns:
+            The response (status is not checked here)
+        """
+        kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+        if endpoint is None:
+            parts = urlsplit(url)
+            endpoint = f"{method.upper()} {parts.netloc}{parts.path}"
+
+        start = time.perf_counter()
+        error = True
+        try:
+            response = self.session.request(method, url, **kwargs)
+            error = response.status_code >= 400
+            return response
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self._stats.setdefault(endpoint, EndpointStats()).record(elapsed_ms, error)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def latency_stats(self) -> Dict[str, Dict]:
+        """Per-endpoint count, errors, avg/p50/p95/max latency in ms"""
+        with self._lock:
+            return {endpoint: stats.summary() for endpoint, stats in self._stats.items()}
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HTTPClient:
+    """Process-wide shared client (created on first use)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HTTPClient()
+        return _client
+
+
+def print_latency_stats():
+    """Log the shared client's per-endpoint latency summary"""
+    for endpoint, stats in sorted(get_http_client().latency_stats().items()):
+        print(f"[HTTP {endpoint}: {stats['count']} calls, avg {stats['avg_ms']}ms, "
+              f"p50 {stats['p50_ms']}ms, p95 {stats['p95_ms']}ms, {stats['errors']} errors]")
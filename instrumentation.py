@@ -0,0 +1,369 @@
+"""
+Per-turn latency instrumentation for the voice loop
+A CallTrace collects timed spans for every stage of every turn (VAD
+wait and endpointing, STT, LLM first token and total, TTS per sentence,
+playback, response gap). The trace is stored with the lead and the
+conversation, and can be exported as JSONL or as OTLP/JSON traces.
+
+Usage:
+    python instrumentation.py report <call_traces.jsonl>    # Per-stage latency percentiles
+"""
+
+import json
+import math
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+# Export finished traces: "" (off), "jsonl" (one span per line) or "otlp" (OTLP/JSON, one request per line)
+CALL_TRACE_EXPORT = os.getenv("CALL_TRACE_EXPORT", "").lower()
+CALL_TRACE_PATH = os.getenv("CALL_TRACE_PATH", "")
+
+# OTLP/HTTP collector (e.g. http://localhost:4318); traces are also POSTed there in otlp mode
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "").rstrip("/")
+
+SERVICE_NAME = "lead-qualification-voice-bot"
+
+# Stage names shared by the voice bot and the call engine
+STAGE_LISTEN_WAIT = "listen.wait"          # Listening until the caller starts speaking
+STAGE_LISTEN_SPEECH = "listen.speech"      # Caller speaking, up to the endpoint
+STAGE_VAD_ENDPOINT = "vad.endpoint"        # Trailing silence before the endpoint fired
+STAGE_STT = "stt"
+STAGE_LLM_FIRST_TOKEN = "llm.first_token"
+STAGE_LLM = "llm"
+STAGE_TTS = "tts.synthesize"
+STAGE_PLAYBACK = "playback"
+STAGE_RESPONSE_GAP = "response_gap"        # End of caller speech -> first bot audio
+
+# Order of stages in summaries and reports
+STAGES = (STAGE_LISTEN_WAIT, STAGE_LISTEN_SPEECH, STAGE_VAD_ENDPOINT, STAGE_STT,
+          STAGE_LLM_FIRST_TOKEN, STAGE_LLM, STAGE_TTS, STAGE_PLAYBACK,
+          STAGE_RESPONSE_GAP)
+
+# Mark set when the caller's utterance ends; cleared by the first bot audio
+MARK_SPEECH_END = "speech_end"
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100.0 * len(ordered)) - 1))]
+
+
+def summarize(durations: Dict[str, List[float]]) -> Dict:
+    """{stage: [ms, ...]} -> {stage: {count, avg_ms, p50_ms, p95_ms, max_ms}} in stage order"""
+    names = [s for s in STAGES if s in durations] + sorted(set(durations) - set(STAGES))
+    summary = {}
+    for name in names:
+        values = durations[name]
+        summary[name] = {
+            "count": len(values),
+            "avg_ms": round(sum(values) / len(values), 1) if values else 0.0,
+            "p50_ms": round(percentile(values, 50), 1),
+            "p95_ms": round(percentile(values, 95), 1),
+            "max_ms": round(max(values), 1) if values else 0.0
+        }
+    return summary
+
+
+class Span:
+    """One timed stage; times are monotonic nanoseconds"""
+
+    def __init__(self, trace: "CallTrace", name: str, start_ns: int, turn: int,
+                 parent_id: Optional[str], attributes: Dict):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.turn = turn
+        self.start_ns = start_ns
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.monotonic_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self, end_ns: Optional[int] = None, **attributes):
+        """Close the span (once) and add it to the trace"""
+        if self.end_ns is not None:
+            return
+        self.attributes.update(attributes)
+        self.end_ns = end_ns if end_ns is not None else time.monotonic_ns()
+        self.trace._add(self)
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "turn": self.turn,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ms": round((self.start_ns - self.trace.start_ns) / 1e6, 1),
+            "duration_ms": round(self.duration_ms, 1),
+            "attributes": self.attributes
+        }
+
+
+class CallTrace:
+    """
+    Thread-safe span collector for one call
+
+    Spans are tagged with the current turn (turn 0 is the greeting; a new
+    turn starts when the caller starts speaking). All spans hang off one
+    root "call" span so exported traces group per call.
+
+    Usage:
+        trace = CallTrace(lead_name="Rahul")
+        with trace.span(STAGE_STT, mode="rest"):
+            transcript = transcribe(...)
+        trace.finish()
+        db_manager.store_lead(data, history, recording, trace=trace.to_dict())
+    """
+
+    def __init__(self, call_id: Optional[str] = None, **attributes):
+        """
+        Args:
+            call_id: Identifier for logs and exports (random if omitted)
+            **attributes: Call-level attributes (lead name, transport, ...)
+        """
+        self.trace_id = uuid.uuid4().hex
+        self.call_id = call_id or self.trace_id[:8]
+        self.attributes = attributes
+        self.start_ns = time.monotonic_ns()
+        self.started_at = datetime.now(timezone.utc)
+        self._wall_offset_ns = time.time_ns() - self.start_ns
+        self.turn = 0
+        self.spans: List[Span] = []
+        self._marks: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.root = Span(self, "call", self.start_ns, 0, None, dict(attributes))
+
+    @staticmethod
+    def now() -> int:
+        """Timestamp for start_span()/record() (monotonic nanoseconds)"""
+        return time.monotonic_ns()
+
+    def begin_turn(self) -> int:
+        with self._lock:
+            self.turn += 1
+            return self.turn
+
+    def start_span(self, name: str, start_ns: Optional[int] = None, **attributes) -> Span:
+        """Open a span in the current turn; close it with span.end()"""
+        return Span(self, name, start_ns if start_ns is not None else time.monotonic_ns(),
+                    self.turn, self.root.span_id, attributes)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Time a block; exceptions are recorded on the span and re-raised"""
+        span = self.start_span(name, **attributes)
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            span.end()
+
+    def record(self, name: str, start_ns: int, end_ns: Optional[int] = None, **attributes) -> Span:
+        """Add a span measured elsewhere (e.g. derived from frame counts)"""
+        span = self.start_span(name, start_ns, **attributes)
+        span.end(end_ns)
+        return span
+
+    def mark(self, name: str, at_ns: Optional[int] = None):
+        """Remember a point in time for a later record_since()"""
+        with self._lock:
+            self._marks[name] = at_ns if at_ns is not None else time.monotonic_ns()
+
+    def record_since(self, mark: str, name: str, **attributes) -> Optional[Span]:
+        """Record a span from a mark to now and clear the mark (None if the mark is not set)"""
+        with self._lock:
+            start_ns = self._marks.pop(mark, None)
+        if start_ns is None:
+            return None
+        return self.record(name, start_ns, **attributes)
+
+    def _add(self, span: Span):
+        if span is self.root:
+            return
+        with self._lock:
+            self.spans.append(span)
+
+    def finish(self, **attributes):
+        """End the root span (call duration); later finish() calls are no-ops"""
+        self.root.set(turns=self.turn, **attributes)
+        self.root.end()
+
+    def durations(self) -> Dict[str, List[float]]:
+        with self._lock:
+            spans = list(self.spans)
+        durations = defaultdict(list)
+        for span in spans:
+            durations[span.name].append(span.duration_ms)
+        return durations
+
+    def summary(self) -> Dict:
+        """Per-stage latency summary for this call"""
+        return summarize(self.durations())
+
+    def to_dict(self) -> Dict:
+        """JSON-ready trace, as stored on the lead and conversation documents"""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start_ns)
+        return {
+            "trace_id": self.trace_id,
+            "call_id": self.call_id,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.root.duration_ms, 1),
+            "turns": self.turn,
+            "attributes": self.attributes,
+            "spans": [span.to_dict() for span in spans],
+            "summary": self.summary()
+        }
+
+    def to_jsonl(self) -> List[str]:
+        """One JSON line per span, tagged with the trace and call ids"""
+        lines = []
+        for span in self.to_dict()["spans"]:
+            span.update(trace_id=self.trace_id, call_id=self.call_id)
+            lines.append(json.dumps(span, default=str))
+        return lines
+
+    def to_otlp(self) -> Dict:
+        """The trace as an OTLP/JSON ExportTraceServiceRequest"""
+        with self._lock:
+            spans = [self.root] + sorted(self.spans, key=lambda s: s.start_ns)
+
+        def otlp_span(span: Span) -> Dict:
+            end_ns = span.end_ns if span.end_ns is not None else time.monotonic_ns()
+            attributes = dict(span.attributes, turn=span.turn)
+            item = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(span.start_ns + self._wall_offset_ns),
+                "endTimeUnixNano": str(end_ns + self._wall_offset_ns),
+                "attributes": [otlp_attribute(k, v) for k, v in attributes.items()]
+            }
+            if span.parent_id:
+                item["parentSpanId"] = span.parent_id
+            if "error" in span.attributes:
+                item["status"] = {"code": 2, "message": str(span.attributes["error"])}
+            return item
+
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [otlp_attribute("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{
+                    "scope": {"name": "instrumentation"},
+                    "spans": [otlp_span(span) for span in spans]
+                }]
+            }]
+        }
+
+    def export(self, fmt: str = CALL_TRACE_EXPORT, path: str = CALL_TRACE_PATH):
+        """
+        Append the trace to a file (and POST it to OTLP_ENDPOINT in otlp mode)
+
+        Args:
+            fmt: "jsonl", "otlp" or "" (do nothing)
+            path: Output file (defaults to call_traces.jsonl / call_traces.otlp.jsonl)
+        """
+        if fmt not in ("jsonl", "otlp"):
+            return
+        try:
+            if fmt == "jsonl":
+                lines = self.to_jsonl()
+            else:
+                payload = self.to_otlp()
+                lines = [json.dumps(payload, default=str)]
+                if OTLP_ENDPOINT:
+                    from http_client import get_http_client
+                    get_http_client().post(f"{OTLP_ENDPOINT}/v1/traces", json=json.loads(lines[0]),
+                                           endpoint="otlp.traces")
+            path = path or ("call_traces.jsonl" if fmt == "jsonl" else "call_traces.otlp.jsonl")
+            with _export_lock, open(path, "a", encoding="utf-8") as f:
+                for line in lines:
+                    f.write(line + "\n")
+        except Exception as e:
+            print(f"[Trace export error: {e}]")
+
+    def print_summary(self):
+        for name, stats in self.summary().items():
+            print(f"[Trace {name}: n={stats['count']} avg={stats['avg_ms']}ms "
+                  f"p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms max={stats['max_ms']}ms]")
+
+
+# Concurrent calls share one export file
+_export_lock = threading.Lock()
+
+
+def otlp_attribute(key: str, value) -> Dict:
+    """OTLP/JSON KeyValue for a Python value"""
+    if isinstance(value, bool):
+        wrapped = {"boolValue": value}
+    elif isinstance(value, int):
+        wrapped = {"intValue": str(value)}
+    elif isinstance(value, float):
+        wrapped = {"doubleValue": value}
+    else:
+        wrapped = {"stringValue": str(value)}
+    return {"key": key, "value": wrapped}
+
+
+def read_spans(path: str) -> Iterable[Dict]:
+    """Spans from a JSONL export (blank and malformed lines are skipped)"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def report(path: str):
+    """Print per-stage percentiles and the slowest turns from a JSONL export"""
+    durations = defaultdict(list)
+    gaps = []  # (response gap ms, call id, turn)
+    calls = set()
+    for span in read_spans(path):
+        durations[span["name"]].append(span["duration_ms"])
+        calls.add(span.get("trace_id"))
+        if span["name"] == STAGE_RESPONSE_GAP:
+            gaps.append((span["duration_ms"], span.get("call_id"), span.get("turn")))
+
+    if not durations:
+        print(f"[No spans in {path}]")
+        return
+
+    print(f"{len(calls)} calls, {sum(len(v) for v in durations.values())} spans\n")
+    print(f"{'stage':<18}{'count':>7}{'avg':>9}{'p50':>9}{'p95':>9}{'max':>9}   (ms)")
+    for name, stats in summarize(durations).items():
+        print(f"{name:<18}{stats['count']:>7}{stats['avg_ms']:>9.0f}{stats['p50_ms']:>9.0f}"
+              f"{stats['p95_ms']:>9.0f}{stats['max_ms']:>9.0f}")
+
+    if gaps:
+        print("\nSlowest turns (response gap):")
+        for gap_ms, call_id, turn in sorted(gaps, reverse=True)[:5]:
+            print(f"  call {call_id} turn {turn}: {gap_ms:.0f}ms")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "report":
+        print("Usage: python instrumentation.py report <call_traces.jsonl>")
+        sys.exit(1)
+    report(sys.argv[2])
@@ -0,0 +1,401 @@
+"""
+Offline load test for the voice pipeline
+Starts stand-in Deepgram (STT/TTS) and Groq (streaming LLM) HTTP servers
+with configurable latency and jitter, feeds scripted caller personas (WAV
+files) into N concurrent calls on the call engine, and reports per-turn
+p50/p95/p99 for STT, LLM time-to-first-token, TTS and the response gap
+
+Usage:
+    python loadtest.py run --calls 30 --concurrency 30 --turns 3
+    python loadtest.py run --wav-dir recordings/ --stt-ms 300 --ttft-ms 400
+    python loadtest.py fakes --port 8790    # stand-in servers only
+
+With the stand-ins running (live STT on --port + 1), the single-call bot
+can be pointed at them:
+    DEEPGRAM_API_URL=http://127.0.0.1:8790 GROQ_BASE_URL=http://127.0.0.1:8790 \\
+    DEEPGRAM_STT_WS_URL=ws://127.0.0.1:8791/v1/listen \\
+        python groqEleveLabsTalker_VAD.py "Rahul" "Acme Corp" --voice
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+import wave
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from instrumentation import (
+    STAGE_STT, STAGE_LLM_FIRST_TOKEN, STAGE_LLM, STAGE_TTS, STAGE_RESPONSE_GAP, percentile
+)
+
+SAMPLE_RATE = 16000
+
+# Trace stages in the report (response gap: end of caller speech to first bot audio)
+REPORT_STAGES = (STAGE_STT, STAGE_LLM_FIRST_TOKEN, STAGE_LLM, STAGE_TTS, STAGE_RESPONSE_GAP)
+
+# Caller lines returned by the stand-in STT, in turn order
+CALLER_LINES = [
+    "Yes, speaking.",
+    "We need a sixty ton weighbridge.",
+    "The platform should be eighteen meters.",
+    "Tomorrow between eleven and noon works.",
+    "My email is buyer at example dot com."
+]
+
+# Bot lines streamed by the stand-in LLM before the qualification JSON
+BOT_LINES = [
+    "Got it.What capacity do you need for the weighbridge?",
+    "Understood.What platform length are you looking at?",
+    "Thanks, that helps.When would be a good time for a quick call with our sales executive?",
+    "Perfect.What is the best email to share details?"
+]
+
+QUALIFICATION = {
+    "lead_name": "Loadtest Caller",
+    "call_outcome": "qualified",
+    "capacity": "60 ton",
+    "preferred_callback_time": "tomorrow between 11am to noon"
+}
+
+# Caller personas: seconds of thinking before each answer and answer length
+PERSONAS = {
+    "brief": {"pause": (0.3, 0.8), "speech": (0.6, 1.2)},
+    "verbose": {"pause": (0.4, 1.0), "speech": (2.5, 4.0)},
+    "hesitant": {"pause": (1.5, 3.0), "speech": (1.0, 2.0)}
+}
+
+
+class Latency:
+    """Normally distributed delay in milliseconds (never negative)"""
+
+    def __init__(self, mean_ms: float, jitter_ms: float):
+        self.mean_ms = mean_ms
+        self.jitter_ms = jitter_ms
+
+    def seconds(self) -> float:
+        return max(0.0, random.gauss(self.mean_ms, self.jitter_ms)) / 1000.0
+
+
+def silent_wav(seconds: float) -> bytes:
+    """16 kHz mono 16-bit WAV of silence"""
+    from call_session import pcm_to_wav
+    return pcm_to_wav(b"\0\0" * int(seconds * SAMPLE_RATE))
+
+
+def make_fake_handler(stt: Latency, tts: Latency, ttft: Latency, token_ms: float,
+                      turns: int, tts_seconds_per_char: float):
+    """Request handler class for the stand-in Deepgram and Groq endpoints"""
+
+    class FakeAPIHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def _send(self, status: int, content_type: str, body: bytes):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            path = self.path.split("?")[0]
+            body = self._body()
+            if path == "/v1/listen":
+                self._listen()
+            elif path == "/v1/speak":
+                self._speak(json.loads(body or b"{}").get("text", ""))
+            elif path == "/openai/v1/chat/completions":
+                self._chat(json.loads(body or b"{}"))
+            else:
+                self._send(404, "application/json", b'{"error": "not found"}')
+
+        def _listen(self):
+            time.sleep(stt.seconds())
+            transcript = random.choice(CALLER_LINES)
+            result = {"results": {"channels": [{"alternatives": [{"transcript": transcript}]}]}}
+            self._send(200, "application/json", json.dumps(result).encode())
+
+        def _speak(self, text: str):
+            time.sleep(tts.seconds())
+            self._send(200, "audio/wav", silent_wav(max(0.2, len(text) * tts_seconds_per_char)))
+
+        def _chat(self, request: Dict):
+            user_turns = sum(1 for m in request.get("messages", []) if m.get("role") == "user")
+            if user_turns >= turns:
+                reply = "Thank you.Our sales executive will call you.\n```json\n" + json.dumps(QUALIFICATION) + "\n```"
+            else:
+                reply = BOT_LINES[(user_turns - 1) % len(BOT_LINES)]
+
+            time.sleep(ttft.seconds())
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            tokens = [piece + " " for piece in reply.split(" ")]
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(token_ms / 1000.0)
+                chunk = {
+                    "id": "chatcmpl-loadtest",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": request.get("model", "loadtest"),
+                    "choices": [{
+                        "index": 0,
+                        "delta": {"role": "assistant", "content": token} if i == 0 else {"content": token},
+                        "finish_reason": "stop" if i == len(tokens) - 1 else None
+                    }]
+                }
+                self._chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+            self._chunk(b"data: [DONE]\n\n")
+            self._chunk(b"")
+
+        def _chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+    return FakeAPIHandler
+
+
+class FakeAPIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # The default backlog of 5 drops bursts of new connections
+
+
+def start_fake_servers(args, port: int = 0) -> ThreadingHTTPServer:
+    """Start the stand-in Deepgram/Groq server on a background thread"""
+    handler = make_fake_handler(
+        stt=Latency(args.stt_ms, args.jitter_ms),
+        tts=Latency(args.tts_ms, args.jitter_ms),
+        ttft=Latency(args.ttft_ms, args.jitter_ms),
+        token_ms=args.token_ms,
+        turns=args.turns,
+        tts_seconds_per_char=args.tts_seconds_per_char
+    )
+    server = FakeAPIServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# Stand-in live STT: one more word of the interim transcript per 0.25 s of audio
+STT_STREAM_BYTES_PER_WORD = SAMPLE_RATE * 2 // 4
+
+
+def _stt_results(transcript: str, is_final: bool, from_finalize: bool = False) -> str:
+    return json.dumps({
+        "type": "Results",
+        "is_final": is_final,
+        "from_finalize": from_finalize,
+        "channel": {"alternatives": [{"transcript": transcript}]}
+    })
+
+
+def start_fake_stt_stream(stt: Latency, port: int = 0, drop_after_bytes: Optional[int] = None):
+    """
+    Start a stand-in for the Deepgram live WebSocket on a background thread
+
+    Audio is answered with growing interim Results, Finalize with the full
+    line as a final Results (after the STT latency) and CloseStream ends
+    the stream.
+
+    Args:
+        stt: Delay before the finalized result
+        port: Port to listen on (0 for any free port)
+        drop_after_bytes: Close the connection once this much audio has arrived
+            (simulates a network failure mid-utterance)
+
+    Returns:
+        The websockets server (port in server.socket.getsockname()[1]; stop with shutdown())
+    """
+    from websockets.sync.server import serve
+
+    def handler(ws):
+        words = random.choice(CALLER_LINES).split()
+        received = 0
+        sent_words = 0
+        for message in ws:
+            if isinstance(message, bytes):
+                received += len(message)
+                if drop_after_bytes is not None and received >= drop_after_bytes:
+                    return
+                heard = min(len(words), received // STT_STREAM_BYTES_PER_WORD)
+                if heard > sent_words:
+                    sent_words = heard
+                    ws.send(_stt_results(" ".join(words[:heard]), is_final=False))
+                continue
+
+            control = json.loads(message).get("type")
+            if control == "Finalize":
+                time.sleep(stt.seconds())
+                ws.send(_stt_results(" ".join(words), is_final=True, from_finalize=True))
+            elif control == "CloseStream":
+                return
+
+    server = serve(handler, "127.0.0.1", port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def voiced_pcm(seconds: float) -> bytes:
+    """Speech-like test signal: a ~120 Hz pulse train with a syllable-rate envelope"""
+    samples = array("h")
+    pitch = random.uniform(100, 180)
+    for i in range(int(seconds * SAMPLE_RATE)):
+        t = i / SAMPLE_RATE
+        envelope = 0.55 + 0.45 * math.sin(2 * math.pi * 4 * t)
+        phase = (t * pitch) % 1.0
+        value = math.exp(-phase * 12) * math.sin(2 * math.pi * 700 * t) + 0.4 * math.sin(2 * math.pi * 1200 * t) * math.exp(-phase * 8)
+        samples.append(int(9000 * envelope * value + random.gauss(0, 60)))
+    return samples.tobytes()
+
+
+def room_noise(seconds: float) -> bytes:
+    return array("h", [int(random.gauss(0, 60)) for _ in range(int(seconds * SAMPLE_RATE))]).tobytes()
+
+
+def make_persona_wav(path: str, persona: str, turns: int):
+    """
+    Write a caller WAV with one answer per turn
+
+    The file only advances while the bot listens, so each answer is followed
+    by enough silence to be endpointed, and the persona's thinking pause
+    comes before the next answer (after the bot has spoken).
+    """
+    from vad_endpointer import VAD_HANGOVER_MS
+
+    profile = PERSONAS[persona]
+    endpoint_silence = VAD_HANGOVER_MS / 1000.0 + 0.1
+    pcm = b""
+    for _ in range(turns):
+        pcm += room_noise(random.uniform(*profile["pause"]))
+        pcm += voiced_pcm(random.uniform(*profile["speech"]))
+        pcm += room_noise(endpoint_silence)
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(pcm)
+
+
+async def run_load(args):
+    from call_session import AsyncSpeechServices, CallEngine, WavFileTransport
+    from tts_cache import TTSCache
+
+    loop_lag: List[float] = []
+
+    async def watch_loop_lag(interval: float = 0.05):
+        """How late the event loop wakes up (CPU saturation shows up here first)"""
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            loop_lag.append((time.perf_counter() - start - interval) * 1000)
+
+    server = start_fake_servers(args)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ.setdefault("GROQ_API_KEY", "loadtest")
+    os.environ.setdefault("DEEPGRAM_API_KEY", "loadtest")
+
+    if args.wav_dir:
+        wav_paths = sorted(glob.glob(os.path.join(args.wav_dir, "*.wav")))
+        if not wav_paths:
+            raise SystemExit(f"No .wav files in {args.wav_dir}")
+    else:
+        persona_dir = tempfile.mkdtemp(prefix="loadtest_personas_")
+        wav_paths = []
+        for persona in sorted(PERSONAS):
+            for variant in range(2):
+                path = os.path.join(persona_dir, f"{persona}_{variant}.wav")
+                make_persona_wav(path, persona, args.turns)
+                wav_paths.append(path)
+
+    speech = AsyncSpeechServices(use_cache=False, deepgram_url=base_url, groq_base_url=base_url)
+    if args.tts_cache:
+        # Memory only: stand-in audio must never land in the real phrase cache
+        speech.cache = TTSCache(None, "loadtest", cache_dir=None)
+    engine = CallEngine(speech=speech, max_concurrent_calls=args.concurrency)
+    lag_watcher = asyncio.create_task(watch_loop_lag())
+
+    print(f"[Load test: {args.calls} calls, concurrency {args.concurrency}, "
+          f"{len(wav_paths)} caller WAVs, stand-ins at {base_url}]")
+    start = time.perf_counter()
+    sessions = await asyncio.gather(*[
+        engine.run_call(WavFileTransport(wav_paths[i % len(wav_paths)], realtime=not args.fast),
+                        f"Caller {i}", "Loadtest Co",
+                        session_id=f"lt{i}", verbose=False)
+        for i in range(args.calls)
+    ])
+    elapsed = time.perf_counter() - start
+
+    lag_watcher.cancel()
+    await engine.close()
+    server.shutdown()
+
+    outcomes = {}
+    for session in sessions:
+        outcomes[session.ended_reason] = outcomes.get(session.ended_reason, 0) + 1
+    turns = sum(session.turns for session in sessions)
+
+    # Every session traces its own stages (see instrumentation.py)
+    metrics: Dict[str, List[float]] = {name: [] for name in REPORT_STAGES}
+    for session in sessions:
+        for name, values in session.trace.durations().items():
+            if name in metrics:
+                metrics[name].extend(values)
+    metrics["loop_lag"] = loop_lag
+
+    print(f"\n{args.calls} calls in {elapsed:.1f}s ({turns} caller turns, {turns / elapsed:.2f} turns/s)")
+    print(f"Outcomes: {outcomes}")
+    print(f"\n{'metric (ms)':<18}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for name, values in metrics.items():
+        print(f"{name:<18}{len(values):>8}{percentile(values, 50):>10.1f}{percentile(values, 95):>10.1f}"
+              f"{percentile(values, 99):>10.1f}{(max(values) if values else 0):>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test with stand-in Deepgram/Groq servers")
+    parser.add_argument("command", choices=["run", "fakes"])
+    parser.add_argument("--calls", type=int, default=20, help="Calls to run")
+    parser.add_argument("--concurrency", type=int, default=20, help="Calls in flight at once")
+    parser.add_argument("--turns", type=int, default=3, help="Caller answers before the LLM returns JSON")
+    parser.add_argument("--wav-dir", help="Use these 16 kHz mono WAVs as callers instead of generated personas")
+    parser.add_argument("--fast", action="store_true", help="Do not pace audio at wall-clock speed")
+    parser.add_argument("--tts-cache", action="store_true", help="Enable an in-memory TTS phrase cache")
+    parser.add_argument("--stt-ms", type=float, default=250, help="Mean STT latency")
+    parser.add_argument("--tts-ms", type=float, default=200, help="Mean TTS latency")
+    parser.add_argument("--ttft-ms", type=float, default=300, help="Mean LLM time to first token")
+    parser.add_argument("--token-ms", type=float, default=15, help="Delay between LLM tokens")
+    parser.add_argument("--jitter-ms", type=float, default=50, help="Std deviation added to each latency")
+    parser.add_argument("--tts-seconds-per-char", type=float, default=0.06, help="Length of stand-in TTS audio")
+    parser.add_argument("--port", type=int, default=8790, help="Port for 'fakes' (live STT on port + 1)")
+    args = parser.parse_args()
+
+    if args.command == "fakes":
+        server = start_fake_servers(args, port=args.port)
+        stt_server = start_fake_stt_stream(Latency(args.stt_ms, args.jitter_ms), port=args.port + 1)
+        print(f"[Stand-in Deepgram/Groq servers on http://127.0.0.1:{server.server_address[1]}, "
+              f"live STT on ws://127.0.0.1:{args.port + 1}/v1/listen - Ctrl+C to stop]")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+            stt_server.shutdown()
+    else:
+        asyncio.run(run_load(args))
+
+
+if __name__ == "__main__":
+    main()
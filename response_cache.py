@@ -0,0 +1,121 @@
+"""
+In-process response cache for the dashboard API
+Bounded LRU with per-entry TTL and hit/miss counters, plus a throttled
+poller for the shared data version the cache keys are built from
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a fixed TTL"""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 30.0):
+        """
+        Args:
+            maxsize: Maximum number of entries before the least recently used is evicted
+            ttl: Seconds an entry stays valid after it is stored
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Look up a key
+
+        Returns:
+            (True, value) on a hit, (False, None) on a miss or expired entry
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entry if full"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry (called when the underlying data changes)"""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict:
+        """Counters for the health endpoint"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+
+class VersionPoller:
+    """
+    Cached reader for a version counter that lives in the database
+
+    The counter is fetched at most once per interval, so cache hits and 304
+    responses do not cost a database round trip. invalidate() forces the next
+    read to fetch again (used right after this process writes).
+    """
+
+    def __init__(self, fetch: Callable[[], int], interval: float = 5.0):
+        """
+        Args:
+            fetch: Reads the current version from the database
+            interval: Seconds a fetched version is reused before polling again
+        """
+        self.fetch = fetch
+        self.interval = interval
+        self._value = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self.polls = 0
+
+    def get(self) -> int:
+        """Current version, polled at most once per interval"""
+        with self._lock:
+            now = time.monotonic()
+            if self._value is None or now - self._fetched_at >= self.interval:
+                self._value = self.fetch()
+                self._fetched_at = now
+                self.polls += 1
+            return self._value
+
+    def invalidate(self):
+        """Make the next get() poll the database"""
+        with self._lock:
+            self._value = None
@@ -3,15 +3,28 @@ Combined Flask Server for Lead Qualification and Scheduling Bot
 Serves both API endpoints and frontend dashboard
 """
 
-from flask import Flask, jsonify, request, send_from_directory, send_file
+from flask import Flask, Response, jsonify, request, send_from_directory
 from flask_cors import CORS
 from datetime import datetime, timedelta
-from database import MongoDBManager
+from database import MongoDBManager, build_search_query, build_search_tiers, rollup_key
+from response_cache import TTLCache, VersionPoller
 import os
+import json
+import base64
+import hashlib
 from bson import ObjectId
+from bson.errors import InvalidId
+from urllib.parse import quote
+from werkzeug.utils import secure_filename
 
 app = Flask(__name__, static_folder='dashboard/dist', static_url_path='')
-CORS(app)
+CORS(app, expose_headers=['ETag'])
+
+# Cache for read endpoints, keyed on normalized query parameters
+response_cache = TTLCache(
+    maxsize=int(os.getenv("API_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("API_CACHE_TTL_SECONDS", "30"))
+)
 
 # Initialize MongoDB
 try:
@@ -21,10 +34,164 @@ except Exception as e:
     print(f"[MongoDB Connection Failed: {e}]")
     db_manager = None
 
+# Leads data version in cache keys and ETags, read from MongoDB at most once
+# per interval; writes from other processes show up within that interval
+data_version = VersionPoller(
+    db_manager.get_data_version if db_manager else (lambda: 0),
+    interval=float(os.getenv("API_VERSION_POLL_SECONDS", "5"))
+)
+
+# Drop cached responses and re-read the version whenever this process writes leads
+if db_manager:
+    db_manager.add_write_listener(response_cache.clear)
+    db_manager.add_write_listener(data_version.invalidate)
+
+# Bytes read from GridFS per streamed audio chunk (GridFS stores 255 KiB chunks)
+AUDIO_STREAM_CHUNK = 255 * 1024
+
+# Recordings never change once stored, so browsers may cache them for a long time
+AUDIO_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+
+# Page size limits for /api/leads
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Fields needed to render a LeadCard; heavy fields (transcript, history,
+# qualification_data) are only returned by /api/leads/<id>
+SUMMARY_PROJECTION = {
+    'lead_name': 1,
+    'company_name': 1,
+    'status': 1,
+    'call_metadata.timestamp': 1,
+    'call_metadata.call_outcome': 1
+}
+
+# Sort keys per sort mode: (field, direction); _id breaks ties
+SORT_KEYS = {
+    'newest': ('call_metadata.timestamp', -1),
+    'oldest': ('call_metadata.timestamp', 1),
+    'name': ('lead_name', 1)
+}
+
+def date_range_cutoff(date_range: str):
+    """
+    Start of the dashboard date range ('7days', '30days'), or None for 'all'
+    In UTC, the clock call timestamps and rollup days are stored in
+    """
+    if date_range == 'all':
+        return None
+    days = 7 if date_range == '7days' else 30
+    return datetime.utcnow() - timedelta(days=days)
+
+def _page_sort(sort: str) -> list:
+    """Full sort spec for a sort mode, with _id as tiebreaker"""
+    field, direction = SORT_KEYS[sort]
+    return [(field, direction), ('_id', direction)]
+
+# Query shapes issued by the API, checked with explain() at startup
+QUERY_SHAPES = {
+    'leads_newest': ({}, _page_sort('newest')),
+    'leads_oldest': ({}, _page_sort('oldest')),
+    'leads_by_name': ({}, _page_sort('name')),
+    'leads_date_range': (
+        {'call_metadata.timestamp': {'$gte': datetime(2000, 1, 1)}},
+        _page_sort('newest')
+    ),
+    'leads_status': ({'call_metadata.call_outcome': 'qualified'}, _page_sort('newest')),
+    'leads_status_by_name': ({'call_metadata.call_outcome': 'qualified'}, _page_sort('name')),
+    'leads_search': (build_search_query('rahul'), _page_sort('newest')),
+    'leads_search_phonetic': (build_search_tiers('rahul')[-1], _page_sort('newest'))
+}
+
+# Query shapes issued against lead_calls (metrics before the rollups are built)
+LEAD_CALL_QUERY_SHAPES = {
+    'metrics_date_range': ({'timestamp': {'$gte': datetime(2000, 1, 1)}}, None)
+}
+
+# Warn at startup if any dashboard query falls back to a collection scan
+if db_manager:
+    db_manager.check_query_plans(QUERY_SHAPES)
+    db_manager.check_query_plans(LEAD_CALL_QUERY_SHAPES, db_manager.lead_calls_collection)
+
 # ============================================================
 # API ENDPOINTS
 # ============================================================
 
+def encode_cursor(sort: str, lead: dict, tier: int = 0) -> str:
+    """
+    Build an opaque keyset cursor from the last lead of a page
+    Holds the sort mode, the sort field value, the _id tiebreaker and
+    the search tier the lead came from (exact prefix or phonetic)
+    """
+    field, _ = SORT_KEYS[sort]
+    value = lead
+    for part in field.split('.'):
+        value = value.get(part) if isinstance(value, dict) else None
+    
+    payload = {'s': sort, 'id': str(lead['_id'])}
+    if tier:
+        payload['r'] = tier
+    if isinstance(value, datetime):
+        payload['t'] = value.isoformat()
+    else:
+        payload['v'] = value
+    
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def _cursor_payload(token: str) -> dict:
+    """Decoded cursor JSON; raises ValueError for malformed cursors"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if not isinstance(payload, dict):
+        raise ValueError("Invalid cursor: not an object")
+    return payload
+
+def cursor_tier(token: str) -> int:
+    """Search tier a cursor resumes in (0 unless the previous page reached phonetic matches)"""
+    tier = _cursor_payload(token).get('r', 0)
+    if not isinstance(tier, int) or tier < 0:
+        raise ValueError("Invalid cursor: bad search tier")
+    return tier
+
+def decode_cursor(token: str, sort: str) -> dict:
+    """
+    Turn a cursor back into a keyset filter for the given sort mode
+    A null value means the last lead had no sort field (older leads)
+    Raises ValueError for malformed cursors or cursors from another sort mode
+    """
+    payload = _cursor_payload(token)
+    try:
+        last_id = ObjectId(payload['id'])
+        if 't' in payload:
+            value = datetime.fromisoformat(payload['t'])
+        else:
+            value = payload.get('v')
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    
+    if payload.get('s') != sort:
+        raise ValueError("Cursor does not match sort order")
+    
+    field, direction = SORT_KEYS[sort]
+    op = '$lt' if direction == -1 else '$gt'
+    same_value = {field: value, '_id': {op: last_id}}
+    
+    # Leads missing the sort field sort before every value, so they come first
+    # ascending and last descending ($lt/$gt never match a missing field)
+    if value is None:
+        if direction == -1:
+            return same_value
+        return {'$or': [same_value, {field: {'$ne': None}}]}
+    
+    branches = [{field: {op: value}}, same_value]
+    if direction == -1:
+        branches.append({field: None})
+    return {'$or': branches}
+
 def normalize_lead(lead):
     """
     Ensure all expected fields exist with default values
@@ -66,6 +233,7 @@ def normalize_lead(lead):
         lead['call_metadata']['audio_recording_url'] = f'/api/audio/{recording_id}'
     else:
         lead['call_metadata']['audio_recording_url'] = ''
+    lead['call_metadata'].setdefault('recording_index', [])
     
     # Ensure requirement with all subfields
     if 'requirement' not in lead:
@@ -88,18 +256,70 @@ def normalize_lead(lead):
     
     return lead
 
+def normalize_lead_summary(lead):
+    """
+    Normalize a lead fetched with SUMMARY_PROJECTION
+    Only fills the fields the lead list actually renders
+    """
+    lead['id'] = str(lead.pop('_id', lead.get('id', 'unknown')))
+    
+    lead.setdefault('lead_name', 'N/A')
+    lead.setdefault('company_name', 'N/A')
+    lead.setdefault('status', 'new')
+    
+    call_metadata = lead.setdefault('call_metadata', {})
+    if isinstance(call_metadata.get('timestamp'), datetime):
+        call_metadata['timestamp'] = call_metadata['timestamp'].isoformat()
+    else:
+        call_metadata.setdefault('timestamp', datetime.now().isoformat())
+    call_metadata.setdefault('call_outcome', 'not_interested')
+    
+    return lead
+
+def make_etag(version: int, cache_key: tuple, day_relative: bool = False) -> str:
+    """
+    Entity tag for a cached response
+    Changes with the leads data version and the query; day_relative responses
+    (date ranges, today's counts) also change with the UTC calendar day
+    """
+    day = datetime.utcnow().strftime('%Y-%m-%d') if day_relative else None
+    raw = repr((version, cache_key, day))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:20]
+
+def not_modified(etag: str):
+    """Empty 304 response for a matching If-None-Match"""
+    response = app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
+def etag_json(payload, etag: str):
+    """JSON response carrying an ETag; clients must revalidate before reuse"""
+    response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "database": "connected" if db_manager else "disconnected"
+        "database": "connected" if db_manager else "disconnected",
+        "cache": response_cache.stats()
     })
 
 @app.route('/api/leads', methods=['GET'])
 def get_leads():
-    """Get all leads with optional filters"""
+    """
+    Get one page of leads with optional filters
+    
+    Uses keyset pagination on (sort field, _id): pass the returned
+    next_cursor back as ?cursor= to fetch the following page
+    
+    ?view=summary returns only the fields shown in the lead list;
+    the default full view returns complete lead documents
+    """
     if not db_manager:
         return jsonify({"error": "Database not connected"}), 500
     
@@ -109,44 +329,84 @@ def get_leads():
         status = request.args.get('status')
         search = request.args.get('search', '').strip()
         sort = request.args.get('sort', 'newest')
+        cursor = request.args.get('cursor')
+        view = request.args.get('view', 'full')
+        
+        if sort not in SORT_KEYS:
+            sort = 'name'
+        
+        try:
+            limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        
+        version = data_version.get()
+        cache_key = ('leads', date_range, status or '', search.lower(), sort, limit, cursor or '', view)
+        etag = make_etag(version, cache_key, day_relative=date_range != 'all')
+        if etag in request.if_none_match:
+            return not_modified(etag)
+        
+        hit, payload = response_cache.get((version,) + cache_key)
+        if hit:
+            return etag_json(payload, etag)
         
         # Build query
         query = {}
         
         # Date range filter
-        if date_range != 'all':
-            days = 7 if date_range == '7days' else 30
-            cutoff_date = datetime.now() - timedelta(days=days)
+        cutoff_date = date_range_cutoff(date_range)
+        if cutoff_date:
             query['call_metadata.timestamp'] = {'$gte': cutoff_date}
         
         # Status filter
         if status:
             query['call_metadata.call_outcome'] = status
         
-        # Search filter
-        if search:
-            query['$or'] = [
-                {'lead_name': {'$regex': search, '$options': 'i'}},
-                {'company_name': {'$regex': search, '$options': 'i'}}
-            ]
+        # Search filter (prefix/phonetic match on the search_tokens index):
+        # exact prefix hits are listed before phonetic-only hits
+        tiers = (build_search_tiers(search) if search else []) or [{}]
         
-        # Sort order
-        sort_order = -1 if sort == 'newest' else 1 if sort == 'oldest' else None
-        sort_field = 'call_metadata.timestamp' if sort_order else 'lead_name'
+        # Resume after the previous page
+        tier, keyset = 0, None
+        if cursor:
+            try:
+                tier = cursor_tier(cursor)
+                keyset = decode_cursor(cursor, sort)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            if tier >= len(tiers):
+                return jsonify({"error": "Cursor does not match search"}), 400
         
-        # Fetch leads
-        leads_cursor = db_manager.leads_collection.find(query)
-        if sort_order:
-            leads_cursor = leads_cursor.sort(sort_field, sort_order)
-        else:
-            leads_cursor = leads_cursor.sort(sort_field, 1)
+        # Fetch one extra lead to know whether another page exists, moving on
+        # to the next tier when one runs out
+        # (_id in the sort keeps the order stable for equal sort values)
+        projection = SUMMARY_PROJECTION if view == 'summary' else None
+        page = []
+        for tier in range(tier, len(tiers)):
+            clauses = [clause for clause in (query, tiers[tier], keyset) if clause]
+            tier_query = {'$and': clauses} if len(clauses) > 1 else (clauses[0] if clauses else {})
+            leads_cursor = db_manager.leads_collection.find(tier_query, projection).sort(
+                _page_sort(sort)
+            ).limit(limit + 1 - len(page))
+            page.extend((tier, lead) for lead in leads_cursor)
+            if len(page) > limit:
+                break
+            keyset = None
         
-        leads = []
-        for lead in leads_cursor:
-            normalized_lead = normalize_lead(lead)
-            leads.append(normalized_lead)
+        has_more = len(page) > limit
+        page = page[:limit]
         
-        return jsonify(leads)
+        next_cursor = encode_cursor(sort, page[-1][1], page[-1][0]) if has_more else None
+        normalize = normalize_lead_summary if view == 'summary' else normalize_lead
+        leads = [normalize(lead) for _, lead in page]
+        
+        payload = {
+            "leads": leads,
+            "next_cursor": next_cursor
+        }
+        response_cache.set((version,) + cache_key, payload)
+        return etag_json(payload, etag)
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -158,61 +418,208 @@ def get_lead(lead_id):
         return jsonify({"error": "Database not connected"}), 500
     
     try:
+        version = data_version.get()
+        cache_key = ('lead', lead_id)
+        etag = make_etag(version, cache_key)
+        if etag in request.if_none_match:
+            return not_modified(etag)
+        
+        hit, normalized_lead = response_cache.get((version,) + cache_key)
+        if hit:
+            return etag_json(normalized_lead, etag)
+        
         lead = db_manager.leads_collection.find_one({'_id': ObjectId(lead_id)})
         if not lead:
             return jsonify({"error": "Lead not found"}), 404
         
         normalized_lead = normalize_lead(lead)
-        return jsonify(normalized_lead)
+        response_cache.set((version,) + cache_key, normalized_lead)
+        return etag_json(normalized_lead, etag)
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def aggregate_metrics(cutoff_date):
+    """
+    Compute metrics from lead_calls (every stored call, as the rollups count
+    them) with a single $facet aggregation, and executive assignments from
+    scheduled_calls. Used until the metrics rollups have been built (rebuild-rollups)
+    """
+    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    
+    match = {'timestamp': {'$gte': cutoff_date}} if cutoff_date else {}
+    pipeline = [
+        {'$match': match},
+        {'$facet': {
+            'totals': [{'$group': {
+                '_id': None,
+                'count': {'$sum': 1},
+                'duration_total': {'$sum': '$duration_seconds'}
+            }}],
+            'outcomes': [{'$group': {
+                '_id': '$call_outcome',
+                'count': {'$sum': 1}
+            }}],
+            'today': [
+                {'$match': {'timestamp': {'$gte': today_start}}},
+                {'$count': 'count'}
+            ]
+        }}
+    ]
+    result = next(db_manager.lead_calls_collection.aggregate(pipeline), {})
+    
+    assignment_match = {'executive_email': {'$exists': True}}
+    if cutoff_date:
+        assignment_match['created_at'] = {'$gte': cutoff_date}
+    assignments = db_manager.scheduled_calls_collection.aggregate([
+        {'$match': assignment_match},
+        {'$group': {'_id': '$executive_email', 'count': {'$sum': 1}}}
+    ])
+    
+    totals = (result.get('totals') or [{}])[0]
+    return {
+        'calls': totals.get('count', 0),
+        'duration_total': totals.get('duration_total', 0),
+        'outcomes': {
+            rollup_key(row['_id']): row['count'] for row in result.get('outcomes', [])
+        },
+        'executives': {
+            rollup_key(row['_id']): row['count'] for row in assignments
+        },
+        'today_calls': (result.get('today') or [{}])[0].get('count', 0)
+    }
+
 @app.route('/api/metrics', methods=['GET'])
 def get_metrics():
-    """Get dashboard metrics"""
+    """
+    Get dashboard metrics for a date range
+    
+    Reads the daily rollup documents maintained by store_lead (at most ~31
+    small documents per range); falls back to a $facet aggregation over
+    lead_calls if rollups have not been built yet
+    """
     if not db_manager:
         return jsonify({"error": "Database not connected"}), 500
     
     try:
-        total_calls = db_manager.leads_collection.count_documents({})
-        qualified_calls = db_manager.leads_collection.count_documents({
-            'call_metadata.call_outcome': 'qualified'
-        })
+        date_range = request.args.get('date_range', 'all')
         
-        success_rate = round((qualified_calls / total_calls * 100)) if total_calls > 0 else 0
+        version = data_version.get()
+        cache_key = ('metrics', date_range)
+        etag = make_etag(version, cache_key, day_relative=True)  # todaysCalls
+        if etag in request.if_none_match:
+            return not_modified(etag)
         
-        # Today's calls
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        todays_calls = db_manager.leads_collection.count_documents({
-            'call_metadata.timestamp': {'$gte': today_start}
-        })
+        hit, payload = response_cache.get((version,) + cache_key)
+        if hit:
+            return etag_json(payload, etag)
         
-        return jsonify({
+        cutoff_date = date_range_cutoff(date_range)
+        totals = db_manager.get_rollup_metrics(cutoff_date)
+        if totals is None:
+            totals = aggregate_metrics(cutoff_date)
+        
+        total_calls = totals['calls']
+        qualified_calls = totals['outcomes'].get('qualified', 0)
+        success_rate = round((qualified_calls / total_calls * 100)) if total_calls > 0 else 0
+        avg_duration = round(totals['duration_total'] / total_calls) if total_calls > 0 else 0
+        
+        payload = {
             "totalCalls": total_calls,
             "successRate": success_rate,
-            "todaysCalls": todays_calls
-        })
+            "todaysCalls": totals['today_calls'],
+            "outcomeBreakdown": totals['outcomes'],
+            "avgDurationSeconds": avg_duration,
+            "executiveAssignments": totals['executives']
+        }
+        response_cache.set((version,) + cache_key, payload)
+        return etag_json(payload, etag)
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def content_disposition(filename: str, fallback: str, disposition: str = 'inline') -> str:
+    """
+    Content-Disposition header value for a stored file name
+    Names come from lead names, so quotes, CR/LF and non-ASCII characters are
+    kept out of the plain filename and sent RFC 5987-encoded in filename*
+    """
+    safe_name = secure_filename(filename or '') or fallback
+    value = f'{disposition}; filename="{safe_name}"'
+    if filename and filename != safe_name:
+        value += f"; filename*=UTF-8''{quote(filename, safe='')}"
+    return value
+
+def stream_grid_file(grid_out, start: int, stop: int):
+    """Yield bytes [start, stop) of a GridFS file, reading only the chunks that cover them"""
+    try:
+        grid_out.seek(start)
+        remaining = stop - start
+        while remaining > 0:
+            data = grid_out.read(min(AUDIO_STREAM_CHUNK, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        grid_out.close()
+
 @app.route('/api/audio/<recording_id>', methods=['GET'])
 def get_audio(recording_id):
-    """Stream audio recording"""
+    """
+    Stream audio recording
+    
+    Honors single byte ranges (206 Partial Content) so the player can
+    seek without downloading the whole file; the mimetype comes from the
+    stored codec (Opus/OGG, FLAC or WAV)
+    """
     if not db_manager:
         return jsonify({"error": "Database not connected"}), 500
     
     try:
         audio_file = db_manager.fs.get(ObjectId(recording_id))
-        return send_file(
-            audio_file,
-            mimetype='audio/wav',
-            as_attachment=False,
-            download_name=f'recording_{recording_id}.wav'
-        )
     except Exception as e:
         return jsonify({"error": str(e)}), 404
+    
+    size = audio_file.length
+    etag = f'{recording_id}-{size}'
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': AUDIO_CACHE_CONTROL,
+        'ETag': f'"{etag}"',
+        'Content-Disposition': content_disposition(audio_file.filename, f"recording_{recording_id}.wav")
+    }
+    
+    if etag in request.if_none_match:
+        audio_file.close()
+        return Response(status=304, headers=headers)
+    
+    # Serve the requested range unless If-Range names a different version
+    byte_range = request.range
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range.strip('"') != etag:
+        byte_range = None
+    
+    status = 200
+    start, stop = 0, size
+    if byte_range and len(byte_range.ranges) == 1:
+        requested = byte_range.range_for_length(size)
+        if requested is None:
+            audio_file.close()
+            headers['Content-Range'] = f'bytes */{size}'
+            return Response(status=416, headers=headers)
+        start, stop = requested
+        status = 206
+        headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+    
+    headers['Content-Length'] = str(stop - start)
+    return Response(
+        stream_grid_file(audio_file, start, stop),
+        status=status,
+        headers=headers,
+        mimetype=(audio_file.metadata or {}).get('content_type', 'audio/wav'),
+        direct_passthrough=True
+    )
 
 @app.route('/api/export/transcript/<lead_id>', methods=['GET'])
 def export_transcript(lead_id):
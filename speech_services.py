@@ -0,0 +1,119 @@
+"""
+Speech and conversation helpers shared by the voice bot, the call engine and tooling
+Kept free of audio-device imports so scripts can run headless
+"""
+
+import json
+import os
+import re
+from typing import Dict, Optional
+from dotenv import load_dotenv
+from http_client import get_http_client
+
+load_dotenv()
+
+GROQ_MODEL = "llama-3.3-70b-versatile"
+LLM_TEMPERATURE = 0.4
+
+DEEPGRAM_VOICE = "aura-luna-en"
+# Override to point at local stand-in servers (see loadtest.py); Groq reads GROQ_BASE_URL itself
+DEEPGRAM_API_URL = os.getenv("DEEPGRAM_API_URL", "https://api.deepgram.com").rstrip("/")
+DEEPGRAM_SPEAK_URL = f"{DEEPGRAM_API_URL}/v1/speak"
+DEEPGRAM_LISTEN_URL = f"{DEEPGRAM_API_URL}/v1/listen"
+
+# Matches the microphone capture rate so TTS clips can go into the call recording
+TTS_SAMPLE_RATE = 16000
+
+# Cache namespace: a different voice or output format must not reuse old audio
+TTS_VOICE_KEY = f"{DEEPGRAM_VOICE}:linear16:{TTS_SAMPLE_RATE}"
+
+# Raw 16-bit PCM in a WAV container so it can be played straight from memory
+TTS_PARAMS = {
+    "model": DEEPGRAM_VOICE,
+    "encoding": "linear16",
+    "sample_rate": TTS_SAMPLE_RATE,
+    "container": "wav"
+}
+
+
+def load_system_prompt(lead_name: str = "", company_name: str = "") -> str:
+    """Load system prompt from prompt.md and inject lead_name and company_name"""
+    prompt_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompt.md")
+    with open(prompt_path, "r", encoding="utf-8") as f:
+        prompt = f.read()
+
+    # Replace placeholders if provided
+    if lead_name:
+        prompt = prompt.replace("{lead_name}", lead_name)
+    if company_name:
+        prompt = prompt.replace("{company_name}", company_name)
+
+    return prompt
+
+
+def tts_headers() -> Dict:
+    """Deepgram auth headers for a TTS request"""
+    return {
+        "Authorization": f"Token {os.getenv('DEEPGRAM_API_KEY')}",
+        "Content-Type": "application/json"
+    }
+
+
+def tts_input(text: str) -> str:
+    """Text as sent to Deepgram (adds a pause before question marks for better intonation)"""
+    if text.strip().endswith('?'):
+        text = text.strip()[:-1] + '...?'
+    return text
+
+
+def deepgram_tts(text: str) -> bytes:
+    """Generate speech using Deepgram Aura and return the audio bytes"""
+    response = get_http_client().post(
+        DEEPGRAM_SPEAK_URL,
+        params=TTS_PARAMS,
+        headers=tts_headers(),
+        json={"text": tts_input(text)},
+        endpoint="deepgram.speak"
+    )
+    response.raise_for_status()
+
+    return response.content
+
+
+def clean_text_for_tts(text: str) -> str:
+    """Remove markdown, prefixes, and stage directions"""
+    text = re.sub(r'\([^)]*\)', '', text)  # Remove (stage directions)
+    text = re.sub(r'\[[^\]]*\]', '', text)  # Remove [notes]
+    text = re.sub(r'\*\*([^*]+)\*\*', r'\1', text)  # Remove **bold**
+    text = re.sub(r'\*([^*]+)\*', r'\1', text)  # Remove *italic*
+    text = re.sub(r'^(\*\*)?Priya(\*\*)?:\s*', '', text, flags=re.IGNORECASE)  # Remove "Priya:"
+    text = re.sub(r'^(Bot|Assistant|AI):\s*', '', text, flags=re.IGNORECASE)  # Remove other prefixes
+    text = re.sub(r'\.\s+', '.', text)  # Remove space after period for natural TTS flow
+    text = re.sub(r'\s+', ' ', text)  # Clean whitespace
+    return text.strip()
+
+
+# First JSON object in the text (one level of nesting allowed)
+JSON_OBJECT = re.compile(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', re.DOTALL)
+
+
+def is_json_output(text: str) -> bool:
+    """Check if text contains JSON qualification data"""
+    # Check for JSON code blocks
+    if '```json' in text.lower() or ('```' in text and '{' in text):
+        return True
+    # Check if text contains JSON object (can be anywhere in text)
+    return extract_json(text) is not None
+
+
+def extract_json(text: str) -> Optional[Dict]:
+    """Parse the qualification JSON object out of an LLM response, or None"""
+    if '{' not in text or '}' not in text:
+        return None
+    json_match = JSON_OBJECT.search(text)
+    if not json_match:
+        return None
+    try:
+        return json.loads(json_match.group(0))
+    except ValueError:
+        return None
@@ -0,0 +1,233 @@
+"""
+Streaming speech-to-text over the Deepgram live WebSocket API
+Audio is sent while the caller is still talking; the transcript is
+ready shortly after end-of-speech instead of after a full REST upload
+"""
+
+import json
+import os
+import threading
+from contextlib import ExitStack
+from typing import Callable, List, Optional
+from urllib.parse import urlencode
+
+try:
+    from websockets.sync.client import connect as ws_connect
+except ImportError:  # Optional: listen_for_speech falls back to the REST API
+    ws_connect = None
+
+# Override to point at a local stand-in server for testing
+DEEPGRAM_STT_WS_URL = os.getenv("DEEPGRAM_STT_WS_URL", "wss://api.deepgram.com/v1/listen")
+
+
+class StreamingTranscriber:
+    """
+    One live transcription stream for a single utterance
+
+    Usage:
+        stt = StreamingTranscriber(api_key)
+        stt.start()
+        stt.send_audio(pcm_chunk)   # repeatedly, as audio arrives
+        transcript = stt.finish()
+    """
+
+    def __init__(self, api_key: str, sample_rate: int = 16000, channels: int = 1,
+                 model: str = "nova-2", url: Optional[str] = None,
+                 on_interim: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            api_key: Deepgram API key
+            sample_rate: Sample rate of the raw 16-bit PCM being sent
+            channels: Channel count of the PCM being sent
+            model: Deepgram model name
+            url: WebSocket endpoint (defaults to DEEPGRAM_STT_WS_URL)
+            on_interim: Called with each interim (non-final) transcript
+        """
+        params = {
+            "model": model,
+            "encoding": "linear16",
+            "sample_rate": sample_rate,
+            "channels": channels,
+            "interim_results": "true",
+            "punctuate": "true",
+            "smart_format": "true"
+        }
+        self.url = f"{url or DEEPGRAM_STT_WS_URL}?{urlencode(params)}"
+        self.api_key = api_key
+        self.on_interim = on_interim
+
+        self._ws = None
+        self._connection = ExitStack()  # Holds the socket's context (websockets closes it on exit)
+        self._receiver = None
+        self._final_segments: List[str] = []
+        self._interim = ""
+        self._finalized = threading.Event()
+        self._lock = threading.Lock()
+        self.error: Optional[Exception] = None
+
+    @staticmethod
+    def available() -> bool:
+        """True if the websockets package is installed"""
+        return ws_connect is not None
+
+    def start(self):
+        """Open the WebSocket and start receiving transcripts"""
+        if ws_connect is None:
+            raise RuntimeError("Streaming STT requires the 'websockets' package")
+
+        # Entered as a context manager, as websockets requires for direct connections
+        self._ws = self._connection.enter_context(ws_connect(
+            self.url,
+            additional_headers={"Authorization": f"Token {self.api_key}"},
+            open_timeout=5
+        ))
+        self._receiver = threading.Thread(target=self._receive_loop, daemon=True)
+        self._receiver.start()
+
+    def send_audio(self, pcm: bytes):
+        """Send a chunk of raw linear16 PCM"""
+        if self._ws is None:
+            return
+        if self._finalized.is_set():
+            # The receiver only stops early if the server dropped the stream
+            raise self.error or ConnectionError("Streaming STT closed before the utterance ended")
+        self._ws.send(pcm)
+
+    def _receive_loop(self):
+        """Collect final segments and report interim results until the socket closes"""
+        try:
+            for message in self._ws:
+                if isinstance(message, bytes):
+                    continue
+                data = json.loads(message)
+                if data.get("type") != "Results":
+                    continue
+
+                alternatives = data.get("channel", {}).get("alternatives") or [{}]
+                text = alternatives[0].get("transcript", "").strip()
+
+                with self._lock:
+                    if data.get("is_final"):
+                        if text:
+                            self._final_segments.append(text)
+                        self._interim = ""
+                    else:
+                        self._interim = text
+
+                if not data.get("is_final") and text and self.on_interim:
+                    self.on_interim(text)
+
+                if data.get("from_finalize"):
+                    self._finalized.set()
+        except Exception as e:
+            self.error = e
+        finally:
+            self._finalized.set()
+
+    def finish(self, timeout: float = 2.0) -> str:
+        """
+        Flush buffered audio and return the full transcript
+
+        Sends Finalize and waits for the flushed result (or timeout),
+        then closes the stream without waiting for the server's close.
+        """
+        if self._ws is None:
+            return ""
+
+        try:
+            self._ws.send(json.dumps({"type": "Finalize"}))
+            self._finalized.wait(timeout)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.close()
+
+        with self._lock:
+            segments = list(self._final_segments)
+            if self._interim:
+                # Nothing finalized the tail in time; the interim text is the best guess
+                segments.append(self._interim)
+        return " ".join(segments).strip()
+
+    def close(self):
+        """Ask the server to close the stream and drop the connection"""
+        if self._ws is None:
+            return
+        try:
+            self._ws.send(json.dumps({"type": "CloseStream"}))
+        except Exception:
+            pass
+        try:
+            self._connection.close()
+        except Exception:
+            pass
+        self._ws = None
+
+
+class UtteranceTranscription:
+    """
+    Transcribes one utterance over a live stream, falling back to one REST request
+
+    A stream that cannot open or fails mid-utterance is dropped, and finish()
+    sends the buffered frames to rest_transcribe instead, so a network blip
+    costs one REST round trip rather than the caller's turn.
+
+    Usage:
+        stt = UtteranceTranscription(rest_transcribe, StreamingTranscriber(api_key))
+        stt.start(preroll_pcm)
+        stt.send(pcm_chunk)         # repeatedly, while the caller speaks
+        transcript = stt.finish(buffered_frames)
+    """
+
+    def __init__(self, rest_transcribe: Callable[[List[bytes]], str],
+                 stream: Optional[StreamingTranscriber] = None):
+        """
+        Args:
+            rest_transcribe: Transcribes a list of PCM frames in one request
+            stream: Live stream to try first (None to use REST only)
+        """
+        self.rest_transcribe = rest_transcribe
+        self.stream = stream
+        self.mode = "streaming" if stream else "rest"
+        self.error: Optional[Exception] = None
+
+    def start(self, preroll: bytes = b""):
+        """Open the stream and catch it up on audio captured before speech was detected"""
+        if self.stream is None:
+            return
+        try:
+            self.stream.start()
+            if preroll:
+                self.stream.send_audio(preroll)
+        except Exception as e:
+            self._fall_back(e, "unavailable")
+
+    def send(self, pcm: bytes):
+        """Stream a chunk of the utterance (no-op once on REST)"""
+        if self.stream is None:
+            return
+        try:
+            self.stream.send_audio(pcm)
+        except Exception as e:
+            self._fall_back(e, "failed")
+
+    def finish(self, frames: List[bytes]) -> str:
+        """Final transcript: from the stream if it held up, else from the buffered frames over REST"""
+        if self.stream is not None:
+            transcript = self.stream.finish()
+            if self.stream.error is None:
+                return transcript
+            self._fall_back(self.stream.error, "failed")
+        return self.rest_transcribe(frames)
+
+    def close(self):
+        """Drop the stream without transcribing (call ended or errored)"""
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+    def _fall_back(self, error: Exception, what: str):
+        print(f"\n[Streaming STT {what}, using REST: {error}]")
+        self.error = error
+        self.close()
+        self.mode = "rest"
@@ -0,0 +1,27 @@
+import os
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+# Tests import the top-level modules directly, as the scripts do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import MongoDBManager  # noqa: E402
+
+
+@pytest.fixture
+def manager():
+    """MongoDBManager with MagicMock collections, without connecting"""
+    db = MongoDBManager.__new__(MongoDBManager)
+    db.client = MagicMock()
+    db.db = MagicMock()
+    db.fs = MagicMock()
+    for name in ("leads", "conversations", "scheduled_calls", "metrics", "meta", "lead_calls"):
+        setattr(db, f"{name}_collection", MagicMock(name=name))
+    db.metrics_collection.name = "metrics_daily"
+    db.lead_calls_collection.name = "lead_calls"
+    db.leads_collection.name = "leads"
+    db.calendar_manager = None
+    db._write_listeners = []
+    return db
@@ -0,0 +1,105 @@
+"""In-memory stand-in for the few pymongo collection features the API uses"""
+
+
+def get_field(doc, path):
+    for part in path.split('.'):
+        doc = doc.get(part) if isinstance(doc, dict) else None
+    return doc
+
+
+def _compare(value, op, operand):
+    values = value if isinstance(value, list) else [value]
+    if op == '$in':
+        return any(v in operand for v in values)
+    if op == '$ne':
+        return operand not in values
+    if op == '$exists':
+        return (value is not None) == operand
+    if value is None or operand is None:
+        return False  # range operators never match across null
+    if op == '$lt':
+        return value < operand
+    if op == '$gt':
+        return value > operand
+    if op == '$gte':
+        return value >= operand
+    raise NotImplementedError(op)
+
+
+def matches(doc, query):
+    """Evaluate a filter with MongoDB's null and array-element semantics"""
+    for key, condition in query.items():
+        if key == '$and':
+            ok = all(matches(doc, branch) for branch in condition)
+        elif key == '$or':
+            ok = any(matches(doc, branch) for branch in condition)
+        elif key == '$nor':
+            ok = not any(matches(doc, branch) for branch in condition)
+        elif isinstance(condition, dict):
+            value = get_field(doc, key)
+            ok = all(_compare(value, op, operand) for op, operand in condition.items())
+        else:
+            value = get_field(doc, key)
+            ok = condition in value if isinstance(value, list) else value == condition
+        if not ok:
+            return False
+    return True
+
+
+def sort_key(doc, field):
+    """MongoDB order: missing/null values sort before all others"""
+    value = get_field(doc, field)
+    return (value is not None, value if value is not None else 0)
+
+
+def project(doc, projection):
+    """Apply an inclusion projection (dotted paths; _id is kept)"""
+    if not projection:
+        return dict(doc)
+    projected = {'_id': doc['_id']} if '_id' in doc else {}
+    for path, included in projection.items():
+        if not included:
+            continue
+        source, target = doc, projected
+        parts = path.split('.')
+        for part in parts[:-1]:
+            source = source.get(part) if isinstance(source, dict) else None
+            if not isinstance(source, dict):
+                break
+            target = target.setdefault(part, {})
+        else:
+            if parts[-1] in source:
+                target[parts[-1]] = source[parts[-1]]
+    return projected
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, spec):
+        for field, direction in reversed(spec):
+            self.docs = sorted(self.docs, key=lambda d: sort_key(d, field), reverse=direction == -1)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    def __iter__(self):
+        return iter(list(self.docs))
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.queries = []
+        self.projections = []
+
+    def find(self, query=None, projection=None):
+        self.queries.append(query or {})
+        self.projections.append(projection)
+        return FakeCursor([project(d, projection) for d in self.docs if matches(d, query or {})])
+
+    def find_one(self, query=None, projection=None):
+        return next(iter(self.find(query, projection)), None)
@@ -0,0 +1,88 @@
+"""Recording compression round trips, fallbacks and the GridFS upload"""
+
+import math
+import os
+import wave
+from array import array
+
+import pytest
+
+import audio_codec
+from audio_codec import encode_recording
+
+soundfile = pytest.importorskip("soundfile")
+
+
+def write_wav(path, rate=16000, seconds=2.0, channels=1):
+    samples = array("h", (int(8000 * math.sin(2 * math.pi * 440 * i / rate))
+                          for i in range(int(rate * seconds)) for _ in range(channels)))
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(samples.tobytes())
+    return str(path), samples
+
+
+def test_flac_round_trip_is_lossless(tmp_path):
+    path, samples = write_wav(tmp_path / "call.wav", channels=2)
+    encoded = encode_recording(path, "flac")
+    try:
+        assert encoded["codec"] == "flac" and encoded["temporary"]
+        assert encoded["content_type"] == "audio/flac" and encoded["channels"] == 2
+        assert encoded["encoded_bytes"] < encoded["original_bytes"]
+        decoded, rate = soundfile.read(encoded["path"], dtype="int16")
+        assert rate == 16000 and list(decoded.flatten()) == list(samples)
+    finally:
+        os.remove(encoded["path"])
+
+
+@pytest.mark.skipif(not audio_codec.codec_supported("opus"), reason="libsndfile without Opus")
+def test_opus_is_much_smaller_and_keeps_the_duration(tmp_path):
+    path, _ = write_wav(tmp_path / "call.wav")
+    encoded = encode_recording(path, "opus")
+    try:
+        assert encoded["codec"] == "opus" and encoded["extension"] == ".ogg"
+        assert encoded["encoded_bytes"] * 5 < encoded["original_bytes"]
+        assert encoded["duration_seconds"] == 2.0
+        assert abs(soundfile.info(encoded["path"]).duration - 2.0) < 0.05
+    finally:
+        os.remove(encoded["path"])
+
+
+def test_opus_at_an_unsupported_rate_falls_back_to_flac(tmp_path):
+    path, _ = write_wav(tmp_path / "call.wav", rate=22050, seconds=0.5)
+    encoded = encode_recording(path, "opus")
+    os.remove(encoded["path"])
+    assert encoded["codec"] == "flac"
+
+
+def test_without_soundfile_the_wav_is_stored(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_codec, "soundfile", None)
+    path, _ = write_wav(tmp_path / "call.wav", seconds=0.5)
+    encoded = encode_recording(path, "opus")
+    assert encoded["codec"] == "wav" and encoded["path"] == path and not encoded["temporary"]
+
+
+def test_failed_encode_keeps_the_wav_and_removes_the_partial_file(tmp_path, monkeypatch):
+    path, _ = write_wav(tmp_path / "call.wav", seconds=0.5)
+    made = []
+    mkstemp = audio_codec.tempfile.mkstemp
+    monkeypatch.setattr(audio_codec.tempfile, "mkstemp", lambda **kw: made.append(mkstemp(**kw)) or made[-1])
+    monkeypatch.setattr(audio_codec, "ENCODE_BLOCK_FRAMES", "not a size")
+    encoded = encode_recording(path, "flac")
+    assert encoded["codec"] == "wav" and encoded["path"] == path
+    assert not os.path.exists(made[0][1])
+
+
+def test_upload_stores_the_codec_and_removes_the_encoded_file(manager, tmp_path):
+    path, _ = write_wav(tmp_path / "call.wav", seconds=0.5)
+    uploaded = []
+    manager.fs.put.side_effect = lambda f, **kwargs: uploaded.append((f.name, kwargs)) or "file-id"
+
+    assert manager._store_recording("Rahul", path) == "file-id"
+    name, kwargs = uploaded[0]
+    _, _, content_type, extension = audio_codec.RECORDING_CODECS[kwargs["metadata"]["codec"]]
+    assert kwargs["content_type"] == content_type and kwargs["filename"].endswith(extension)
+    assert kwargs["metadata"]["duration_seconds"] == 0.5
+    assert not os.path.exists(name) and os.path.exists(path)
@@ -0,0 +1,106 @@
+"""Recording downloads: byte ranges, revalidation and Content-Disposition"""
+
+import io
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+import server
+
+AUDIO = bytes(range(256)) * 40  # 10240 bytes
+
+
+class FakeGridOut(io.BytesIO):
+    def __init__(self, data, metadata=None):
+        super().__init__(data)
+        self.length = len(data)
+        self.filename = 'Rahul_20250101.opus'
+        self.metadata = metadata
+
+
+@pytest.fixture
+def audio(monkeypatch):
+    recording_id = str(ObjectId())
+    opened = []
+
+    def get(file_id):
+        assert str(file_id) == recording_id
+        opened.append(FakeGridOut(AUDIO, {'content_type': 'audio/ogg'}))
+        return opened[-1]
+
+    monkeypatch.setattr(server, 'db_manager', SimpleNamespace(fs=SimpleNamespace(get=get)))
+    client = server.app.test_client()
+    return lambda **headers: client.get(f'/api/audio/{recording_id}', headers=headers), recording_id, opened
+
+
+def test_whole_file_without_a_range(audio):
+    get, recording_id, opened = audio
+    response = get()
+    assert response.status_code == 200
+    assert response.data == AUDIO
+    assert response.headers['Content-Length'] == str(len(AUDIO))
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.mimetype == 'audio/ogg'
+    assert opened[0].closed
+
+
+def test_range_is_served_as_partial_content(audio):
+    get, _, _ = audio
+    response = get(Range='bytes=100-1099')
+    assert response.status_code == 206
+    assert response.headers['Content-Range'] == f'bytes 100-1099/{len(AUDIO)}'
+    assert response.headers['Content-Length'] == '1000'
+    assert response.data == AUDIO[100:1100]
+
+    suffix = get(Range='bytes=-10')
+    assert suffix.status_code == 206 and suffix.data == AUDIO[-10:]
+
+
+def test_unsatisfiable_range_is_416(audio):
+    get, _, opened = audio
+    response = get(Range=f'bytes={len(AUDIO)}-')
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f'bytes */{len(AUDIO)}'
+    assert opened[0].closed
+
+
+def test_stale_if_range_falls_back_to_the_whole_file(audio):
+    get, recording_id, _ = audio
+    response = get(Range='bytes=0-99', **{'If-Range': '"other-version"'})
+    assert response.status_code == 200 and response.data == AUDIO
+
+    current = get(Range='bytes=0-99', **{'If-Range': f'"{recording_id}-{len(AUDIO)}"'})
+    assert current.status_code == 206 and current.data == AUDIO[:100]
+
+
+def test_matching_etag_is_304(audio):
+    get, _, opened = audio
+    etag = get().headers['ETag']
+    response = get(**{'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert opened[1].closed
+
+
+def test_plain_names_pass_through():
+    assert server.content_disposition('Rahul_20250101.opus', 'x.wav') == 'inline; filename="Rahul_20250101.opus"'
+
+
+def test_quotes_and_newlines_cannot_inject_header_content():
+    value = server.content_disposition('a"; evil=1\r\nSet-Cookie: x.wav', 'x.wav')
+    assert '\r' not in value and '\n' not in value
+    plain = value.split('; filename*=')[0]
+    assert plain.count('"') == 2
+
+
+def test_non_ascii_names_use_rfc5987():
+    value = server.content_disposition('José Kumar.opus', 'x.wav')
+    assert value.startswith('inline; filename="Jose_Kumar.opus"')
+    assert "filename*=UTF-8''Jos%C3%A9%20Kumar.opus" in value
+
+
+def test_missing_or_unusable_names_fall_back():
+    assert server.content_disposition(None, 'recording_1.wav') == 'inline; filename="recording_1.wav"'
+    assert server.content_disposition('राहुल', 'recording_1.wav').startswith(
+        'inline; filename="recording_1.wav"')
@@ -0,0 +1,122 @@
+"""In-memory playback: WAV parsing, stream reuse and interruption"""
+
+import io
+import struct
+import threading
+import wave
+from types import SimpleNamespace
+
+import pytest
+
+import audio_playback
+from audio_playback import NullSink, PyAudioSink, RecordingSink, create_sink, split_wav
+
+
+def wav(frames=1600, rate=16000, channels=1):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(b"\x01\x00" * frames * channels)
+    return buffer.getvalue()
+
+
+def test_split_wav_returns_pcm_and_format():
+    pcm, rate, channels, width = split_wav(wav(frames=100, rate=24000, channels=2))
+    assert (len(pcm), rate, channels, width) == (400, 24000, 2, 2)
+
+
+def test_split_wav_skips_other_chunks_and_tolerates_streaming_sizes():
+    audio = wav(frames=100)
+    fmt_end = 12 + 8 + 16
+    extra = b"LIST" + struct.pack("<I", 3) + b"abc\x00"  # Odd size: padded
+    streaming = audio[:fmt_end] + extra + b"data" + struct.pack("<I", 0xFFFFFFFF) + audio[fmt_end + 8:]
+    pcm, rate, _, _ = split_wav(streaming)
+    assert len(pcm) == 200 and rate == 16000
+
+
+@pytest.mark.parametrize("audio", [b"ID3\x03mp3 data", b"RIFF\x00\x00\x00\x00WAVE"])
+def test_split_wav_rejects_other_audio(audio):
+    with pytest.raises(ValueError):
+        split_wav(audio)
+
+
+class FakeStream:
+    def __init__(self, device, **kwargs):
+        self.device, self.log, self.kwargs = device, device.log, kwargs
+        self.writes = []
+
+    def write(self, data):
+        self.writes.append(data)
+        self.log.append(("write", len(data)))
+        if self.device.on_write:
+            self.device.on_write(self)
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        self.log.append(("close", self.kwargs["rate"]))
+
+
+class FakePyAudio:
+    def __init__(self):
+        self.log = []
+        self.streams = []
+        self.on_write = None
+
+    def open(self, **kwargs):
+        self.streams.append(FakeStream(self, **kwargs))
+        return self.streams[-1]
+
+    def get_format_from_width(self, width):
+        return width
+
+    def terminate(self):
+        self.log.append(("terminate",))
+
+
+@pytest.fixture
+def device(monkeypatch):
+    fake = FakePyAudio()
+    monkeypatch.setattr(audio_playback, "pyaudio", SimpleNamespace(PyAudio=lambda: fake))
+    return fake
+
+
+def test_stream_is_reused_until_the_format_changes(device):
+    sink = PyAudioSink()
+    assert sink.play(wav()) == 1.0
+    assert sink.play(wav()) == 1.0
+    assert len(device.streams) == 1
+    # Two 100 ms clips at 16 kHz in PLAYBACK_BLOCK_MS blocks
+    assert [len(w) for w in device.streams[0].writes] == [640] * 10
+
+    sink.play(wav(rate=24000))
+    assert len(device.streams) == 2 and ("close", 16000) in device.log
+    sink.close()
+    assert device.log[-2:] == [("close", 24000), ("terminate",)]
+
+
+def test_stop_interrupts_between_blocks(device):
+    sink = PyAudioSink()
+    device.on_write = lambda stream: len(stream.writes) == 3 and sink.stop()
+    assert sink.play(wav()) == pytest.approx(0.6)  # 3 of 5 blocks
+    device.on_write = None
+    assert sink.play(wav()) == 1.0  # The next clip plays in full
+
+
+def test_realtime_null_sink_reports_the_fraction_played():
+    sink = NullSink(realtime=True)
+    threading.Timer(0.1, sink.stop).start()
+    fraction = sink.play(wav(frames=16000))  # 1 s clip
+    assert 0.05 < fraction < 0.5
+
+
+def test_recording_sink_keeps_clips_and_unknown_sinks_fail():
+    sink = create_sink("recording")
+    assert isinstance(sink, RecordingSink)
+    sink.play(b"clip")
+    assert sink.clips == [b"clip"]
+    with pytest.raises(ValueError):
+        create_sink("speakers")
@@ -0,0 +1,100 @@
+"""Barge-in: caller speech during playback stops the bot mid-sentence"""
+
+import io
+import math
+import threading
+import wave
+from array import array
+from functools import partial
+from unittest.mock import MagicMock
+
+import pytest
+
+from audio_playback import NullSink
+from tts_pipeline import TTSPipeline
+from vad_endpointer import Endpointer
+
+RATE = 16000
+
+
+def tone(amplitude):
+    return array("h", (int(amplitude * math.sin(2 * math.pi * 200 * i / RATE)) for i in range(480))).tobytes()
+
+
+QUIET = tone(10)
+VOICED = tone(3000)
+
+
+def clip(seconds):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(RATE)
+        wf.writeframes(b"\x00\x00" * int(RATE * seconds))
+    return buffer.getvalue()
+
+
+def test_interrupt_stops_the_sink_mid_clip_and_drops_the_rest():
+    sink = NullSink(realtime=True)
+    pipeline = TTSPipeline(lambda text: clip(1.0), sink.play, stop=sink.stop)
+    pipeline.submit("one two three four five six seven eight nine ten")
+    pipeline.submit("never heard")
+    threading.Timer(0.25, pipeline.interrupt).start()
+    pipeline.wait()
+    pipeline.close()
+
+    assert len(pipeline.spoken) == 1
+    heard = pipeline.spoken[0]
+    assert heard.startswith("one two") and heard.endswith("—") and "ten" not in heard
+    assert pipeline.interrupted
+
+
+@pytest.fixture
+def bot(monkeypatch):
+    bot = pytest.importorskip("groqEleveLabsTalker_VAD")
+    monkeypatch.setenv("DEEPGRAM_API_KEY", "test")
+    monkeypatch.setattr(bot, "Endpointer", partial(Endpointer, is_speech=lambda frame, rate: True))
+    monkeypatch.setattr(bot, "transcribe_rest", lambda frames, width, key: f"{len(frames)} frames")
+    return bot
+
+
+def mic(bot, monkeypatch, frames, stop):
+    frames = list(frames)
+
+    def read(count, exception_on_overflow=True):
+        if len(frames) == 1:
+            stop.set()
+        return frames.pop(0) if frames else QUIET
+
+    device = MagicMock()
+    device.open.return_value.read.side_effect = read
+    monkeypatch.setattr(bot.pyaudio, "PyAudio", lambda: device)
+
+
+def test_echo_shorter_than_the_barge_in_start_is_ignored(bot, monkeypatch):
+    stop = threading.Event()
+    mic(bot, monkeypatch, [QUIET] * 5 + [VOICED] * 7 + [QUIET] * 5, stop)
+    recorder, started = MagicMock(), MagicMock()
+    transcript, _ = bot.listen_for_speech(streaming=False, playback_active=lambda: True,
+                                          on_speech_start=started, recorder=recorder, stop=stop)
+    assert transcript == "" and not started.called
+    assert not recorder.write.called  # Mic audio during playback stays out of the recording
+
+
+def test_caller_speech_during_playback_interrupts(bot, monkeypatch):
+    stop = threading.Event()
+    mic(bot, monkeypatch, [QUIET] * 5 + [VOICED] * 10 + [QUIET] * 20 + [QUIET] * 5, stop)
+    playing = threading.Event()
+    playing.set()
+    recorder = MagicMock()
+    trace = bot.CallTrace()
+    transcript, _ = bot.listen_for_speech(streaming=False, playback_active=playing.is_set,
+                                          on_speech_start=playing.clear, recorder=recorder,
+                                          trace=trace, stop=stop)
+    assert transcript.endswith("frames")
+    assert not playing.is_set()
+    # Recording resumes with the speech that interrupted, not the echo before it
+    assert recorder.write.call_args_list[0].args[0] == VOICED * 10
+    [wait] = [span for span in trace.to_dict()["spans"] if span["name"] == bot.STAGE_LISTEN_WAIT]
+    assert wait["attributes"]["barge_in"] is True
@@ -0,0 +1,135 @@
+"""bulk_store_leads: identity grouping within a batch and per-record failure counts"""
+
+from unittest.mock import MagicMock
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from database import DUPLICATE_KEY_ERROR
+
+PHONE = "phone:9876543210"
+EMAIL = "email:rahul@example.com"
+
+
+@pytest.fixture
+def bulk(manager):
+    def with_stored(*stored_leads):
+        manager.leads_collection.find.return_value = list(stored_leads)
+        manager._apply_rollup_increments = MagicMock()
+        manager._store_recording = MagicMock(return_value=None)
+        return manager
+    return with_stored
+
+
+def lead_operations(db, call=0):
+    return db.leads_collection.bulk_write.call_args_list[call].args[0]
+
+
+def test_records_sharing_any_key_become_one_upsert_with_every_key(bulk):
+    lead_id = ObjectId()
+    db = bulk({"_id": lead_id, "identity_keys": [PHONE, EMAIL], "lead_name": "Rahul"})
+    stats = db.bulk_store_leads([
+        {"lead_name": "Rahul", "phone_number": "+91 98765 43210"},
+        {"lead_name": "Rahul K", "email": "Rahul@Example.com"},
+        {"lead_name": "Rahul Kumar", "phone_number": "9876543210", "email": "rahul@example.com"},
+    ])
+
+    operations = lead_operations(db)
+    assert len(operations) == 1
+    update = operations[0]
+    assert set(update._filter["identity_keys"]["$elemMatch"]["$in"]) == {PHONE, EMAIL}
+    assert set(update._doc["$addToSet"]["identity_keys"]["$each"]) == {PHONE, EMAIL}
+    assert update._doc["$set"]["lead_name"] == "Rahul Kumar"  # Last record is the latest call
+
+    calls = db.lead_calls_collection.bulk_write.call_args.args[0]
+    assert [op._doc["lead_id"] for op in calls] == [lead_id] * 3
+    assert stats["failed"] == 0 and stats["calls"] == 3
+
+
+def test_name_only_records_group_by_name(bulk):
+    db = bulk({"_id": ObjectId(), "lead_name": "Asha"})
+    db.bulk_store_leads([{"lead_name": "Asha"}, {"lead_name": "Asha"}])
+    operations = lead_operations(db)
+    assert len(operations) == 1
+    assert operations[0]._filter == {"lead_name": "Asha", "identity_keys": {"$exists": False}}
+
+
+def test_bad_timestamp_fails_only_its_record_before_upload(bulk):
+    db = bulk({"_id": ObjectId(), "identity_keys": [PHONE], "lead_name": "Rahul"})
+    stats = db.bulk_store_leads([
+        {"lead_data": {"lead_name": "Bad"}, "call_timestamp": "yesterday", "audio_file_path": "bad.wav"},
+        {"lead_data": {"lead_name": "Bad too"}, "call_timestamp": 1700000000, "audio_file_path": "bad2.wav"},
+        {"lead_data": {"lead_name": "Rahul", "phone_number": "9876543210"},
+         "call_timestamp": "2024-05-01T10:00:00", "audio_file_path": "good.wav"},
+    ])
+
+    uploaded = [call.args[1] for call in db._store_recording.call_args_list]
+    assert uploaded == ["good.wav"]
+    assert stats["failed"] == 2 and stats["calls"] == 1 and stats["leads"] == 3
+
+
+def test_failed_upsert_counts_every_record_of_that_lead(bulk):
+    db = bulk({"_id": ObjectId(), "identity_keys": [PHONE], "lead_name": "Rahul"})
+    db.leads_collection.bulk_write.side_effect = BulkWriteError({
+        "nUpserted": 0, "nModified": 1,
+        "writeErrors": [{"index": 1, "code": 121, "errmsg": "Document failed validation"}]
+    })
+    stats = db.bulk_store_leads([
+        {"lead_name": "Rahul", "phone_number": "9876543210"},
+        {"lead_name": "Asha", "email": "asha@example.com"},
+        {"lead_name": "Asha", "email": "asha@example.com"},
+    ])
+
+    assert db.leads_collection.bulk_write.call_count == 1  # Not a key conflict: no retry
+    assert stats["failed"] == 2 and stats["modified"] == 1 and stats["calls"] == 1
+
+
+def test_key_conflict_is_retried_with_the_strongest_key_only(bulk):
+    lead_id = ObjectId()
+    db = bulk({"_id": lead_id, "identity_keys": [PHONE], "lead_name": "Rahul"})
+    db.leads_collection.bulk_write.side_effect = [
+        BulkWriteError({"writeErrors": [{"index": 0, "code": DUPLICATE_KEY_ERROR, "errmsg": "E11000"}]}),
+        MagicMock(upserted_count=0, modified_count=1),
+    ]
+    stats = db.bulk_store_leads([{"lead_name": "Rahul", "phone_number": "9876543210", "email": "other@example.com"}])
+
+    retry = lead_operations(db, 1)[0]
+    assert retry._filter == {"identity_keys": {"$elemMatch": {"$in": [PHONE]}}}
+    assert retry._doc["$addToSet"]["identity_keys"]["$each"] == [PHONE]
+    assert stats["failed"] == 0 and stats["modified"] == 1 and stats["calls"] == 1
+
+
+def test_reimported_calls_are_not_counted_again(bulk):
+    db = bulk({"_id": ObjectId(), "identity_keys": [PHONE], "lead_name": "Rahul"})
+    # call-1 was imported before (matched); call-2 is new (upserted at index 1)
+    db.lead_calls_collection.bulk_write.return_value = MagicMock(upserted_ids={1: ObjectId()})
+    stats = db.bulk_store_leads([
+        {"lead_data": {"lead_name": "Rahul", "phone_number": "9876543210"}, "call_id": "call-1",
+         "call_timestamp": "2024-05-01T10:00:00"},
+        {"lead_data": {"lead_name": "Rahul", "phone_number": "9876543210", "call_outcome": "qualified"},
+         "call_id": "call-2", "call_timestamp": "2024-05-02T10:00:00"},
+    ])
+
+    assert stats["calls"] == 1
+    db._apply_rollup_increments.assert_called_once()
+    day, increments = db._apply_rollup_increments.call_args.args
+    assert day.day == 2 and increments["calls"] == 1
+
+
+def test_failed_call_inserts_are_not_counted(bulk):
+    db = bulk({"_id": ObjectId(), "identity_keys": [PHONE], "lead_name": "Rahul"})
+    db.lead_calls_collection.bulk_write.side_effect = BulkWriteError({
+        "upserted": [{"index": 0, "_id": ObjectId()}],
+        "writeErrors": [{"index": 2, "code": 121, "errmsg": "Document failed validation"}]
+    })
+    lead = {"lead_name": "Rahul", "phone_number": "9876543210"}
+    stats = db.bulk_store_leads([
+        {"lead_data": lead, "call_id": "call-1"},
+        {"lead_data": lead, "call_id": "call-2"},  # Replay
+        {"lead_data": lead},
+        {"lead_data": lead},
+    ])
+    assert stats["calls"] == 2
+    increments = db._apply_rollup_increments.call_args.args[1]
+    assert increments["calls"] == 2
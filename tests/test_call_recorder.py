@@ -0,0 +1,169 @@
+"""Incremental WAV writing and stereo alignment on the shared clock"""
+
+import io
+import struct
+import wave
+from array import array
+
+from call_recorder import BOT, CALLER, STREAMING_SIZE, WAV_HEADER_BYTES, CallRecorder
+
+RATE = 16000
+
+
+def pcm(value: int, frames: int) -> bytes:
+    return array("h", [value] * frames).tobytes()
+
+
+def read_wav(path: str):
+    with wave.open(path, "rb") as wf:
+        return wf.getnchannels(), wf.getnframes(), array("h", wf.readframes(wf.getnframes()))
+
+
+def test_header_holds_the_real_length_after_close(tmp_path):
+    path = str(tmp_path / "call.wav")
+    recorder = CallRecorder(path, channels=1, buffer_bytes=1024, start=0.0)
+    for i in range(20):
+        recorder.write(pcm(i + 1, 480), at=i * 0.03)
+
+    with open(path, "rb") as f:
+        assert struct.unpack("<I", f.read(8)[4:])[0] == STREAMING_SIZE  # Still streaming
+    assert recorder.close() == path
+
+    channels, frames, samples = read_wav(path)
+    assert (channels, frames) == (1, 20 * 480)
+    assert samples[0] == 1 and samples[-1] == 20
+    with open(path, "rb") as f:
+        header = f.read(WAV_HEADER_BYTES)
+    assert struct.unpack("<I", header[4:8])[0] == 36 + frames * 2
+    assert struct.unpack("<I", header[40:44])[0] == frames * 2
+
+
+def test_window_stays_bounded(tmp_path):
+    recorder = CallRecorder(str(tmp_path / "call.wav"), channels=2, buffer_bytes=4096, start=0.0)
+    for i in range(200):
+        recorder.write(pcm(100, 480), at=i * 0.03)
+        assert len(recorder._window) <= recorder.buffer_frames * 2
+    assert recorder.frames == 200 * 480
+    recorder.close()
+
+
+def test_close_is_idempotent_and_stops_writes(tmp_path):
+    path = str(tmp_path / "call.wav")
+    recorder = CallRecorder(path, channels=1, start=0.0)
+    recorder.write(pcm(5, 480), at=0.0)
+    recorder.close()
+    recorder.close()
+    recorder.write(pcm(5, 480), at=0.03)
+    assert read_wav(path)[1] == 480
+
+
+class WriteOnly(io.RawIOBase):
+    def __init__(self):
+        self.data = b""
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.data += bytes(b)
+        return len(b)
+
+
+def test_non_seekable_target_keeps_streaming_header():
+    target = WriteOnly()
+    recorder = CallRecorder(target, channels=1, buffer_bytes=1024, start=0.0)
+    recorder.write(pcm(7, 4800), at=0.0, channel=CALLER)
+    assert recorder.close() is None
+
+    assert struct.unpack("<I", target.data[40:44])[0] == STREAMING_SIZE
+    assert len(target.data) == WAV_HEADER_BYTES + 4800 * 2
+
+
+def clip(value: int, frames: int, rate: int = RATE) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(pcm(value, frames))
+    return buffer.getvalue()
+
+
+def channel(samples: array, slot: int) -> array:
+    return samples[slot::2]
+
+
+def test_caller_left_bot_right_on_the_shared_clock(tmp_path):
+    path = str(tmp_path / "call.wav")
+    recorder = CallRecorder(path, channels=2, start=100.0)
+    for i in range(50):  # 1.5 s of caller audio
+        recorder.write(pcm(1000, 480), at=100.0 + i * 0.03)
+    recorder.write_clip(clip(2000, 8000), at=100.5)
+    recorder.close()
+
+    channels, frames, samples = read_wav(path)
+    left, right = channel(samples, 0), channel(samples, 1)
+    assert channels == 2 and frames == 50 * 480
+    assert set(left) == {1000}
+    assert set(right[:8000]) == {0}
+    assert set(right[8000:16000]) == {2000}
+    assert set(right[16000:]) == {0}
+
+
+def test_paused_source_resumes_at_the_clock(tmp_path):
+    path = str(tmp_path / "call.wav")
+    recorder = CallRecorder(path, channels=2, start=0.0)
+    recorder.write(pcm(1000, 480), at=0.0)
+    recorder.write(pcm(1000, 480), at=0.1)   # Within GAP_TOLERANCE_MS: follows on
+    recorder.write(pcm(1000, 480), at=1.0)   # Paused: placed at 1.0 s
+    recorder.close()
+
+    left = channel(read_wav(path)[2], 0)
+    assert set(left[:960]) == {1000}
+    assert set(left[960:16000]) == {0}
+    assert set(left[16000:16480]) == {1000}
+
+
+def test_late_clip_is_merged_into_audio_already_on_disk(tmp_path):
+    path = str(tmp_path / "call.wav")
+    recorder = CallRecorder(path, channels=2, buffer_bytes=4096, start=0.0)
+    for i in range(100):  # 3 s, most of it written out
+        recorder.write(pcm(1000, 480), at=i * 0.03)
+    assert recorder._flushed > 16000
+    # A bot clip recorded once it finished playing, 0.5 s in, cut off halfway
+    recorder.write_clip(clip(2000, 16000), BOT, at=0.5, fraction=0.5)
+    recorder.close()
+
+    samples = read_wav(path)[2]
+    left, right = channel(samples, 0), channel(samples, 1)
+    assert set(left) == {1000}
+    assert set(right[8000:16000]) == {2000}
+    assert set(right[:8000]) == set(right[16000:]) == {0}
+
+
+def test_clip_at_another_rate_is_resampled(tmp_path):
+    path = str(tmp_path / "call.wav")
+    recorder = CallRecorder(path, channels=2, start=0.0)
+    recorder.write_clip(clip(2000, 24000, rate=24000), BOT, at=0.0)
+    recorder.close()
+    assert abs(read_wav(path)[1] - 16000) <= 1
+
+
+def test_mono_recording_mixes_both_sides(tmp_path):
+    path = str(tmp_path / "call.wav")
+    recorder = CallRecorder(path, channels=1, start=0.0)
+    recorder.write(pcm(30000, 480), at=0.0)
+    recorder.write_clip(clip(5000, 480), BOT, at=0.0)
+    recorder.close()
+    assert set(read_wav(path)[2]) == {32767}  # Mixed and clipped
+
+
+def test_offset_index_merges_spans_per_turn(tmp_path):
+    recorder = CallRecorder(str(tmp_path / "call.wav"), channels=2, start=10.0)
+    recorder.mark_speech(BOT, 10.5, 11.0)
+    recorder.mark_speech(BOT, 11.2, 12.25)
+    entry = recorder.add_utterance("assistant", "Hello.", message_index=1)
+    assert entry == {"role": "assistant", "channel": BOT, "start_seconds": 0.5, "end_seconds": 2.25,
+                     "text": "Hello.", "message_index": 1}
+    assert recorder.add_utterance("user", "Nothing marked") is None
+    recorder.close()
@@ -0,0 +1,93 @@
+"""Simulated telephony socket handshake, and listening for one caller turn"""
+
+import asyncio
+import json
+import math
+from array import array
+from functools import partial
+from unittest.mock import MagicMock
+
+import pytest
+
+import call_session
+from call_session import MSG_START, RECORD_BATCH_FRAMES, AudioTransport, CallEngine, CallSession, write_message
+from vad_endpointer import Endpointer
+
+
+async def dial_start(payload: bytes):
+    engine = CallEngine(speech=object())
+    calls = []
+
+    async def run_call(transport, lead_name="", company_name="", **kwargs):
+        calls.append((lead_name, company_name))
+        await transport.close()
+
+    engine.run_call = run_call
+    server = await asyncio.start_server(engine.handle_socket, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        write_message(writer, MSG_START, payload)
+        await writer.drain()
+        remaining = await asyncio.wait_for(reader.read(), 2)
+        writer.close()
+    return calls, remaining
+
+
+@pytest.mark.parametrize("payload", [b"{not json", b"\xff\xfe", b'["a list"]'])
+def test_malformed_start_message_drops_the_connection(payload):
+    calls, remaining = asyncio.run(dial_start(payload))
+    assert calls == [] and remaining == b""
+
+
+def test_start_message_starts_the_call():
+    calls, _ = asyncio.run(dial_start(json.dumps({"lead_name": "Rahul", "company_name": "Acme"}).encode()))
+    assert calls == [("Rahul", "Acme")]
+
+
+def tone(amplitude):
+    return array("h", (int(amplitude * math.sin(2 * math.pi * 200 * i / 16000)) for i in range(480))).tobytes()
+
+
+QUIET = tone(10)
+VOICED = tone(3000)
+
+
+class FrameTransport(AudioTransport):
+    """Plays back frames, then hangs up (or stalls, like a dead socket)"""
+
+    def __init__(self, frames, stall=False):
+        self.frames = list(frames)
+        self.stall = stall
+
+    async def read_frame(self):
+        if self.frames:
+            return self.frames.pop(0)
+        if self.stall:
+            await asyncio.sleep(60)
+        return None
+
+
+class Heard:
+    async def transcribe(self, audio):
+        return f"{len(audio) // len(VOICED)} frames"
+
+
+def listen(transport, monkeypatch):
+    monkeypatch.setattr(call_session, "Endpointer", partial(Endpointer, is_speech=lambda frame, rate: True))
+    session = CallSession(transport, Heard(), listen_timeout=2, verbose=False)
+    session.recorder = MagicMock()
+    return session, asyncio.run(session._listen())
+
+
+def test_caller_frames_are_recorded_in_batches(monkeypatch):
+    session, heard = listen(FrameTransport([QUIET] * 5 + [VOICED] * 20), monkeypatch)
+    assert heard == "25 frames" and session.ended_reason == "hangup"
+    writes = [len(call.args[0]) // len(VOICED) for call in session.recorder.write.call_args_list]
+    assert writes == [RECORD_BATCH_FRAMES, RECORD_BATCH_FRAMES, 5]
+
+
+def test_stalled_stream_ends_the_turn_at_the_maximum_length(monkeypatch):
+    monkeypatch.setattr(call_session, "VAD_MAX_UTTERANCE_MS", 300)
+    session, heard = listen(FrameTransport([QUIET] * 5 + [VOICED] * 10, stall=True), monkeypatch)
+    assert heard == "15 frames" and session.ended_reason is None
@@ -0,0 +1,43 @@
+"""ETag revalidation without per-request database reads"""
+
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+import server
+from mongo_fake import FakeCollection
+from response_cache import VersionPoller
+
+
+@pytest.fixture
+def api(monkeypatch):
+    reads = []
+    lead = {'_id': ObjectId(), 'lead_name': 'Rahul', 'call_metadata': {}}
+    monkeypatch.setattr(server, 'db_manager', SimpleNamespace(leads_collection=FakeCollection([lead])))
+    monkeypatch.setattr(server, 'data_version', VersionPoller(lambda: reads.append(1) or 7, interval=60))
+    server.response_cache.clear()
+    return server.app.test_client(), lead, reads
+
+
+def test_revalidation_reuses_the_polled_version(api):
+    http, lead, reads = api
+    first = http.get(f"/api/leads/{lead['_id']}")
+    for _ in range(3):
+        response = http.get(f"/api/leads/{lead['_id']}", headers={'If-None-Match': first.headers['ETag']})
+        assert response.status_code == 304
+    assert len(reads) == 1
+
+
+def test_only_range_relative_etags_include_the_day(monkeypatch):
+    days = iter(['2025-01-01', '2025-01-02'])
+
+    class Clock:
+        @staticmethod
+        def utcnow():
+            return SimpleNamespace(strftime=lambda fmt: next(days))
+
+    monkeypatch.setattr(server, 'datetime', Clock)
+    assert server.make_etag(1, ('lead', 'x')) == server.make_etag(1, ('lead', 'x'))
+    assert server.make_etag(1, ('leads', '7days'), day_relative=True) != \
+        server.make_etag(1, ('leads', '7days'), day_relative=True)
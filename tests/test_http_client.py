@@ -0,0 +1,93 @@
+"""Pooled keep-alive session: connection reuse, retry policies and latency stats"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_client import DEFAULT_TIMEOUT, EndpointStats, HTTPClient
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive
+
+    def do_GET(self):
+        self.server.peers.add(self.client_address)
+        status = 404 if self.path.startswith("/missing") else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.peers = set()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_requests_reuse_one_connection(server):
+    client = HTTPClient()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    for _ in range(5):
+        assert client.get(f"{url}/speak").status_code == 200
+    assert len(server.peers) == 1
+    client.close()
+
+
+def test_stats_per_endpoint_count_errors(server):
+    client = HTTPClient()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    client.get(f"{url}/speak")
+    client.get(f"{url}/missing")
+    client.get(f"{url}/missing/a@example.com", endpoint="GET missing user")
+    stats = client.latency_stats()
+    host = f"127.0.0.1:{server.server_address[1]}"
+    assert stats[f"GET {host}/speak"]["errors"] == 0
+    assert stats[f"GET {host}/missing"]["errors"] == 1
+    assert stats["GET missing user"]["count"] == 1
+    client.close()
+
+
+def test_connection_failures_are_counted_as_errors():
+    client = HTTPClient()
+    with pytest.raises(Exception):
+        client.get("http://127.0.0.1:9/", endpoint="closed port", timeout=0.5)
+    assert client.latency_stats()["closed port"]["errors"] == 1
+
+
+def test_default_timeout_is_applied(monkeypatch):
+    client = HTTPClient()
+    seen = {}
+    monkeypatch.setattr(client.session, "request", lambda method, url, **kwargs: seen.update(kwargs) or
+                        type("Response", (), {"status_code": 200})())
+    client.post("https://api.deepgram.com/v1/speak", json={})
+    assert seen["timeout"] == DEFAULT_TIMEOUT
+    client.post("https://api.deepgram.com/v1/speak", timeout=1)
+    assert seen["timeout"] == 1
+
+
+def test_graph_posts_are_never_retried():
+    session = HTTPClient().session
+    graph = session.get_adapter("https://graph.microsoft.com/v1.0/users/x/events").max_retries
+    deepgram = session.get_adapter("https://api.deepgram.com/v1/listen").max_retries
+    assert "POST" not in graph.allowed_methods and "GET" in graph.allowed_methods
+    assert {"GET", "POST"} <= set(deepgram.allowed_methods)
+    assert 503 in deepgram.status_forcelist
+
+
+def test_percentiles():
+    stats = EndpointStats()
+    for ms in range(1, 101):
+        stats.record(float(ms), error=False)
+    summary = stats.summary()
+    assert summary["p50_ms"] == 51.0 and summary["p95_ms"] == 96.0 and summary["max_ms"] == 100.0
+    assert summary["avg_ms"] == 50.5
@@ -0,0 +1,58 @@
+"""Every dashboard query shape has an index, and explain() flags collection scans"""
+
+import pytest
+
+import server
+
+
+def created_indexes(collection):
+    indexes = []
+    for call in collection.create_index.call_args_list:
+        keys = call.args[0]
+        indexes.append([(keys, 1)] if isinstance(keys, str) else list(keys))
+    return indexes
+
+
+def serves(index, query, sort):
+    """Equality fields first, then the sort (in either direction), as the planner needs"""
+    fields = [field for field, _ in index]
+    equality = [field for field, condition in query.items() if not isinstance(condition, dict)]
+    ranges = [field for field, condition in query.items() if isinstance(condition, dict)]
+    if set(fields[:len(equality)]) != set(equality):
+        return False
+    rest = index[len(equality):len(equality) + len(sort or [])]
+    if [field for field, _ in rest] != [field for field, _ in sort or []]:
+        return False
+    same = all(direction == wanted for (_, direction), (_, wanted) in zip(rest, sort or []))
+    reversed_ = all(direction == -wanted for (_, direction), (_, wanted) in zip(rest, sort or []))
+    return (same or reversed_) and all(field in fields for field in ranges)
+
+
+@pytest.mark.parametrize('name', [name for name in server.QUERY_SHAPES if not name.startswith('leads_search')])
+def test_lead_query_shapes_have_a_matching_index(manager, name):
+    manager._create_indexes()
+    query, sort = server.QUERY_SHAPES[name]
+    assert any(serves(index, query, sort) for index in created_indexes(manager.leads_collection))
+
+
+def test_search_and_lead_call_shapes_have_an_index(manager):
+    manager._create_indexes()
+    assert [('search_tokens', 1)] in created_indexes(manager.leads_collection)
+    for query, sort in server.LEAD_CALL_QUERY_SHAPES.values():
+        assert any(serves(index, query, sort) for index in created_indexes(manager.lead_calls_collection))
+
+
+def test_collection_scans_are_reported(manager):
+    plans = {
+        'indexed': {'stage': 'LIMIT', 'inputStage': {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN'}}},
+        'scanned': {'stage': 'SORT', 'inputStage': {'stage': 'COLLSCAN'}},
+        'or_branch': {'stage': 'SUBPLAN', 'inputStage': {'stage': 'OR', 'inputStages': [
+            {'stage': 'IXSCAN'}, {'stage': 'COLLSCAN'}]}},
+    }
+    cursor = manager.leads_collection.find.return_value
+    cursor.sort.return_value = cursor
+    cursor.limit.return_value.explain.side_effect = [
+        {'queryPlanner': {'winningPlan': plan}} for plan in plans.values()
+    ]
+    shapes = {name: ({}, [('_id', 1)]) for name in plans}
+    assert manager.check_query_plans(shapes) == ['scanned', 'or_branch']
@@ -0,0 +1,89 @@
+"""Per-turn spans, the stored trace and JSONL/OTLP export"""
+
+import json
+
+import pytest
+
+import http_client
+import instrumentation
+from instrumentation import (
+    MARK_SPEECH_END, STAGE_LLM, STAGE_RESPONSE_GAP, STAGE_STT, CallTrace, percentile, read_spans, report
+)
+
+MS = 1000000
+
+
+def trace_with_two_turns():
+    trace = CallTrace("call-1", lead_name="Rahul")
+    start = trace.start_ns
+    trace.record(STAGE_LLM, start, start + 100 * MS)  # Greeting (turn 0)
+    for turn in (1, 2):
+        trace.begin_turn()
+        base = start + turn * 1000 * MS
+        trace.record(STAGE_STT, base, base + turn * 200 * MS, mode="rest")
+        trace.mark(MARK_SPEECH_END, base)
+        trace.record_since(MARK_SPEECH_END, STAGE_RESPONSE_GAP)
+    trace.finish(outcome="qualified")
+    return trace
+
+
+def test_spans_are_tagged_with_their_turn():
+    trace = trace_with_two_turns()
+    spans = trace.to_dict()["spans"]
+    assert [(s["name"], s["turn"]) for s in spans if s["name"] == STAGE_STT] == [(STAGE_STT, 1), (STAGE_STT, 2)]
+    assert [s["duration_ms"] for s in spans if s["name"] == STAGE_STT] == [200.0, 400.0]
+    assert trace.to_dict()["summary"][STAGE_STT]["count"] == 2
+    assert trace.record_since(MARK_SPEECH_END, STAGE_RESPONSE_GAP) is None  # Mark is consumed
+
+
+def test_errors_are_recorded_and_reraised():
+    trace = CallTrace()
+    with pytest.raises(TimeoutError):
+        with trace.span(STAGE_STT):
+            raise TimeoutError("deepgram")
+    assert trace.to_dict()["spans"][0]["attributes"]["error"] == "TimeoutError: deepgram"
+    assert trace.to_otlp()["resourceSpans"][0]["scopeSpans"][0]["spans"][1]["status"]["code"] == 2
+
+
+def test_otlp_spans_hang_off_the_call_span():
+    trace = trace_with_two_turns()
+    spans = trace.to_otlp()["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    root, children = spans[0], spans[1:]
+    assert root["name"] == "call" and "parentSpanId" not in root
+    assert all(span["parentSpanId"] == root["spanId"] and span["traceId"] == trace.trace_id for span in children)
+    stt = next(span for span in children if span["name"] == STAGE_STT)
+    assert int(stt["endTimeUnixNano"]) - int(stt["startTimeUnixNano"]) == 200 * MS
+    assert {"key": "turn", "value": {"intValue": "1"}} in stt["attributes"]
+
+
+def test_jsonl_export_appends_and_reports(tmp_path, capsys):
+    path = str(tmp_path / "traces.jsonl")
+    for _ in range(2):
+        trace_with_two_turns().export("jsonl", path)
+    with open(path, "a") as f:
+        f.write("torn line\n")
+
+    spans = list(read_spans(path))
+    assert len(spans) == 2 * 5 and {span["call_id"] for span in spans} == {"call-1"}
+    report(path)
+    out = capsys.readouterr().out
+    assert out.startswith("2 calls, 10 spans") and "Slowest turns" in out
+
+
+def test_otlp_export_posts_to_the_collector(tmp_path, monkeypatch):
+    posted = []
+    monkeypatch.setattr(instrumentation, "OTLP_ENDPOINT", "http://collector:4318")
+    monkeypatch.setattr(http_client, "get_http_client", lambda: type("Client", (), {
+        "post": staticmethod(lambda url, **kwargs: posted.append((url, kwargs["json"])))
+    })())
+    path = str(tmp_path / "traces.otlp.jsonl")
+    trace_with_two_turns().export("otlp", path)
+    assert posted[0][0] == "http://collector:4318/v1/traces"
+    with open(path) as f:
+        assert json.loads(f.readline()) == posted[0][1]
+
+
+def test_percentile_is_nearest_rank():
+    assert percentile([], 95) == 0.0
+    assert percentile(list(range(1, 101)), 95) == 95
+    assert percentile([5.0], 50) == 5.0
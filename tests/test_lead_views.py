@@ -0,0 +1,58 @@
+"""Summary view for lead lists; the heavy fields stay on the lead detail"""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+import server
+from mongo_fake import FakeCollection
+from response_cache import VersionPoller
+
+
+@pytest.fixture
+def api(monkeypatch):
+    lead = {
+        '_id': ObjectId(), 'lead_name': 'Rahul', 'company_name': 'Acme', 'status': 'qualified',
+        'call_metadata': {'timestamp': datetime(2025, 1, 1, 9), 'call_outcome': 'qualified',
+                          'duration_seconds': 120, 'audio_recording_id': 'abc'},
+        'conversation_transcript': 'USER: Hi\nASSISTANT: Hello',
+        'conversation_history': [{'role': 'user', 'content': 'Hi'}],
+        'qualification_data': {'budget': 'large'}
+    }
+    leads = FakeCollection([lead])
+    monkeypatch.setattr(server, 'db_manager', SimpleNamespace(leads_collection=leads))
+    monkeypatch.setattr(server, 'data_version', VersionPoller(lambda: 1, interval=60))
+    server.response_cache.clear()
+    return server.app.test_client(), lead, leads
+
+
+def test_summary_view_fetches_only_the_card_fields(api):
+    http, lead, leads = api
+    [summary] = http.get('/api/leads?view=summary').get_json()['leads']
+
+    assert leads.projections == [server.SUMMARY_PROJECTION]
+    assert summary == {
+        'id': str(lead['_id']), 'lead_name': 'Rahul', 'company_name': 'Acme', 'status': 'qualified',
+        'call_metadata': {'timestamp': '2025-01-01T09:00:00', 'call_outcome': 'qualified'}
+    }
+
+
+def test_full_view_and_detail_keep_the_heavy_fields(api):
+    http, lead, leads = api
+    [full] = http.get('/api/leads').get_json()['leads']
+    assert leads.projections == [None]
+    assert full['conversation_transcript'] == lead['conversation_transcript']
+
+    detail = http.get(f"/api/leads/{lead['_id']}").get_json()
+    assert detail['conversation_history'] == lead['conversation_history']
+    assert detail['qualification_data'] == {'budget': 'large'}
+
+
+def test_views_are_cached_separately(api):
+    http, _, _ = api
+    summary = http.get('/api/leads?view=summary')
+    full = http.get('/api/leads')
+    assert summary.headers['ETag'] != full.headers['ETag']
+    assert 'conversation_transcript' in full.get_json()['leads'][0]
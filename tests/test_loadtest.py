@@ -0,0 +1,75 @@
+"""Load-test harness: stand-in servers, caller personas and a short end-to-end run"""
+
+import asyncio
+import http.client
+import json
+import wave
+from types import SimpleNamespace
+
+import pytest
+
+import loadtest
+from vad_endpointer import SPEECH_END, Endpointer
+
+ARGS = dict(calls=2, concurrency=2, turns=2, wav_dir=None, fast=True, tts_cache=False, stt_ms=5,
+            tts_ms=5, ttft_ms=5, token_ms=0, jitter_ms=0, tts_seconds_per_char=0.001)
+
+
+@pytest.fixture
+def fakes():
+    server = loadtest.start_fake_servers(SimpleNamespace(**ARGS))
+    yield server.server_address[1]
+    server.shutdown()
+
+
+def post(port, path, body):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    connection.request("POST", path, json.dumps(body))
+    response = connection.getresponse()
+    return response.status, response.read()
+
+
+def test_stand_in_stt_and_tts(fakes):
+    status, body = post(fakes, "/v1/listen", {})
+    transcript = json.loads(body)["results"]["channels"][0]["alternatives"][0]["transcript"]
+    assert status == 200 and transcript in loadtest.CALLER_LINES
+
+    status, audio = post(fakes, "/v1/speak", {"text": "x" * 300})
+    assert status == 200 and audio[:4] == b"RIFF"
+    assert len(audio) > 0.29 * loadtest.SAMPLE_RATE * 2
+
+
+def test_stand_in_llm_streams_then_returns_json_on_the_last_turn(fakes):
+    def reply(user_turns):
+        messages = [{"role": "user", "content": "hi"}] * user_turns
+        _, body = post(fakes, "/openai/v1/chat/completions", {"messages": messages, "stream": True})
+        chunks = [json.loads(line[6:]) for line in body.decode().splitlines()
+                  if line.startswith("data: {")]
+        return "".join(chunk["choices"][0]["delta"]["content"] for chunk in chunks)
+
+    assert reply(1).strip() == loadtest.BOT_LINES[0]
+    assert "```json" in reply(ARGS["turns"])
+
+
+def test_persona_wav_has_one_endpointed_answer_per_turn(tmp_path):
+    path = str(tmp_path / "caller.wav")
+    loadtest.make_persona_wav(path, "brief", turns=3)
+    with wave.open(path, "rb") as wf:
+        pcm = wf.readframes(wf.getnframes())
+
+    answers = 0
+    endpointer = Endpointer(sample_rate=loadtest.SAMPLE_RATE, is_speech=lambda frame, rate: True)
+    for offset in range(0, len(pcm) - endpointer.frame_bytes + 1, endpointer.frame_bytes):
+        if endpointer.process(pcm[offset:offset + endpointer.frame_bytes]) == SPEECH_END:
+            answers += 1
+            endpointer = Endpointer(sample_rate=loadtest.SAMPLE_RATE, is_speech=lambda frame, rate: True)
+    assert answers == 3
+
+
+def test_short_run_completes_every_call(capsys):
+    asyncio.run(loadtest.run_load(SimpleNamespace(**ARGS)))
+    report = capsys.readouterr().out
+    assert "Outcomes: {'qualified': 2}" in report
+    assert "(4 caller turns" in report
+    for stage in loadtest.REPORT_STAGES:
+        assert stage in report
@@ -0,0 +1,83 @@
+"""/api/metrics: date ranges, the payload, and summing the daily rollups"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+import server
+from database import ROLLUP_ALL_TIME_ID
+from response_cache import VersionPoller
+
+TOTALS = {
+    "calls": 4, "duration_total": 400, "outcomes": {"qualified": 3, "no_response": 1},
+    "executives": {"a@example_com": 2}, "today_calls": 1
+}
+
+
+@pytest.fixture
+def api(monkeypatch):
+    db = SimpleNamespace(get_rollup_metrics=MagicMock(return_value=TOTALS))
+    monkeypatch.setattr(server, 'db_manager', db)
+    monkeypatch.setattr(server, 'data_version', VersionPoller(lambda: 1, interval=60))
+    server.response_cache.clear()
+    return server.app.test_client(), db
+
+
+def test_payload_is_computed_from_the_totals(api):
+    http, _ = api
+    assert http.get('/api/metrics').get_json() == {
+        "totalCalls": 4, "successRate": 75, "todaysCalls": 1,
+        "outcomeBreakdown": {"qualified": 3, "no_response": 1},
+        "avgDurationSeconds": 100, "executiveAssignments": {"a@example_com": 2}
+    }
+
+
+@pytest.mark.parametrize('date_range, days', [('all', None), ('7days', 7), ('30days', 30)])
+def test_date_range_sets_the_cutoff(api, date_range, days):
+    http, db = api
+    http.get(f'/api/metrics?date_range={date_range}')
+    cutoff = db.get_rollup_metrics.call_args.args[0]
+    if days is None:
+        assert cutoff is None
+    else:
+        assert abs(datetime.utcnow() - timedelta(days=days) - cutoff) < timedelta(minutes=1)
+
+
+def test_falls_back_to_one_aggregation_before_rollups_are_built(api, monkeypatch):
+    http, db = api
+    db.get_rollup_metrics.return_value = None
+    aggregate = MagicMock(return_value=dict(TOTALS, calls=0, duration_total=0))
+    monkeypatch.setattr(server, 'aggregate_metrics', aggregate)
+    body = http.get('/api/metrics?date_range=7days').get_json()
+    assert aggregate.call_count == 1
+    assert body["totalCalls"] == 0 and body["successRate"] == 0 and body["avgDurationSeconds"] == 0
+
+
+def test_rollups_are_summed_over_the_range(manager):
+    today = datetime.utcnow().strftime("%Y-%m-%d")
+    manager.metrics_collection.find_one.return_value = {"_id": "meta"}
+    manager.metrics_collection.find.return_value = [
+        {"_id": "2025-01-01", "calls": 2, "duration_total": 50, "outcomes": {"qualified": 1, "no_response": 1}},
+        {"_id": today, "calls": 1, "duration_total": 30, "outcomes": {"qualified": 1},
+         "executives": {"a@example_com": 1}},
+    ]
+    totals = manager.get_rollup_metrics(datetime(2025, 1, 1, 15))
+
+    assert manager.metrics_collection.find.call_args.args[0] == {"date": {"$gte": datetime(2025, 1, 1)}}
+    assert totals == {"calls": 3, "duration_total": 80, "outcomes": {"qualified": 2, "no_response": 1},
+                      "executives": {"a@example_com": 1}, "today_calls": 1}
+
+
+def test_all_time_reads_two_documents(manager):
+    manager.metrics_collection.find_one.return_value = {"_id": "meta"}
+    manager.metrics_collection.find.return_value = [{"_id": ROLLUP_ALL_TIME_ID, "calls": 9}]
+    totals = manager.get_rollup_metrics()
+    assert manager.metrics_collection.find.call_args.args[0]["_id"]["$in"][0] == ROLLUP_ALL_TIME_ID
+    assert totals["calls"] == 9 and totals["today_calls"] == 0
+
+
+def test_no_rollups_before_the_first_rebuild(manager):
+    manager.metrics_collection.find_one.return_value = None
+    assert manager.get_rollup_metrics() is None
@@ -0,0 +1,105 @@
+"""Metrics rollups rebuilt from lead_calls, and the pre-rebuild aggregation"""
+
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import server
+from database import ROLLUP_ALL_TIME_ID, ROLLUP_META_ID
+
+
+def cursor(docs):
+    found = MagicMock()
+    found.batch_size.return_value = iter(docs)
+    return found
+
+
+def test_rebuild_counts_every_call_and_assignment(manager):
+    db = manager
+    db.lead_calls_collection.find.return_value = cursor([
+        # Two calls with the same lead: the leads collection only keeps the second
+        {"timestamp": datetime(2025, 1, 1, 9), "call_outcome": "no_response", "duration_seconds": 20},
+        {"timestamp": datetime(2025, 1, 2, 9), "call_outcome": "qualified", "duration_seconds": 100},
+        {"timestamp": None, "call_outcome": "qualified"},
+    ])
+    db.scheduled_calls_collection.find.return_value = cursor([
+        {"executive_email": "a@example.com", "created_at": datetime(2025, 1, 2, 9, 5)},
+    ])
+
+    assert db.rebuild_metrics_rollups() == 3
+
+    rebuild = db.db.__getitem__.return_value
+    assert db.db.__getitem__.call_args.args[0] == "metrics_daily_rebuild"
+    docs = {doc["_id"]: doc for doc in rebuild.insert_many.call_args.args[0]}
+    assert docs[ROLLUP_ALL_TIME_ID]["calls"] == 2
+    assert docs[ROLLUP_ALL_TIME_ID]["duration_total"] == 120
+    assert docs[ROLLUP_ALL_TIME_ID]["outcomes"] == {"no_response": 1, "qualified": 1}
+    assert docs["2025-01-02"]["executives"] == {"a@example_com": 1}
+    assert docs["2025-01-01"]["executives"] == {}
+    assert ROLLUP_META_ID in docs
+    rebuild.rename.assert_called_once_with("metrics_daily", dropTarget=True)
+
+
+def test_fallback_aggregates_lead_calls(monkeypatch):
+    lead_calls = MagicMock()
+    lead_calls.aggregate.return_value = iter([{
+        "totals": [{"count": 3, "duration_total": 90}],
+        "outcomes": [{"_id": "qualified", "count": 2}, {"_id": None, "count": 1}],
+        "today": [{"count": 1}]
+    }])
+    scheduled_calls = MagicMock()
+    scheduled_calls.aggregate.return_value = iter([{"_id": "a@example.com", "count": 2}])
+    monkeypatch.setattr(server, "db_manager", SimpleNamespace(
+        lead_calls_collection=lead_calls, scheduled_calls_collection=scheduled_calls
+    ))
+
+    cutoff = datetime(2025, 1, 1)
+    totals = server.aggregate_metrics(cutoff)
+
+    assert lead_calls.aggregate.call_args.args[0][0] == {"$match": {"timestamp": {"$gte": cutoff}}}
+    assert totals == {
+        "calls": 3, "duration_total": 90,
+        "outcomes": {"qualified": 2, "unknown": 1},
+        "executives": {"a@example_com": 2},
+        "today_calls": 1
+    }
+
+
+def test_calls_stored_during_the_rebuild_are_added_before_the_swap(manager):
+    db = manager
+    # The scan sees one call; a second is stored (and $inc'd into the live rollups) meanwhile
+    db.lead_calls_collection.find.side_effect = [
+        cursor([{"timestamp": datetime(2025, 1, 1, 9), "call_outcome": "qualified", "duration_seconds": 30}]),
+        cursor([{"timestamp": datetime(2025, 1, 3, 9), "call_outcome": "no_response", "duration_seconds": 10}]),
+        cursor([]),
+    ]
+    db.scheduled_calls_collection.find.side_effect = [cursor([]), cursor([]), cursor([])]
+
+    assert db.rebuild_metrics_rollups() == 3
+
+    first, catch_up, last = [call.args[0]["created_at"] for call in db.lead_calls_collection.find.call_args_list]
+    assert first["$not"]["$gte"] == catch_up["$gte"] and catch_up["$lt"] == last["$gte"]
+
+    rebuild = db.db.__getitem__.return_value
+    updates = {op._filter["_id"]: op._doc for op in rebuild.bulk_write.call_args.args[0]}
+    assert updates[ROLLUP_ALL_TIME_ID]["$inc"] == {"calls": 1, "duration_total": 10, "outcomes.no_response": 1}
+    assert updates["2025-01-03"]["$setOnInsert"] == {"date": datetime(2025, 1, 3)}
+    # Applied to the scratch collection, before it replaces the live one
+    assert [name for name, *_ in rebuild.mock_calls if name in ("bulk_write", "rename")] == ["bulk_write", "rename"]
+
+
+def test_assignment_is_counted_on_the_day_it_was_scheduled(manager):
+    db = manager
+    db._record_assignment_rollup = MagicMock()
+    db.calendar_manager = MagicMock()
+    db.calendar_manager.schedule_sales_call.return_value = {
+        "executive_name": "A", "executive_email": "a@example.com",
+        "event_id": "event-1", "scheduled_time": "Monday 10:00"
+    }
+    # An old call, scheduled now (a write-behind drain or a bulk import)
+    document = {"_id": "lead-1", "call_metadata": {"timestamp": datetime(2024, 1, 1, 9)}}
+    db._auto_schedule_calendar("Rahul", {"preferred_day": "Monday", "preferred_time_window": "morning"}, document)
+
+    stored = db.scheduled_calls_collection.insert_one.call_args.args[0]
+    db._record_assignment_rollup.assert_called_once_with(stored["created_at"], "a@example.com")
+    assert stored["created_at"] > document["call_metadata"]["timestamp"]
@@ -0,0 +1,71 @@
+"""Keyset cursor round trips for GET /api/leads"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+import server
+from mongo_fake import FakeCollection, matches
+
+
+def _paginate(docs, sort, limit):
+    seen, cursor = [], None
+    while True:
+        query = server.decode_cursor(cursor, sort) if cursor else {}
+        page = list(FakeCollection(docs).find(query).sort(server._page_sort(sort)).limit(limit))
+        if not page:
+            return seen
+        seen.extend(page)
+        cursor = server.encode_cursor(sort, page[-1])
+
+
+def _ordered(docs, sort):
+    return list(FakeCollection(docs).find().sort(server._page_sort(sort)))
+
+
+def _leads():
+    start = datetime(2025, 1, 1)
+    docs = []
+    for i in range(9):
+        doc = {'_id': ObjectId(), 'lead_name': ['Asha', 'Ravi', 'Ravi'][i % 3],
+               'call_metadata': {'timestamp': start + timedelta(days=i // 2)}}
+        docs.append(doc)
+    # Older leads without the sort fields
+    docs.append({'_id': ObjectId(), 'call_metadata': {}})
+    docs.append({'_id': ObjectId()})
+    return docs
+
+
+@pytest.mark.parametrize('sort', ['newest', 'oldest', 'name'])
+@pytest.mark.parametrize('limit', [1, 2, 4])
+def test_pages_cover_every_lead_once_in_order(sort, limit):
+    docs = _leads()
+    pages = _paginate(docs, sort, limit)
+    assert [d['_id'] for d in pages] == [d['_id'] for d in _ordered(docs, sort)]
+
+
+def test_cursor_round_trip_keeps_value_and_id():
+    lead = {'_id': ObjectId(), 'call_metadata': {'timestamp': datetime(2025, 3, 4, 5, 6, 7)}}
+    keyset = server.decode_cursor(server.encode_cursor('newest', lead), 'newest')
+    assert keyset['$or'][0] == {'call_metadata.timestamp': {'$lt': datetime(2025, 3, 4, 5, 6, 7)}}
+    assert keyset['$or'][1] == {'call_metadata.timestamp': datetime(2025, 3, 4, 5, 6, 7),
+                                '_id': {'$lt': lead['_id']}}
+
+
+def test_equal_sort_values_break_ties_on_id():
+    docs = [{'_id': ObjectId(), 'lead_name': 'Ravi'} for _ in range(5)]
+    assert [d['_id'] for d in _paginate(docs, 'name', 2)] == sorted(d['_id'] for d in docs)
+
+
+def test_missing_sort_value_encodes_as_null():
+    lead = {'_id': ObjectId()}
+    keyset = server.decode_cursor(server.encode_cursor('name', lead), 'name')
+    assert {'lead_name': {'$ne': None}} in keyset['$or']
+    assert matches({'_id': ObjectId(), 'lead_name': 'Asha'}, keyset)
+
+
+@pytest.mark.parametrize('token', ['not-a-cursor', server.encode_cursor('name', {'_id': ObjectId(), 'lead_name': 'A'})])
+def test_rejects_malformed_or_mismatched_cursor(token):
+    with pytest.raises(ValueError):
+        server.decode_cursor(token, 'newest')
@@ -0,0 +1,67 @@
+"""TTL/LRU eviction and throttled version polling"""
+
+import pytest
+
+import response_cache
+from response_cache import TTLCache, VersionPoller
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_hit_and_miss_are_counted(clock):
+    cache = TTLCache(maxsize=2, ttl=10)
+    assert cache.get('a') == (False, None)
+    cache.set('a', 1)
+    assert cache.get('a') == (True, 1)
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set('a', 1)
+    clock[0] += 9.9
+    assert cache.get('a') == (True, 1)
+    clock[0] += 0.1
+    assert cache.get('a') == (False, None)
+    assert cache.stats()['size'] == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')  # 'b' is now least recently used
+    cache.set('c', 3)
+    assert cache.get('b') == (False, None)
+    assert cache.get('a') == (True, 1) and cache.get('c') == (True, 3)
+    assert cache.stats()['evictions'] == 1
+
+
+def test_clear_drops_everything(clock):
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache.set('a', 1)
+    cache.clear()
+    assert cache.get('a') == (False, None)
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_version_is_polled_at_most_once_per_interval(clock):
+    versions = iter(range(1, 100))
+    poller = VersionPoller(lambda: next(versions), interval=5)
+    assert [poller.get() for _ in range(10)] == [1] * 10
+    clock[0] += 5
+    assert poller.get() == 2
+    assert poller.polls == 2
+
+
+def test_invalidate_forces_the_next_poll(clock):
+    versions = iter(range(1, 100))
+    poller = VersionPoller(lambda: next(versions), interval=5)
+    poller.get()
+    poller.invalidate()
+    assert poller.get() == 2
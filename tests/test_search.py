@@ -0,0 +1,84 @@
+"""Search tokens, search filters and exact-before-phonetic ranking"""
+
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+import server
+from database import PHONETIC_MARKER, build_search_query, build_search_tiers, build_search_tokens
+from mongo_fake import FakeCollection, matches
+
+
+def _lead(name, company=""):
+    return {'_id': ObjectId(), 'lead_name': name, 'company_name': company,
+            'search_tokens': build_search_tokens(name, company)}
+
+
+def test_tokens_hold_prefixes_words_and_phonetic_keys():
+    tokens = build_search_tokens("Rahul", "Acme Corp")
+    for token in ("r", "ra", "rahul", "acme", "co", "corp", PHONETIC_MARKER + "R400"):
+        assert token in tokens
+    assert tokens == sorted(set(tokens))
+
+
+def test_tokens_fold_accents_and_punctuation():
+    assert "jose" in build_search_tokens("José")
+    assert "o" in build_search_tokens("O'Brien") and "brien" in build_search_tokens("O'Brien")
+
+
+def test_query_requires_every_word():
+    query = build_search_query("acme rahul")
+    assert matches(_lead("Rahul", "Acme"), query)
+    assert not matches(_lead("Rahul", "Zenith"), query)
+
+
+def test_short_words_are_not_matched_phonetically():
+    assert build_search_query("ram") == {"search_tokens": {"$in": ["ram"]}}
+    assert not matches(_lead("Ronnie"), build_search_query("ram"))
+    assert not matches(_lead("Ramon"), build_search_query("ron"))
+
+
+def test_long_words_match_phonetically():
+    query = build_search_query("raahul")
+    assert PHONETIC_MARKER + "R400" in query["search_tokens"]["$in"]
+    assert matches(_lead("Rahul"), query)
+
+
+def test_operators_in_input_never_reach_the_query():
+    assert build_search_query("$where", phonetic=False) == {"search_tokens": {"$in": ["where"]}}
+    assert build_search_query("  .* ") is None
+    assert build_search_tiers("") == []
+
+
+def test_tiers_split_exact_and_phonetic_matches():
+    exact, fuzzy = build_search_tiers("rahul")
+    rahul, raahul = _lead("Rahul"), _lead("Raahul")
+    assert matches(rahul, exact) and not matches(rahul, fuzzy)
+    assert matches(raahul, fuzzy) and not matches(raahul, exact)
+    assert build_search_tiers("ra") == [build_search_query("ra")]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    leads = FakeCollection()
+    monkeypatch.setattr(server, 'db_manager', SimpleNamespace(leads_collection=leads, get_data_version=lambda: 0))
+    server.response_cache.clear()
+    return server.app.test_client(), leads
+
+
+def test_exact_hits_list_before_phonetic_hits_across_pages(client):
+    http, leads = client
+    # Phonetic-only matches sort first by name, exact ones must still lead
+    leads.docs = [_lead("Raahul"), _lead("Rahool"), _lead("Rahul"), _lead("Rahul Mehta"), _lead("Priya")]
+    names, cursor = [], None
+    while True:
+        params = {'search': 'rahul', 'sort': 'name', 'limit': 1, 'date_range': 'all'}
+        if cursor:
+            params['cursor'] = cursor
+        body = http.get('/api/leads', query_string=params).get_json()
+        names += [lead['lead_name'] for lead in body['leads']]
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+    assert names == ["Rahul", "Rahul Mehta", "Raahul", "Rahool"]
@@ -0,0 +1,101 @@
+"""Live STT against the loadtest WebSocket stand-in, and the REST fallback"""
+
+import time
+
+import pytest
+
+pytest.importorskip("websockets")
+
+from loadtest import CALLER_LINES, STT_STREAM_BYTES_PER_WORD, Latency, start_fake_stt_stream
+from stt_streaming import StreamingTranscriber, UtteranceTranscription
+
+CHUNK = b"\0\0" * 480  # 30 ms at 16 kHz
+
+
+@pytest.fixture
+def stt_server():
+    servers = []
+
+    def start(**kwargs):
+        server = start_fake_stt_stream(Latency(0, 0), **kwargs)
+        servers.append(server)
+        return f"ws://127.0.0.1:{server.socket.getsockname()[1]}/v1/listen"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def rest_recorder():
+    calls = []
+
+    def rest(frames):
+        calls.append(list(frames))
+        return "rest transcript"
+
+    return rest, calls
+
+
+def test_interim_results_then_finalized_line(stt_server):
+    interim = []
+    stream = StreamingTranscriber("key", url=stt_server(), on_interim=interim.append)
+    stream.start()
+    for _ in range(40):  # 1.2 s of audio
+        stream.send_audio(CHUNK)
+
+    transcript = stream.finish()
+
+    assert transcript in CALLER_LINES
+    assert stream.error is None
+    assert interim and all(transcript.startswith(text) for text in interim)
+    assert [len(text.split()) for text in interim] == list(range(1, len(interim) + 1))
+
+
+def test_streamed_utterance_does_not_use_rest(stt_server):
+    rest, calls = rest_recorder()
+    stt = UtteranceTranscription(rest, StreamingTranscriber("key", url=stt_server()))
+    stt.start(CHUNK)
+    stt.send(CHUNK)
+
+    assert stt.finish([CHUNK, CHUNK]) in CALLER_LINES
+    assert stt.mode == "streaming" and calls == []
+
+
+def test_connect_failure_falls_back_to_rest():
+    rest, calls = rest_recorder()
+    stt = UtteranceTranscription(rest, StreamingTranscriber("key", url="ws://127.0.0.1:1/v1/listen"))
+    stt.start(CHUNK)
+
+    assert stt.mode == "rest"
+    assert stt.finish([CHUNK]) == "rest transcript"
+    assert calls == [[CHUNK]]
+
+
+def test_stream_dropped_mid_utterance_falls_back_to_rest(stt_server):
+    rest, calls = rest_recorder()
+    stt = UtteranceTranscription(
+        rest, StreamingTranscriber("key", url=stt_server(drop_after_bytes=STT_STREAM_BYTES_PER_WORD))
+    )
+    stt.start()
+    frames = []
+    for _ in range(20):
+        frames.append(CHUNK)
+        stt.send(CHUNK)
+        time.sleep(0.01)
+
+    assert stt.mode == "rest" and stt.error is not None
+    assert stt.finish(frames) == "rest transcript"
+    assert calls == [frames]
+
+
+def test_stream_dropped_before_finalize_falls_back_to_rest(stt_server):
+    rest, calls = rest_recorder()
+    stt = UtteranceTranscription(
+        rest, StreamingTranscriber("key", url=stt_server(drop_after_bytes=len(CHUNK)))
+    )
+    stt.start()
+    stt.stream._ws.send(CHUNK)  # Bypass send() so the drop is only seen at finish
+    stt.stream._finalized.wait(2)
+
+    assert stt.finish([CHUNK]) == "rest transcript"
+    assert stt.mode == "rest" and calls == [[CHUNK]]
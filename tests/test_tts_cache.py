@@ -0,0 +1,67 @@
+"""TTS phrase cache: hits and misses, the memory budget and script warming"""
+
+import os
+
+from tts_cache import TTSCache, cache_key, script_phrases
+
+
+class Synth:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text):
+        self.calls.append(text)
+        return f"audio:{text}".encode()
+
+
+def test_miss_synthesizes_once_then_hits_memory(tmp_path):
+    synth = Synth()
+    cache = TTSCache(synth, "aura-asteria", cache_dir=str(tmp_path))
+    assert cache.synthesize("Hello there.") == b"audio:Hello there."
+    assert cache.synthesize("Hello   there.") == b"audio:Hello there."  # Whitespace-normalized key
+    assert synth.calls == ["Hello there."]
+    assert cache.stats()["misses"] == 1 and cache.stats()["memory_hits"] == 1
+
+
+def test_disk_store_survives_a_new_process(tmp_path):
+    TTSCache(Synth(), "aura-asteria", cache_dir=str(tmp_path)).synthesize("Hello there.")
+    synth = Synth()
+    cache = TTSCache(synth, "aura-asteria", cache_dir=str(tmp_path))
+    assert cache.synthesize("Hello there.") == b"audio:Hello there."
+    assert synth.calls == [] and cache.stats()["disk_hits"] == 1
+    assert not [name for _, _, files in os.walk(tmp_path) for name in files if name.endswith(".tmp")]
+
+
+def test_voice_is_part_of_the_key(tmp_path):
+    assert cache_key("aura-asteria", "Hi.") != cache_key("aura-luna", "Hi.")
+    TTSCache(Synth(), "aura-asteria", cache_dir=str(tmp_path)).synthesize("Hi.")
+    assert TTSCache(Synth(), "aura-luna", cache_dir=str(tmp_path)).get("Hi.") is None
+
+
+def test_memory_lru_stays_within_budget():
+    cache = TTSCache(Synth(), "v", cache_dir=None, max_memory_bytes=30)
+    for text in ("one.", "two.", "three."):  # 10-12 bytes each
+        cache.synthesize(text)
+    cache.get("two.")  # Most recently used
+    cache.synthesize("four.")
+    stats = cache.stats()
+    assert stats["memory_bytes"] <= 30
+    assert cache.get("two.") is not None and cache.get("one.") is None
+
+
+def test_clips_larger_than_the_budget_are_not_kept_in_memory():
+    cache = TTSCache(Synth(), "v", cache_dir=None, max_memory_bytes=5)
+    cache.synthesize("A long sentence.")
+    assert cache.stats()["memory_entries"] == 0
+
+
+def test_script_phrases_are_whole_fixed_sentences(tmp_path):
+    prompt = tmp_path / "prompt.md"
+    prompt.write_text(
+        'Open with "Hello, I am Priya. Am I speaking with {lead_name}?"\n'
+        'Say "Thank you for your time. Have a great day!"\n'
+        'Never say "do not" or "later".\n'
+        'Repeat: "Thank you for your time."\n',
+        encoding="utf-8"
+    )
+    assert script_phrases(str(prompt)) == ["Thank you for your time.", "Have a great day!"]
@@ -0,0 +1,114 @@
+"""Sentence chunking of the LLM stream and ordered, interruptible playback"""
+
+import threading
+import time
+
+from tts_pipeline import SentenceChunker, TTSPipeline, truncate_spoken
+
+
+def feed_all(chunker, tokens):
+    sentences = []
+    for token in tokens:
+        sentences += chunker.feed(token)
+    return sentences + chunker.flush()
+
+
+def test_sentences_split_without_space_after_period():
+    chunker = SentenceChunker()
+    assert feed_all(chunker, ["Thank you", ".Our sales", " executive will call", " you."]) == \
+        ["Thank you.", "Our sales executive will call you."]
+
+
+def test_decimals_and_ellipses_are_not_boundaries():
+    chunker = SentenceChunker()
+    assert chunker.feed("Budget is 3.5 lakh... ") == ["Budget is 3.5 lakh..."]
+    assert chunker.feed("Right? ") == ["Right?"]
+    assert chunker.flush() == []
+
+
+def test_sentence_is_held_until_the_next_character_arrives():
+    chunker = SentenceChunker()
+    assert chunker.feed("It costs 3.") == []  # Could still be "3.5"
+    assert chunker.feed("5 lakh. Okay") == ["It costs 3.5 lakh."]
+    assert chunker.flush() == ["Okay"]
+
+
+def test_json_block_halts_speech():
+    chunker = SentenceChunker()
+    sentences = feed_all(chunker, ["Thanks.", "Bye now", "\n```json\n", '{"name": "Rahul."}', "\n```"])
+    assert sentences == ["Thanks.", "Bye now"]
+    assert chunker.halted
+    assert chunker.feed("More text.") == []
+
+
+def test_bare_json_object_halts_speech():
+    chunker = SentenceChunker()
+    assert feed_all(chunker, ['Done. {"interested": true}']) == ["Done."]
+
+
+def test_truncate_spoken_keeps_heard_words():
+    assert truncate_spoken("one two three four", 0.5) == "one two—"
+    assert truncate_spoken("one two three four", 0.1) == ""
+
+
+def test_playback_follows_submission_order():
+    delays = {"first": 0.05, "second": 0.0, "third": 0.02}
+    played = []
+
+    def synthesize(text):
+        time.sleep(delays[text])
+        return text.encode()
+
+    pipeline = TTSPipeline(synthesize, lambda audio: played.append(audio.decode()))
+    for text in delays:
+        pipeline.submit(text)
+    pipeline.close()
+
+    assert played == ["first", "second", "third"]
+    assert pipeline.spoken == ["first", "second", "third"]
+
+
+def test_interrupt_drops_queued_sentences_and_keeps_heard_text():
+    started = threading.Event()
+    stopped = threading.Event()
+    played = []
+
+    def play(audio):
+        played.append(audio)
+        if len(played) > 1:
+            return None
+        started.set()
+        stopped.wait(2)
+        return 0.5
+
+    pipeline = TTSPipeline(lambda text: text.encode(), play, stop=stopped.set)
+    pipeline.submit("one two three four")
+    pipeline.submit("never played")
+    assert started.wait(2)
+
+    pipeline.interrupt()
+    pipeline.submit("after interrupt")
+    pipeline.wait()
+
+    assert played == [b"one two three four"]
+    assert pipeline.spoken == ["one two—"]
+    assert not pipeline.busy()
+
+    pipeline.begin_turn()
+    pipeline.submit("next turn")
+    pipeline.close()
+    assert played[1:] == [b"next turn"]
+    assert pipeline.spoken == ["next turn"]
+
+
+def test_interrupt_with_finished_synthesis_does_not_deadlock():
+    release = threading.Event()
+    pipeline = TTSPipeline(lambda text: text.encode(), lambda audio: release.wait(2), stop=release.set)
+    for i in range(20):
+        pipeline.submit(f"sentence {i}")
+    time.sleep(0.05)  # Let most futures finish so their callbacks race interrupt()
+
+    pipeline.interrupt()
+    pipeline.wait()
+    pipeline.close()
+    assert pipeline._pending == set()
@@ -0,0 +1,92 @@
+"""Endpointer start, hangover and pre-roll on synthetic frames"""
+
+import math
+from array import array
+
+from vad_endpointer import FRAME_MS, SPEECH_END, SPEECH_START, Endpointer
+
+RATE = 16000
+SAMPLES = RATE * FRAME_MS // 1000
+
+
+def tone(amplitude: int) -> bytes:
+    return array("h", (int(amplitude * math.sin(2 * math.pi * 200 * i / RATE)) for i in range(SAMPLES))).tobytes()
+
+
+QUIET = tone(10)
+VOICED = tone(3000)
+
+
+def endpointer(**kwargs) -> Endpointer:
+    # Energy gate plus a classifier that agrees, so webrtcvad is not needed
+    kwargs.setdefault("is_speech", lambda frame, rate: True)
+    return Endpointer(sample_rate=RATE, start_ms=150, hangover_ms=300, preroll_ms=300, **kwargs)
+
+
+def feed(ep: Endpointer, frames):
+    return [ep.process(frame) for frame in frames]
+
+
+def test_turn_starts_after_start_frames_of_voiced_audio():
+    ep = endpointer()
+    feed(ep, [QUIET] * 20)
+    events = feed(ep, [VOICED] * 5)
+    assert events == [None] * 4 + [SPEECH_START]
+    assert ep.in_speech
+
+
+def test_short_burst_does_not_start_a_turn():
+    ep = endpointer()
+    feed(ep, [QUIET] * 20)
+    assert feed(ep, [VOICED] * 4 + [QUIET] + [VOICED] * 4) == [None] * 9
+    assert not ep.in_speech
+
+
+def test_preroll_keeps_audio_from_before_the_start():
+    ep = endpointer()
+    quiet = [tone(10 + i) for i in range(20)]
+    feed(ep, quiet)
+    feed(ep, [VOICED] * 5)
+    # 300 ms pre-roll: the last 5 quiet frames and the 5 voiced frames that started the turn
+    assert ep.utterance == quiet[-5:] + [VOICED] * 5
+
+
+def test_turn_ends_after_hangover_of_silence():
+    ep = endpointer()
+    feed(ep, [QUIET] * 20 + [VOICED] * 5)
+    # A pause shorter than the hangover keeps the turn open
+    assert feed(ep, [QUIET] * 9 + [VOICED]) == [None] * 10
+    events = feed(ep, [QUIET] * 10)
+    assert events == [None] * 9 + [SPEECH_END]
+    assert ep.ended
+    assert len(ep.utterance) == 10 + 10 + 10
+    assert ep.process(VOICED) is None
+
+
+def test_classifier_vetoes_loud_frames():
+    ep = endpointer(is_speech=lambda frame, rate: False)
+    feed(ep, [QUIET] * 20)
+    assert SPEECH_START not in feed(ep, [VOICED] * 20)
+
+
+def test_wrong_frame_size_is_ignored():
+    ep = endpointer()
+    assert ep.process(VOICED[:-2]) is None
+    assert ep.noise_floor is None
+
+
+def test_noise_rising_mid_turn_is_absorbed_and_ends_the_turn():
+    ep = endpointer(max_utterance_ms=60000)
+    feed(ep, [QUIET] * 20 + [VOICED] * 5)
+    # Steady noise the classifier flags as voiced: the floor catches up within a few seconds
+    events = feed(ep, [tone(2000)] * 200)
+    assert SPEECH_END in events
+    assert events.index(SPEECH_END) * FRAME_MS < 6000
+
+
+def test_turn_is_capped_at_the_maximum_length():
+    ep = endpointer(max_utterance_ms=900)
+    feed(ep, [QUIET] * 20)
+    events = feed(ep, [VOICED] * 40)
+    assert events.count(SPEECH_END) == 1
+    assert len(ep.utterance) == 900 // FRAME_MS
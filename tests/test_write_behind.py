@@ -0,0 +1,139 @@
+"""Journal replay across processes and call_id idempotency"""
+
+import os
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+from bson import ObjectId
+
+from write_behind import OP_STORE_CONVERSATION, OP_STORE_LEAD, WriteBehindQueue, read_journal
+
+HISTORY = [{"role": "user", "content": "Hi"}]
+
+
+class FakeDB:
+    def __init__(self):
+        self.uploads = []
+        self.leads = []
+        self.conversations = []
+
+    def upload_recording(self, lead_name, path):
+        self.uploads.append(path)
+        return f"file-{len(self.uploads)}"
+
+    def store_lead(self, lead_data, conversation_history, **kwargs):
+        self.leads.append(kwargs)
+        return "lead-id"
+
+    def store_conversation(self, lead_name, conversation_history, call_outcome, trace=None, call_timestamp=None):
+        self.conversations.append((lead_name, call_outcome))
+        return "log-id"
+
+
+def queue(journal_dir, db):
+    return WriteBehindQueue(lambda: db, str(journal_dir), start=False)
+
+
+def test_pending_writes_are_replayed_by_the_next_queue(tmp_path):
+    recording = tmp_path / "call.wav"
+    recording.write_bytes(b"RIFF")
+    first = queue(tmp_path, FakeDB())
+    lead_entry = first.store_lead({"lead_name": "Rahul"}, HISTORY, str(recording))
+    first.store_conversation("Asha", HISTORY, "no_response")
+    first.close(timeout=0)
+    assert not recording.exists()  # Moved into the journal directory
+    assert [e["op"] for e in read_journal(first.journal_path)] == [OP_STORE_LEAD, OP_STORE_CONVERSATION]
+
+    db = FakeDB()
+    second = queue(tmp_path, db)
+    assert second.pending() == 2
+    assert not os.path.exists(first.journal_path)
+    assert second.run_once() == 2
+
+    assert db.leads[0]["call_id"] == lead_entry and db.leads[0]["audio_file_id"] == "file-1"
+    assert db.conversations == [("Asha", "no_response")]
+    assert second.pending() == 0
+    second.close(timeout=0)
+    assert os.listdir(tmp_path / "recordings") == []
+
+
+def test_write_applied_before_a_crash_replays_with_the_same_call_id(tmp_path):
+    recording = tmp_path / "call.wav"
+    recording.write_bytes(b"RIFF")
+    first_db = FakeDB()
+    first = queue(tmp_path, first_db)
+    entry_id = first.store_lead({"lead_name": "Rahul"}, HISTORY, str(recording))
+    # Applied, but the process died before the write was marked done
+    first._apply(first._pending[entry_id])
+    first.close(timeout=0)
+
+    db = FakeDB()
+    second = queue(tmp_path, db)
+    assert second.run_once() == 1
+    assert db.uploads == []  # The upload was journaled as done
+    assert db.leads[0]["call_id"] == first_db.leads[0]["call_id"] == entry_id
+    assert db.leads[0]["audio_file_id"] == "file-1"
+    second.close(timeout=0)
+
+
+def test_journal_removed_by_another_queue_is_skipped(tmp_path, monkeypatch):
+    listdir = os.listdir
+    monkeypatch.setattr(os, "listdir", lambda path: listdir(path) + ["journal-gone.jsonl"])
+    q = queue(tmp_path, FakeDB())
+    assert q.pending() == 0
+    q.close(timeout=0)
+
+
+def test_close_without_waiting_leaves_writes_journaled(tmp_path):
+    q = WriteBehindQueue(lambda: (_ for _ in ()).throw(ConnectionError("down")), str(tmp_path))
+    q.store_conversation("Asha", HISTORY, "no_response")
+    q.close(timeout=0)
+    assert len(read_journal(q.journal_path)) == 1
+
+
+def test_replayed_call_id_is_stored_and_counted_once(manager):
+    db = manager
+    db.leads_collection.find_one_and_update.return_value = {"_id": ObjectId()}
+    db._record_call_rollup = MagicMock()
+    db.lead_calls_collection.update_one.side_effect = [
+        MagicMock(upserted_id=ObjectId()), MagicMock(upserted_id=None)
+    ]
+    for _ in range(2):
+        db.store_lead({"lead_name": "Rahul", "phone_number": "9876543210"}, HISTORY,
+                      schedule_calendar=False, call_id="call-1")
+
+    filters = [call.args[0] for call in db.lead_calls_collection.update_one.call_args_list]
+    assert filters == [{"call_id": "call-1"}] * 2
+    assert db.lead_calls_collection.insert_one.call_count == 0
+    assert db._record_call_rollup.call_count == 1
+
+
+def test_close_finishes_the_write_in_flight_before_closing_the_journal(tmp_path):
+    uploading, release = threading.Event(), threading.Event()
+
+    class SlowDB(FakeDB):
+        def upload_recording(self, lead_name, path):
+            uploading.set()
+            release.wait(2)
+            return super().upload_recording(lead_name, path)
+
+    recording = tmp_path / "call.wav"
+    recording.write_bytes(b"RIFF")
+    db = SlowDB()
+    q = WriteBehindQueue(lambda: db, str(tmp_path))
+    q.store_lead({"lead_name": "Rahul"}, HISTORY, str(recording))
+    q.store_conversation("Asha", HISTORY, "no_response")
+    assert uploading.wait(2)
+
+    closer = threading.Thread(target=q.close, kwargs={"timeout": 0})
+    closer.start()
+    release.set()
+    closer.join(2)
+    assert not closer.is_alive()
+
+    # The lead in flight was stored and marked done; the next write stays journaled
+    assert len(db.uploads) == len(db.leads) == 1
+    assert [e["op"] for e in read_journal(q.journal_path)] == [OP_STORE_CONVERSATION]
+    with pytest.raises(RuntimeError):
+        q.store_conversation("Asha", HISTORY, "no_response")
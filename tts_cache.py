@@ -0,0 +1,192 @@
+"""
+Content-addressed TTS cache
+Synthesized clips are keyed on (voice, cleaned text) and kept in an
+in-memory LRU backed by an on-disk store, so scripted lines replay
+without a Deepgram round trip
+
+Usage:
+    python tts_cache.py warm [prompt.md]    # Pre-render fixed script phrases
+"""
+
+import hashlib
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tts_cache"))
+
+# Upper bound on clip bytes held in memory (disk store is unbounded)
+TTS_CACHE_MEMORY_BYTES = int(os.getenv("TTS_CACHE_MEMORY_BYTES", str(32 * 1024 * 1024)))
+
+# Quoted lines in prompt.md; lines with {placeholders} are per-call and skipped
+QUOTED_PHRASE = re.compile(r'"([^"\n]+)"')
+
+
+def cache_key(voice: str, text: str) -> str:
+    """sha256 of voice and whitespace-normalized text"""
+    normalized = " ".join(text.split())
+    return hashlib.sha256(f"{voice}\n{normalized}".encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """Thread-safe two-level (memory LRU + disk) cache in front of a synthesize function"""
+
+    def __init__(self, synthesize: Callable[[str], bytes], voice: str,
+                 cache_dir: Optional[str] = TTS_CACHE_DIR,
+                 max_memory_bytes: int = TTS_CACHE_MEMORY_BYTES):
+        """
+        Args:
+            synthesize: Text -> audio bytes, called on a cache miss
+            voice: Voice/format identifier mixed into every key
+            cache_dir: Directory for the disk store (None for memory only)
+            max_memory_bytes: Bytes of audio kept in the in-memory LRU
+        """
+        self._synthesize = synthesize
+        self.voice = voice
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+
+        self._memory = OrderedDict()  # key -> audio bytes
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.wav")
+
+    def _remember(self, key: str, audio: bytes):
+        """Add to the memory LRU (caller holds the lock)"""
+        if len(audio) > self.max_memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = audio
+        self._memory_bytes += len(audio)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def get(self, text: str) -> Optional[bytes]:
+        """Return cached audio for text, or None"""
+        key = cache_key(self.voice, text)
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return audio
+
+        if self.cache_dir and os.path.exists(self._path(key)):
+            try:
+                with open(self._path(key), "rb") as f:
+                    audio = f.read()
+            except OSError:
+                audio = None
+            if audio:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(key, audio)
+                return audio
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, text: str, audio: bytes):
+        """Store audio in memory and on disk (written atomically)"""
+        key = cache_key(self.voice, text)
+        with self._lock:
+            self._remember(key, audio)
+
+        if self.cache_dir:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(audio)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"[TTS cache write warning: {e}]")
+
+    def synthesize(self, text: str) -> bytes:
+        """Cached drop-in for the wrapped synthesize function"""
+        audio = self.get(text)
+        if audio is None:
+            audio = self._synthesize(text)
+            self.put(text, audio)
+        return audio
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses
+            }
+
+
+def script_phrases(prompt_path: str) -> List[str]:
+    """
+    Fixed sentences the bot speaks verbatim, taken from quoted lines in prompt.md
+
+    Phrases are split and cleaned exactly as the voice loop does before
+    synthesis, so warmed entries hit at runtime.
+    """
+    from speech_services import clean_text_for_tts
+    from tts_pipeline import SentenceChunker
+
+    with open(prompt_path, "r", encoding="utf-8") as f:
+        prompt = f.read()
+
+    phrases = []
+    for quoted in QUOTED_PHRASE.findall(prompt):
+        if "{" in quoted:
+            continue
+        chunker = SentenceChunker()
+        for sentence in chunker.feed(quoted) + chunker.flush():
+            sentence = clean_text_for_tts(sentence)
+            # Only whole sentences; bare fragments ("do not", "later") are examples, not lines
+            if sentence.endswith((".", "?", "!")) and len(sentence.split()) > 1 and sentence not in phrases:
+                phrases.append(sentence)
+    return phrases
+
+
+def warm(prompt_path: str):
+    """Pre-render every fixed script phrase into the disk cache"""
+    from speech_services import TTS_VOICE_KEY, deepgram_tts
+
+    cache = TTSCache(deepgram_tts, TTS_VOICE_KEY)
+    phrases = script_phrases(prompt_path)
+    rendered = cached = failed = 0
+    for phrase in phrases:
+        if cache.get(phrase) is not None:
+            cached += 1
+            continue
+        try:
+            cache.put(phrase, deepgram_tts(phrase))
+            rendered += 1
+        except Exception as e:
+            failed += 1
+            print(f"[TTS warm failed for '{phrase}': {e}]")
+    print(f"[TTS cache warm: {len(phrases)} phrases, {rendered} rendered, "
+          f"{cached} already cached, {failed} failed -> {cache.cache_dir}]")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "warm":
+        print("Usage: python tts_cache.py warm [prompt.md]")
+        sys.exit(1)
+    default_prompt = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompt.md")
+    warm(sys.argv[2] if len(sys.argv) > 2 else default_prompt)
@@ -0,0 +1,194 @@
+"""
+Pipelined text-to-speech for the voice bot
+Sentences are cut from the LLM token stream, synthesized concurrently
+and played back strictly in order, so playback of sentence N overlaps
+synthesis of sentence N+1
+"""
+
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+# End of a sentence: terminal punctuation followed by something that is
+# not more punctuation or a digit (so "3.5" and "..." are not split).
+# The prompt writes sentences without a space after the period.
+SENTENCE_END = re.compile(r'[.!?]+(?=[^.!?\d])')
+
+# Anything after these markers is the silent JSON block, never spoken
+JSON_MARKERS = ("```", "{")
+
+
+class SentenceChunker:
+    """Turns a stream of LLM tokens into complete sentences"""
+
+    def __init__(self):
+        self._buffer = ""
+        self.halted = False  # True once the JSON block has started
+
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text and return any sentences it completed"""
+        if self.halted:
+            return []
+        self._buffer += text
+
+        # Stop at the JSON block; whatever precedes it is still spoken
+        marker_positions = [self._buffer.find(m) for m in JSON_MARKERS if m in self._buffer]
+        if marker_positions:
+            self.halted = True
+            tail = self._buffer[:min(marker_positions)]
+            self._buffer = ""
+            return self._split(tail, final=True)
+
+        return self._split_buffer()
+
+    def flush(self) -> List[str]:
+        """Return the remaining text once the stream has ended"""
+        tail, self._buffer = self._buffer, ""
+        return self._split(tail, final=True)
+
+    def _split_buffer(self) -> List[str]:
+        sentences = []
+        while True:
+            match = SENTENCE_END.search(self._buffer)
+            if not match:
+                return sentences
+            sentence = self._buffer[:match.end()].strip()
+            self._buffer = self._buffer[match.end():]
+            if sentence:
+                sentences.append(sentence)
+
+    def _split(self, text: str, final: bool) -> List[str]:
+        self._buffer = text
+        sentences = self._split_buffer()
+        if final and self._buffer.strip():
+            sentences.append(self._buffer.strip())
+        self._buffer = ""
+        return sentences
+
+
+def truncate_spoken(text: str, fraction: float) -> str:
+    """The words of a sentence that were heard before playback stopped"""
+    words = text.split()
+    heard = int(len(words) * fraction)
+    return " ".join(words[:heard]) + "—" if heard else ""
+
+
+class TTSPipeline:
+    """
+    Concurrent synthesis with ordered playback
+
+    submit() schedules synthesis on a worker pool and queues the pending
+    result; a single playback thread plays results in submission order.
+    interrupt() stops the current clip and drops everything still queued
+    (barge-in); the text actually heard is kept in spoken.
+    """
+
+    def __init__(self, synthesize: Callable[[str], bytes], play: Callable[[bytes], Optional[float]],
+                 max_workers: int = 3, on_played: Optional[Callable[[str, bytes], None]] = None,
+                 stop: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            synthesize: Text -> audio bytes (runs on worker threads)
+            play: Plays audio bytes, blocking until done (runs on the playback thread);
+                may return the fraction played if it was stopped early
+            max_workers: Sentences synthesized concurrently
+            on_played: Called with (text, audio) after each clip finishes playing
+            stop: Interrupts the clip currently playing (needed for interrupt())
+        """
+        self.synthesize = synthesize
+        self.play = play
+        self.on_played = on_played
+        self.stop = stop
+
+        self.spoken: List[str] = []  # Text heard by the caller since begin_turn()
+        self.interrupted = False
+        self._generation = 0
+        self._pending = set()
+        # Reentrant: cancel() and add_done_callback() on a finished future run
+        # _discard_pending on the calling thread, which already holds the lock
+        self._lock = threading.RLock()
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts")
+        self._queue = queue.Queue()
+        self._player = threading.Thread(target=self._playback_loop, daemon=True)
+        self._player.start()
+
+    def begin_turn(self):
+        """Start a new bot turn: clear spoken text and accept sentences again"""
+        with self._lock:
+            self.spoken = []
+            self.interrupted = False
+
+    def submit(self, text: str):
+        """Start synthesizing a sentence and queue it for playback (dropped after interrupt())"""
+        with self._lock:
+            if self.interrupted:
+                return
+            future = self._executor.submit(self.synthesize, text)
+            self._pending.add(future)
+            future.add_done_callback(self._discard_pending)
+            self._queue.put((text, future, self._generation))
+
+    def interrupt(self):
+        """Stop playback now and cancel every sentence not yet played"""
+        with self._lock:
+            if self.interrupted:
+                return
+            self.interrupted = True
+            self._generation += 1
+            for future in list(self._pending):
+                future.cancel()
+        if self.stop:
+            self.stop()
+
+    def _discard_pending(self, future):
+        # Done callbacks run on worker threads while interrupt() iterates _pending
+        with self._lock:
+            self._pending.discard(future)
+
+    def busy(self) -> bool:
+        """True while sentences are being synthesized or played"""
+        return self._queue.unfinished_tasks > 0
+
+    def wait(self):
+        """Block until every submitted sentence has been played (or dropped)"""
+        self._queue.join()
+
+    def close(self):
+        """Finish pending playback and stop the worker threads"""
+        self.wait()
+        self._queue.put(None)
+        self._player.join()
+        self._executor.shutdown(wait=True)
+
+    def _playback_loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                text, future, generation = item
+                if generation != self._generation:
+                    continue  # Dropped by interrupt()
+                try:
+                    audio = future.result()
+                    fraction = self.play(audio)
+                    if fraction is None:
+                        fraction = 1.0
+
+                    if generation != self._generation or fraction < 1.0:
+                        # Cut off mid-sentence: keep only what was heard
+                        heard = truncate_spoken(text, fraction)
+                        if heard:
+                            self.spoken.append(heard)
+                        continue
+
+                    self.spoken.append(text)
+                    if self.on_played:
+                        self.on_played(text, audio)
+                except Exception as e:
+                    print(f"[Audio error: {e}]")
+            finally:
+                self._queue.task_done()
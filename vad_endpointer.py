@@ -0,0 +1,162 @@
+"""
+Frame-level voice activity endpointing
+A small state machine over 30ms PCM frames: speech starts after a short
+run of voiced frames (with pre-roll kept in a ring buffer) and ends after
+a configurable hangover of silence. An adaptive noise floor keeps steady
+background noise from holding the turn open: it also rises (slowly) during
+a turn, so noise that steps up mid-turn is absorbed, and a turn never runs
+past a maximum length.
+"""
+
+import math
+import os
+from array import array
+from collections import deque
+from typing import Callable, List, Optional
+
+try:
+    import webrtcvad
+except ImportError:  # Optional: falls back to the energy detector alone
+    webrtcvad = None
+
+FRAME_MS = 30
+
+# Voiced audio needed before a turn starts, silence needed to end it,
+# and audio kept from before the start so the first syllable is not clipped
+VAD_START_MS = int(os.getenv("VAD_START_MS", "150"))
+VAD_HANGOVER_MS = int(os.getenv("VAD_HANGOVER_MS", "400"))
+VAD_PREROLL_MS = int(os.getenv("VAD_PREROLL_MS", "300"))
+
+# A turn is ended here even if the audio never goes quiet (e.g. line noise)
+VAD_MAX_UTTERANCE_MS = int(os.getenv("VAD_MAX_UTTERANCE_MS", "30000"))
+
+# A frame must be this many times louder (RMS) than the noise floor to count as speech
+VAD_NOISE_RATIO = float(os.getenv("VAD_NOISE_RATIO", "2.0"))
+
+# RMS below this is always silence (16-bit samples)
+MIN_SPEECH_RMS = 100.0
+
+# Noise floor smoothing: slow rise on louder noise, fast fall on quieter frames
+NOISE_RISE = 0.05
+NOISE_FALL = 0.2
+
+# Rise during a turn: slow enough that speech is not absorbed, while noise that
+# steps up mid-turn (and is flagged voiced) is within a few seconds
+NOISE_RISE_IN_SPEECH = 0.005
+
+SPEECH_START = "start"
+SPEECH_END = "end"
+
+
+def frame_rms(frame: bytes) -> float:
+    """RMS level of a 16-bit little-endian PCM frame"""
+    samples = array("h", frame)
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+class Endpointer:
+    """
+    Detects the start and end of one utterance from 30ms frames
+
+    Usage:
+        endpointer = Endpointer()
+        for frame in frames:                 # FRAME_MS of 16-bit mono PCM each
+            event = endpointer.process(frame)
+            if event == SPEECH_END:
+                audio = b"".join(endpointer.utterance)
+    """
+
+    def __init__(self, sample_rate: int = 16000, vad_mode: int = 2,
+                 start_ms: int = VAD_START_MS, hangover_ms: int = VAD_HANGOVER_MS,
+                 preroll_ms: int = VAD_PREROLL_MS, noise_ratio: float = VAD_NOISE_RATIO,
+                 max_utterance_ms: int = VAD_MAX_UTTERANCE_MS,
+                 is_speech: Optional[Callable[[bytes, int], bool]] = None):
+        """
+        Args:
+            sample_rate: 8000, 16000, 32000 or 48000 (webrtcvad rates)
+            vad_mode: webrtcvad aggressiveness 0-3
+            start_ms: Consecutive voiced audio that starts a turn
+            hangover_ms: Consecutive silence that ends a turn
+            preroll_ms: Audio before the start kept in the utterance
+            noise_ratio: Required RMS over the adaptive noise floor
+            max_utterance_ms: Longest turn; it ends here even without silence
+            is_speech: Frame classifier (frame, sample_rate) -> bool; defaults to
+                webrtcvad, or energy only if webrtcvad is not installed
+        """
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * FRAME_MS // 1000
+        self.frame_bytes = self.frame_samples * 2
+        self.start_frames = max(1, math.ceil(start_ms / FRAME_MS))
+        self.hangover_frames = max(1, math.ceil(hangover_ms / FRAME_MS))
+        self.noise_ratio = noise_ratio
+        self.max_utterance_frames = max(1, math.ceil(max_utterance_ms / FRAME_MS))
+
+        if is_speech is None and webrtcvad is not None:
+            is_speech = webrtcvad.Vad(vad_mode).is_speech
+        self._classifier = is_speech
+
+        self._preroll = deque(maxlen=max(self.start_frames, math.ceil(preroll_ms / FRAME_MS)))
+        self.utterance: List[bytes] = []
+        self.noise_floor: Optional[float] = None
+        self.in_speech = False
+        self.ended = False
+        self._voiced_run = 0
+        self._silent_run = 0
+
+    def _update_noise_floor(self, rms: float):
+        if self.noise_floor is None:
+            self.noise_floor = rms
+            return
+        if rms < self.noise_floor:
+            rate = NOISE_FALL
+        else:
+            rate = NOISE_RISE_IN_SPEECH if self.in_speech else NOISE_RISE
+        self.noise_floor += rate * (rms - self.noise_floor)
+
+    def is_voiced(self, frame: bytes) -> bool:
+        """Classify one frame, updating the noise floor (slowly during a turn)"""
+        rms = frame_rms(frame)
+        floor = self.noise_floor if self.noise_floor is not None else rms
+        loud_enough = rms >= MIN_SPEECH_RMS and rms >= floor * self.noise_ratio
+
+        voiced = loud_enough
+        if loud_enough and self._classifier is not None:
+            try:
+                voiced = self._classifier(frame, self.sample_rate)
+            except Exception:
+                voiced = False
+
+        if not voiced or self.in_speech:
+            self._update_noise_floor(rms)
+        return voiced
+
+    def process(self, frame: bytes) -> Optional[str]:
+        """
+        Feed one frame
+
+        Returns:
+            SPEECH_START when the turn starts, SPEECH_END when it ends, else None
+        """
+        if self.ended or len(frame) != self.frame_bytes:
+            return None
+
+        voiced = self.is_voiced(frame)
+
+        if not self.in_speech:
+            self._preroll.append(frame)
+            self._voiced_run = self._voiced_run + 1 if voiced else 0
+            if self._voiced_run >= self.start_frames:
+                self.in_speech = True
+                self.utterance = list(self._preroll)
+                self._preroll.clear()
+                return SPEECH_START
+            return None
+
+        self.utterance.append(frame)
+        self._silent_run = 0 if voiced else self._silent_run + 1
+        if self._silent_run >= self.hangover_frames or len(self.utterance) >= self.max_utterance_frames:
+            self.ended = True
+            return SPEECH_END
+        return None
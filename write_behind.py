@@ -0,0 +1,445 @@
+"""
+Write-behind queue for call-end persistence
+Lead upserts, GridFS recording uploads, conversation logs and calendar
+scheduling are appended to a durable on-disk journal and applied by a
+background worker with retries, so a call ends in milliseconds and its
+data survives a MongoDB outage or a crash. Unfinished journals left by
+other processes are adopted and replayed.
+
+Usage:
+    python write_behind.py drain     # Apply every pending write, then exit
+    python write_behind.py status    # Count pending writes
+"""
+
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from pymongo.errors import ConnectionFailure
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+WRITE_BEHIND_DIR = os.getenv("WRITE_BEHIND_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "write_behind"))
+
+# Set to false to write straight to MongoDB at the end of each call
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "true").lower() in ("1", "true", "yes")
+
+# Writes applied per worker pass
+WRITE_BEHIND_BATCH = int(os.getenv("WRITE_BEHIND_BATCH", "20"))
+
+# Longest wait between retries of a failing write (seconds, doubling from 1)
+WRITE_BEHIND_MAX_BACKOFF = float(os.getenv("WRITE_BEHIND_MAX_BACKOFF", "300"))
+
+# How long a finishing process waits for queued writes before leaving them in the journal
+WRITE_BEHIND_EXIT_WAIT = float(os.getenv("WRITE_BEHIND_EXIT_WAIT", "10"))
+
+OP_STORE_LEAD = "store_lead"
+OP_STORE_CONVERSATION = "store_conversation"
+OP_SCHEDULE_CALENDAR = "schedule_calendar"
+
+
+def _try_lock(f) -> bool:
+    """Non-blocking exclusive lock on an open file (held until it is closed)"""
+    try:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        elif msvcrt:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def read_journal(path: str) -> List[Dict]:
+    """
+    Pending entries of a journal, in the order they were queued
+
+    Records are {"type": "op"|"progress"|"done", "id", ...}; a torn last
+    line (crash mid-write) is skipped.
+    """
+    entries = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record["type"] == "op":
+                entries[record["id"]] = {
+                    "id": record["id"],
+                    "op": record["op"],
+                    "args": record["args"],
+                    "created_at": record["created_at"],
+                    "state": {}
+                }
+            elif record["type"] == "progress" and record["id"] in entries:
+                entries[record["id"]]["state"].update(record["state"])
+            elif record["type"] == "done":
+                entries.pop(record["id"], None)
+    return list(entries.values())
+
+
+class WriteBehindQueue:
+    """
+    Durable queue in front of MongoDBManager
+
+    store_lead() and store_conversation() take the same arguments as the
+    MongoDBManager methods, so the queue can be passed wherever a
+    db_manager is expected. Both return as soon as the write is journaled
+    (fsync'd); the recording file is moved into the journal directory.
+
+    Each process writes its own locked journal file. A journal whose lock
+    is free belongs to a process that has exited and is adopted by the
+    next queue that starts, or by "python write_behind.py drain".
+
+    Calendar scheduling is a separate step after the lead upsert and is
+    not retried: Graph event/mail POSTs are not idempotent (see
+    http_client.RETRY_POLICIES), so a failure is logged rather than
+    risking a duplicate invite.
+    """
+
+    def __init__(self, db_factory: Callable, journal_dir: str = WRITE_BEHIND_DIR,
+                 batch_size: int = WRITE_BEHIND_BATCH, start: bool = True):
+        """
+        Args:
+            db_factory: Returns a connected MongoDBManager (called lazily and
+                again after a connection failure)
+            journal_dir: Directory for journals and queued recordings
+            batch_size: Writes applied per worker pass
+            start: Start the background worker now
+        """
+        self.db_factory = db_factory
+        self.journal_dir = journal_dir
+        self.recordings_dir = os.path.join(journal_dir, "recordings")
+        self.batch_size = batch_size
+        os.makedirs(self.recordings_dir, exist_ok=True)
+
+        self.journal_path = os.path.join(journal_dir, f"journal-{uuid.uuid4().hex}.jsonl")
+        self._journal = open(self.journal_path, "a+", encoding="utf-8")
+        _try_lock(self._journal)
+
+        self._db = None
+        self._pending: Dict[str, Dict] = {}  # id -> entry (insertion ordered)
+        self._next_attempt: Dict[str, float] = {}
+        self._attempts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._stopping = False
+        self._worker: Optional[threading.Thread] = None
+
+        self.applied = 0
+        self.failures = 0
+
+        self.adopt_orphans()
+        if start:
+            self.start()
+
+    # --- Journal ---
+
+    def _append(self, record: Dict):
+        """Append one record and fsync (caller holds the lock)"""
+        if self._journal.closed:
+            raise RuntimeError(f"write-behind journal is closed: {self.journal_path}")
+        self._journal.write(json.dumps(record, default=str) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def _enqueue(self, op: str, args: Dict, entry_id: Optional[str] = None,
+                 created_at: Optional[str] = None, state: Optional[Dict] = None) -> str:
+        entry_id = entry_id or uuid.uuid4().hex
+        with self._lock:
+            if entry_id in self._pending:
+                return entry_id
+            entry = {
+                "id": entry_id,
+                "op": op,
+                "args": args,
+                "created_at": created_at or datetime.utcnow().isoformat(),
+                "state": dict(state or {})
+            }
+            self._append({"type": "op", "id": entry_id, "op": op, "args": args, "created_at": entry["created_at"]})
+            if entry["state"]:
+                self._append({"type": "progress", "id": entry_id, "state": entry["state"]})
+            self._pending[entry_id] = entry
+            self._wake.notify()
+        return entry_id
+
+    def _progress(self, entry: Dict, **state):
+        with self._lock:
+            entry["state"].update(state)
+            self._append({"type": "progress", "id": entry["id"], "state": state})
+
+    def _done(self, entry: Dict):
+        with self._lock:
+            self._pending.pop(entry["id"], None)
+            self._next_attempt.pop(entry["id"], None)
+            self._attempts.pop(entry["id"], None)
+            if self._pending:
+                self._append({"type": "done", "id": entry["id"]})
+            else:
+                # Nothing left: start the journal over instead of growing it
+                self._journal.seek(0)
+                self._journal.truncate()
+                self._journal.flush()
+                os.fsync(self._journal.fileno())
+            self._wake.notify_all()
+
+    def adopt_orphans(self) -> int:
+        """Take over pending writes from journals of processes that have exited"""
+        adopted = 0
+        for name in sorted(os.listdir(self.journal_dir)):
+            path = os.path.join(self.journal_dir, name)
+            if not name.startswith("journal-") or path == self.journal_path:
+                continue
+            try:
+                f = open(path, "r+", encoding="utf-8")
+            except FileNotFoundError:
+                continue  # Adopted and removed by another queue since listdir()
+            with f:
+                if not _try_lock(f):
+                    continue  # Owner still running
+                if os.fstat(f.fileno()).st_nlink == 0:
+                    continue  # Adopted and removed by another queue before we got the lock
+                entries = read_journal(path)
+                for entry in entries:
+                    self._enqueue(entry["op"], entry["args"], entry["id"], entry["created_at"], entry["state"])
+                adopted += len(entries)
+                if fcntl:
+                    os.remove(path)  # Everything is in our own journal now; removed while locked
+            if not fcntl:
+                try:
+                    os.remove(path)  # Windows cannot remove an open file
+                except FileNotFoundError:
+                    pass
+        if adopted:
+            print(f"[Write-behind: adopted {adopted} pending writes]")
+        return adopted
+
+    # --- MongoDBManager-compatible API ---
+
+    def store_lead(self, lead_data: Dict, conversation_history: List[Dict],
+                   audio_file_path: Optional[str] = None, trace: Optional[Dict] = None,
+                   recording_index: Optional[List[Dict]] = None) -> str:
+        """Queue a lead upsert (with recording upload and calendar scheduling); returns the queue entry ID"""
+        entry_id = uuid.uuid4().hex
+        recording = None
+        if audio_file_path and os.path.exists(audio_file_path):
+            recording = os.path.join(self.recordings_dir, f"{entry_id}{os.path.splitext(audio_file_path)[1]}")
+            shutil.move(audio_file_path, recording)
+        self._enqueue(OP_STORE_LEAD, {
+            "lead_data": lead_data,
+            "conversation_history": conversation_history,
+            "recording": recording,
+            "trace": trace,
+            "recording_index": recording_index
+        }, entry_id)
+        print(f"[Lead queued for storage: {lead_data.get('lead_name', 'unknown_lead')}]")
+        return entry_id
+
+    def store_conversation(self, lead_name: str, conversation_history: List[Dict],
+                           call_outcome: str = "completed", trace: Optional[Dict] = None) -> str:
+        """Queue a conversation log insert; returns the queue entry ID"""
+        return self._enqueue(OP_STORE_CONVERSATION, {
+            "lead_name": lead_name,
+            "conversation_history": conversation_history,
+            "call_outcome": call_outcome,
+            "trace": trace
+        })
+
+    # --- Worker ---
+
+    def _database(self):
+        if self._db is None:
+            self._db = self.db_factory()
+        return self._db
+
+    def _apply(self, entry: Dict):
+        """Apply one queued write; raises to have it retried"""
+        args = entry["args"]
+        call_timestamp = datetime.fromisoformat(entry["created_at"])
+        db = self._database()
+
+        if entry["op"] == OP_STORE_LEAD:
+            lead_data = args["lead_data"]
+            lead_name = lead_data.get("lead_name", "unknown_lead")
+            recording = args.get("recording")
+
+            # Upload once; a retry after a failed upsert reuses the stored file
+            audio_file_id = entry["state"].get("audio_file_id")
+            if recording and not audio_file_id and os.path.exists(recording):
+                audio_file_id = db.upload_recording(lead_name, recording)
+                if not audio_file_id:
+                    raise RuntimeError("recording upload failed")
+                self._progress(entry, audio_file_id=audio_file_id)
+
+            db.store_lead(lead_data, args["conversation_history"], trace=args.get("trace"),
+                          recording_index=args.get("recording_index"), audio_file_id=audio_file_id,
+                          call_timestamp=call_timestamp, schedule_calendar=False, call_id=entry["id"])
+            if lead_data.get("preferred_day") and lead_data.get("preferred_time_window"):
+                self._enqueue(OP_SCHEDULE_CALENDAR, {"lead_name": lead_name, "lead_data": lead_data},
+                              f"{entry['id']}-calendar", entry["created_at"])
+            if recording and os.path.exists(recording):
+                os.remove(recording)
+
+        elif entry["op"] == OP_STORE_CONVERSATION:
+            if not db.store_conversation(args["lead_name"], args["conversation_history"], args["call_outcome"],
+                                         trace=args.get("trace"), call_timestamp=call_timestamp):
+                raise RuntimeError("conversation insert failed")
+
+        elif entry["op"] == OP_SCHEDULE_CALENDAR:
+            db.schedule_lead_calendar(args["lead_name"], args["lead_data"], call_timestamp)
+
+        else:
+            print(f"[Write-behind: dropping unknown operation {entry['op']}]")
+
+    def _due_batch(self) -> List[Dict]:
+        """Entries whose retry time has come (caller holds the lock)"""
+        now = time.monotonic()
+        batch = []
+        for entry_id, entry in self._pending.items():
+            if self._next_attempt.get(entry_id, 0) <= now:
+                batch.append(entry)
+                if len(batch) >= self.batch_size:
+                    break
+        return batch
+
+    def run_once(self) -> int:
+        """
+        Apply one batch of due writes
+
+        A connection failure stops the batch (the rest would fail too) and
+        drops the database handle so the next attempt reconnects.
+
+        Returns:
+            Writes applied
+        """
+        with self._lock:
+            batch = self._due_batch()
+        applied = 0
+        for entry in batch:
+            if self._stopping:
+                break  # close() is waiting for the write in flight, not the whole batch
+            try:
+                self._apply(entry)
+            except Exception as e:
+                self._retry_later(entry, e)
+                if isinstance(e, ConnectionFailure):
+                    self._db = None
+                    with self._lock:
+                        for other in batch[batch.index(entry) + 1:]:
+                            self._next_attempt[other["id"]] = self._next_attempt[entry["id"]]
+                    break
+                continue
+            self._done(entry)
+            applied += 1
+        self.applied += applied
+        return applied
+
+    def _retry_later(self, entry: Dict, error: Exception):
+        with self._lock:
+            attempts = self._attempts.get(entry["id"], 0) + 1
+            self._attempts[entry["id"]] = attempts
+            delay = min(WRITE_BEHIND_MAX_BACKOFF, 2 ** (attempts - 1))
+            self._next_attempt[entry["id"]] = time.monotonic() + delay
+        self.failures += 1
+        print(f"[Write-behind: {entry['op']} failed (attempt {attempts}, retry in {delay:.0f}s): {error}]")
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._stopping:
+                    return
+                if not self._due_batch():
+                    # Sleep until the earliest retry (or a new write)
+                    retry_at = [self._next_attempt[i] for i in self._pending if i in self._next_attempt]
+                    timeout = max(0.05, min(retry_at) - time.monotonic()) if retry_at else None
+                    self._wake.wait(timeout)
+                    continue
+            self.run_once()
+
+    def start(self):
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._worker.start()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until nothing is pending; False if the timeout passed first"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._wake.wait(remaining)
+        return True
+
+    def close(self, timeout: float = WRITE_BEHIND_EXIT_WAIT):
+        """
+        Give queued writes up to timeout seconds, then stop the worker
+
+        The write in flight is finished (with its progress journaled) before the
+        journal and database are closed. Writes still pending stay in the journal
+        for the next process (or a drain).
+        """
+        if not self.wait(timeout):
+            print(f"[Write-behind: {self.pending()} writes left in {self.journal_path}]")
+        with self._lock:
+            self._stopping = True
+            self._wake.notify_all()
+        if self._worker is not None and self._worker is not threading.current_thread():
+            self._worker.join()
+        with self._lock:
+            empty = not self._pending
+            self._journal.close()
+        if empty and os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        if self._db is not None and hasattr(self._db, "close"):
+            self._db.close()
+
+
+def drain(journal_dir: str = WRITE_BEHIND_DIR):
+    """Apply every pending write from journals of exited processes, retrying until done"""
+    from database import MongoDBManager
+
+    queue = WriteBehindQueue(MongoDBManager, journal_dir, start=False)
+    total = queue.pending()
+    while queue.pending():
+        if not queue.run_once():
+            time.sleep(1)
+    print(f"[Write-behind drained: {total} writes applied, {queue.failures} failed attempts retried]")
+    queue.close(timeout=0)
+
+
+def status(journal_dir: str = WRITE_BEHIND_DIR):
+    counts = {}
+    for name in sorted(os.listdir(journal_dir)) if os.path.isdir(journal_dir) else []:
+        if name.startswith("journal-"):
+            for entry in read_journal(os.path.join(journal_dir, name)):
+                counts[entry["op"]] = counts.get(entry["op"], 0) + 1
+    print(f"[Write-behind pending: {sum(counts.values())} {counts}]")
+
+
+if __name__ == "__main__":
+    commands = {"drain": drain, "status": status}
+    if len(sys.argv) != 2 or sys.argv[1] not in commands:
+        print(f"Usage: python write_behind.py <{'|'.join(commands)}>")
+        sys.exit(1)
+    commands[sys.argv[1]]()